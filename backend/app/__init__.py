@@ -6,7 +6,10 @@ from flask_restful import Api
 from app.config import Config
 from app.models import db
 from app.cache import RedisCache
+from app.state_store import create_state_store
 from app.rate_limiter import create_limiter, apply_rate_limits
+from app.schema import register_schema_commands
+from app.services.mail_delivery import check_delivery_transport
 from app.celery_app import make_celery
 
 
@@ -29,11 +32,17 @@ def create_app():
     app.cache = redis_cache
     app.logger.info("Using Redis cache")
 
+    # Non-evicting store for revocations and quiz session buffers
+    app.state_store = create_state_store(app)
+
     # Initialize rate limiter
     limiter = create_limiter(app)
     app.limiter = limiter
     app.logger.info("Rate limiting enabled")
 
+    # Bulk email runs on aiosmtplib when installed, warn about the fallback
+    check_delivery_transport(app)
+
     from app.api.auth import register_auth_api
     from app.api.user import register_user_api
     from app.api.quiz import register_quiz_api
@@ -63,7 +72,7 @@ def create_app():
 
     apply_rate_limits(app)
 
-    with app.app_context():
-        db.create_all()
+    # Tables, indexes and backfills: `flask --app run upgrade-schema`
+    register_schema_commands(app)
 
     return app
@@ -1,80 +1,43 @@
+import uuid
 from datetime import datetime
 from flask import current_app, request
 from flask_jwt_extended import jwt_required
-from app.cache import invalidate_quiz_cache
+from app.cache import cache_result, invalidate_content_cache, invalidate_quiz_cache, invalidate_quizzes_cache
+from app.grading import bump_answer_key_version
 from app.services.report_generator import ReportGenerator
+from app.services.monthly_activity import remove_quiz_activity
+from app.services.regrader import regrade_quiz
 from flask_restful import Resource, reqparse
-from app.utils import admin_required, cache_key, categorize_quizzes, get_quiz_status
+from app.utils import admin_required, cache_key, categorize_quizzes, get_quiz_status, rebuild_quiz_attempts, update_job_status, revoke_user_tokens
 from app.models import Course, Chapter, Quiz, Question, User, Subscription, Submission, db
 from sqlalchemy import func, extract
 
 
-def revaluate_quiz_submissions(quiz_id):
+def revaluate_quiz_submissions(quiz_id, job_id=None):
+    return regrade_quiz(quiz_id, job_id=job_id)
 
-    # Get all questions for the quiz
-    questions = Question.query.filter_by(quiz_id=quiz_id).all()
 
-    # Get all unique users who submitted this quiz
-    user_submissions = db.session.query(Submission.user_id).filter_by(
-        quiz_id=quiz_id).distinct().all()
+def schedule_quiz_revaluation(quiz_id):
+    # Two edits within the same second must not share a job status entry
+    job_id = f"regrade_{quiz_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    update_job_status(job_id, 'pending', 0, 'Regrading job queued')
 
-    for (user_id,) in user_submissions:
-        # Get all submissions for this user and quiz
-        user_quiz_submissions = Submission.query.filter_by(
-            user_id=user_id,
-            quiz_id=quiz_id
-        ).all()
-
-        # Create a mapping of question_id to submission
-        submission_map = {
-            sub.question_id: sub for sub in user_quiz_submissions}
-
-        # Revaluate each question
-        for question in questions:
-            if question.id in submission_map:
-                submission = submission_map[question.id]
-
-                # Revaluate the answer
-                is_correct = False
-                user_answer = submission.answer
-                correct_answer = question.correct_answer
-
-                if question.question_type == 'MCQ':
-                    # For MCQ, check if selected option matches correct option
-                    if isinstance(user_answer, list) and len(user_answer) > 0:
-                        is_correct = user_answer[0] == correct_answer[0]
-
-                elif question.question_type == 'MSQ':
-                    # For MSQ, check if all selected options match correct options
-                    if isinstance(user_answer, list) and isinstance(correct_answer, list):
-                        user_set = set(user_answer)
-                        correct_set = set(correct_answer)
-                        is_correct = user_set == correct_set
-
-                elif question.question_type == 'NAT':
-                    # For NAT, check if numeric answer matches
-                    if isinstance(user_answer, list) and len(user_answer) > 0 and len(correct_answer) > 0:
-                        try:
-                            user_num = float(user_answer[0])
-                            correct_num = float(correct_answer[0])
-                            # Allow small floating point differences
-                            is_correct = abs(user_num - correct_num) < 0.01
-                        except (ValueError, TypeError):
-                            is_correct = False
-
-                # Update the submission
-                submission.is_correct = is_correct
-
-        db.session.commit()
-
-    # Clear relevant caches
-    current_app.cache.delete(f'quiz_{quiz_id}_results')
-    current_app.cache.delete(f'quiz_{quiz_id}_stats')
+    try:
+        # Import here to avoid circular imports
+        from app.services.celery_tasks import revaluate_quiz_task
+        revaluate_quiz_task.delay(quiz_id, job_id)
+        return job_id, False
+    except Exception as e:
+        # Broker unavailable, fall back to regrading inline
+        current_app.logger.warning(
+            f"Could not queue regrading for quiz {quiz_id}: {str(e)}")
 
-    # Clear user-specific caches for all affected users
-    for (user_id,) in user_submissions:
-        current_app.cache.delete(f'user_{user_id}_quiz_stats')
-        current_app.cache.delete(f'user_{user_id}_submissions')
+    try:
+        revaluate_quiz_submissions(quiz_id, job_id=job_id)
+    except Exception as e:
+        update_job_status(job_id, 'failed', 0, f'Regrading failed: {str(e)}')
+        raise
+    return job_id, True
 
 
 class CourseResource(Resource):
@@ -96,7 +59,7 @@ class CourseResource(Resource):
         db.session.commit()
 
         # Clear courses cache
-        current_app.cache.delete('admin_courses_list')
+        invalidate_content_cache()
 
         return {
             'message': 'Course created successfully',
@@ -109,6 +72,7 @@ class CourseResource(Resource):
 
     @jwt_required()
     @admin_required
+    @cache_result('admin_courses_list', timeout=300, query_args=('detailed', 'search'))
     def get(self):
         from flask import request
 
@@ -116,13 +80,6 @@ class CourseResource(Resource):
         detailed = request.args.get('detailed', 'false').lower() == 'true'
         search_query = request.args.get('search', '').lower()
 
-        # Try to get from cache first
-        cache_key_name = f'admin_courses_list_{"detailed" if detailed else "simple"}_{search_query}'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
         courses_query = Course.query
         if search_query:
             courses_query = courses_query.filter(
@@ -196,8 +153,6 @@ class CourseResource(Resource):
                 ]
             }
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
@@ -283,18 +238,24 @@ class CourseDetailResource(Resource):
                 new_chapter_ids.add(new_chapter.id)
 
         # Delete chapters that were removed
-        chapters_to_delete = existing_chapter_ids - new_chapter_ids
-        for chapter_id in chapters_to_delete:
-            chapter = Chapter.query.get(chapter_id)
-            if chapter:
-                db.session.delete(chapter)
+        chapters_to_delete = [
+            chapter for chapter in (Chapter.query.get(chapter_id)
+                                    for chapter_id in existing_chapter_ids - new_chapter_ids)
+            if chapter
+        ]
+        removed_quiz_ids = [quiz.id for chapter in chapters_to_delete for quiz in chapter.quizzes]
+
+        # Attempts go first, the monthly rollups are refreshed without them
+        remove_quiz_activity(removed_quiz_ids)
+        for chapter in chapters_to_delete:
+            db.session.delete(chapter)
 
         db.session.commit()
+        for quiz_id in removed_quiz_ids:
+            bump_answer_key_version(quiz_id)
 
-        # Clear caches
-        current_app.cache.delete('admin_courses_list_detailed_')
-        current_app.cache.delete('admin_courses_list_simple_')
-        current_app.cache.delete(f'course_{course_id}_chapters')
+        # One generation bump covers every course, chapter and public listing
+        invalidate_content_cache()
 
         return {
             'message': 'Course updated successfully',
@@ -323,7 +284,7 @@ class CourseDetailResource(Resource):
         db.session.commit()
 
         # Clear cache
-        current_app.cache.delete('admin_courses_list')
+        invalidate_content_cache()
 
         return {
             'message': 'Course updated successfully',
@@ -341,11 +302,18 @@ class CourseDetailResource(Resource):
         if not course:
             return {'message': 'Course not found'}, 404
 
+        quiz_ids = [row[0] for row in db.session.query(Quiz.id).join(Chapter).filter(
+            Chapter.course_id == course_id).all()]
+        # Attempts go first, the monthly rollups are refreshed without them
+        remove_quiz_activity(quiz_ids)
         db.session.delete(course)
         db.session.commit()
+        for quiz_id in quiz_ids:
+            bump_answer_key_version(quiz_id)
 
-        # Clear cache
-        current_app.cache.delete('admin_courses_list')
+        # Clear cache, the cascade removed quizzes that may still be cached
+        invalidate_content_cache()
+        invalidate_quizzes_cache(quiz_ids)
 
         return {'message': 'Course deleted successfully'}
 
@@ -374,8 +342,7 @@ class ChapterResource(Resource):
         db.session.commit()
 
         # Clear related caches
-        current_app.cache.delete('admin_courses_list')
-        current_app.cache.delete(f'course_{args["course_id"]}_chapters')
+        invalidate_content_cache()
 
         return {
             'message': 'Chapter created successfully',
@@ -407,8 +374,7 @@ class ChapterDetailResource(Resource):
         db.session.commit()
 
         # Clear caches
-        current_app.cache.delete('admin_courses_list')
-        current_app.cache.delete(f'course_{chapter.course_id}_chapters')
+        invalidate_content_cache()
 
         return {
             'message': 'Chapter updated successfully',
@@ -427,13 +393,17 @@ class ChapterDetailResource(Resource):
         if not chapter:
             return {'message': 'Chapter not found'}, 404
 
-        course_id = chapter.course_id
+        quiz_ids = [quiz.id for quiz in chapter.quizzes]
+        # Attempts go first, the monthly rollups are refreshed without them
+        remove_quiz_activity(quiz_ids)
         db.session.delete(chapter)
         db.session.commit()
+        for quiz_id in quiz_ids:
+            bump_answer_key_version(quiz_id)
 
-        # Clear caches
-        current_app.cache.delete('admin_courses_list')
-        current_app.cache.delete(f'course_{course_id}_chapters')
+        # Clear caches, the cascade removed quizzes that may still be cached
+        invalidate_content_cache()
+        invalidate_quizzes_cache(quiz_ids)
 
         return {'message': 'Chapter deleted successfully'}
 
@@ -506,13 +476,11 @@ class QuizResource(Resource):
             created_questions.append(question)
 
         db.session.commit()
+        bump_answer_key_version(quiz.id)
 
-        # Clear caches
-        current_app.cache.delete(f'chapter_{data["chapter_id"]}_quizzes')
-        current_app.cache.delete(
-            f'public_chapter_{data["chapter_id"]}_quizzes')
-        current_app.cache.delete('upcoming_quizzes')
-        current_app.cache.delete('open_quizzes')
+        # Also drops any negative entries cached for the new quiz id
+        invalidate_quiz_cache(quiz.id, quiz.chapter_id)
+        invalidate_content_cache()
 
         return {
             'message': 'Quiz created successfully',
@@ -630,29 +598,36 @@ class QuizDetailResource(Resource):
             created_questions.append(question)
 
         db.session.commit()
+        # Questions were replaced, regrading must not reuse the old answer key
+        bump_answer_key_version(quiz_id)
 
         # Perform revaluation if needed
+        revaluation_job_id = None
         if needs_revaluation:
             try:
-                revaluate_quiz_submissions(quiz_id)
-                message = 'Quiz updated successfully and submissions revaluated'
+                revaluation_job_id, completed = schedule_quiz_revaluation(
+                    quiz_id)
+                if completed:
+                    message = 'Quiz updated successfully and submissions revaluated'
+                else:
+                    message = 'Quiz updated successfully, submissions are being revaluated'
             except Exception as e:
                 current_app.logger.error(
                     f"Revaluation failed for quiz {quiz_id}: {str(e)}")
                 message = 'Quiz updated successfully but revaluation failed'
         else:
+            # Questions were replaced, keep attempt scores consistent
+            rebuild_quiz_attempts(quiz_id)
+            db.session.commit()
             message = 'Quiz updated successfully'
 
-        # Clear caches
-        current_app.cache.delete(f'chapter_{quiz.chapter_id}_quizzes')
-        current_app.cache.delete(f'public_chapter_{quiz.chapter_id}_quizzes')
-        current_app.cache.delete('upcoming_quizzes')
-        current_app.cache.delete('open_quizzes')
-        current_app.cache.delete(f'quiz_{quiz_id}_details')
-        current_app.cache.delete(f'quiz_{quiz_id}_questions_user')
+        # Generation bumps, constant cost however many keys were cached
+        invalidate_quiz_cache(quiz_id, quiz.chapter_id)
+        invalidate_content_cache()
 
         return {
             'message': message,
+            'revaluation_job_id': revaluation_job_id,
             'quiz': {
                 'id': quiz.id,
                 'chapter_id': quiz.chapter_id,
@@ -673,14 +648,16 @@ class QuizDetailResource(Resource):
             return {'message': 'Quiz not found'}, 404
 
         chapter_id = quiz.chapter_id
+        # Attempts go first, the monthly rollups are refreshed without them
+        remove_quiz_activity([quiz_id])
         db.session.delete(quiz)
         db.session.commit()
+        # SQLite can hand a deleted quiz's id to the next quiz created
+        bump_answer_key_version(quiz_id)
 
-        # Clear caches
-        current_app.cache.delete(f'chapter_{chapter_id}_quizzes')
-        current_app.cache.delete('upcoming_quizzes')
-        current_app.cache.delete('open_quizzes')
-        current_app.cache.delete(f'quiz_{quiz_id}_details')
+        # Clear caches, including the cached access info for the quiz
+        invalidate_quiz_cache(quiz_id, chapter_id)
+        invalidate_content_cache()
 
         return {'message': 'Quiz deleted successfully'}
 
@@ -715,10 +692,14 @@ class QuestionResource(Resource):
 
         db.session.add(question)
         db.session.commit()
+        bump_answer_key_version(question.quiz_id)
 
         # Clear quiz cache
-        current_app.cache.delete(f'quiz_{args["quiz_id"]}_questions')
-        current_app.cache.delete(f'quiz_{args["quiz_id"]}_details')
+        current_app.cache.delete_many([
+            f'quiz_{args["quiz_id"]}_questions_user',
+            f'quiz_{args["quiz_id"]}_metadata',
+            f'quiz_{args["quiz_id"]}_details'
+        ])
 
         return {
             'message': 'Question created successfully',
@@ -757,11 +738,16 @@ class QuestionDetailResource(Resource):
         question.correct_answer = args['correct_answer']
         question.marks = args['marks']
 
+        rebuild_quiz_attempts(question.quiz_id)
         db.session.commit()
+        bump_answer_key_version(question.quiz_id)
 
         # Clear caches
-        current_app.cache.delete(f'quiz_{question.quiz_id}_questions')
-        current_app.cache.delete(f'quiz_{question.quiz_id}_details')
+        current_app.cache.delete_many([
+            f'quiz_{question.quiz_id}_questions_user',
+            f'quiz_{question.quiz_id}_metadata',
+            f'quiz_{question.quiz_id}_details'
+        ])
 
         return {
             'message': 'Question updated successfully',
@@ -784,11 +770,17 @@ class QuestionDetailResource(Resource):
 
         quiz_id = question.quiz_id
         db.session.delete(question)
+        db.session.flush()
+        rebuild_quiz_attempts(quiz_id)
         db.session.commit()
+        bump_answer_key_version(quiz_id)
 
         # Clear caches
-        current_app.cache.delete(f'quiz_{quiz_id}_questions')
-        current_app.cache.delete(f'quiz_{quiz_id}_details')
+        current_app.cache.delete_many([
+            f'quiz_{quiz_id}_questions_user',
+            f'quiz_{quiz_id}_metadata',
+            f'quiz_{quiz_id}_details'
+        ])
 
         return {'message': 'Question deleted successfully'}
 
@@ -870,148 +862,137 @@ class SearchQuizzesResource(Resource):
         }
 
 
+def compute_dashboard_stats():
+    # Get basic counts
+    total_users = User.query.filter_by(role='user').count()
+    total_admins = User.query.filter_by(role='admin').count()
+    total_courses = Course.query.count()
+    total_chapters = Chapter.query.count()
+    total_quizzes = Quiz.query.count()
+    total_questions = Question.query.count()
+
+    # Count unique quiz attempts (unique user-quiz combinations)
+    total_quiz_attempts = db.session.query(
+        Submission.user_id,
+        Submission.quiz_id
+    ).distinct().count()
+
+    # Recent activity (last 7 days) - also count unique attempts
+    from datetime import datetime, timedelta
+    week_ago = datetime.now() - timedelta(days=7)
+    recent_quiz_attempts = db.session.query(
+        Submission.user_id,
+        Submission.quiz_id
+    ).filter(
+        Submission.timestamp >= week_ago
+    ).distinct().count()
+
+    # User engagement stats
+    subscribed_users = db.session.query(
+        User.id).join(Subscription).distinct().count()
+    subscription_rate = (subscribed_users /
+                         total_users * 100) if total_users > 0 else 0
+
+    result = {
+        'stats': {
+            'users': {
+                'total': total_users,
+                'admins': total_admins,
+                'subscribed': subscribed_users,
+                'subscription_rate': round(subscription_rate, 2)
+            },
+            'content': {
+                'courses': total_courses,
+                'chapters': total_chapters,
+                'quizzes': total_quizzes,
+                'questions': total_questions
+            },
+            'activity': {
+                'total_submissions': total_quiz_attempts,
+                'recent_submissions': recent_quiz_attempts
+            }
+        }
+    }
+    return result
+
+
 class DashboardStatsResource(Resource):
     @jwt_required()
     @admin_required
     def get(self):
-        cache_key_name = 'admin_dashboard_stats'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
-        # Get basic counts
-        total_users = User.query.filter_by(role='user').count()
-        total_admins = User.query.filter_by(role='admin').count()
-        total_courses = Course.query.count()
-        total_chapters = Chapter.query.count()
-        total_quizzes = Quiz.query.count()
-        total_questions = Question.query.count()
-
-        # Count unique quiz attempts (unique user-quiz combinations)
-        total_quiz_attempts = db.session.query(
-            Submission.user_id,
-            Submission.quiz_id
-        ).distinct().count()
-
-        # Recent activity (last 7 days) - also count unique attempts
-        from datetime import datetime, timedelta
-        week_ago = datetime.now() - timedelta(days=7)
-        recent_quiz_attempts = db.session.query(
-            Submission.user_id,
-            Submission.quiz_id
-        ).filter(
-            Submission.timestamp >= week_ago
-        ).distinct().count()
-
-        # User engagement stats
-        subscribed_users = db.session.query(
-            User.id).join(Subscription).distinct().count()
-        subscription_rate = (subscribed_users /
-                             total_users * 100) if total_users > 0 else 0
-
-        result = {
-            'stats': {
-                'users': {
-                    'total': total_users,
-                    'admins': total_admins,
-                    'subscribed': subscribed_users,
-                    'subscription_rate': round(subscription_rate, 2)
-                },
-                'content': {
-                    'courses': total_courses,
-                    'chapters': total_chapters,
-                    'quizzes': total_quizzes,
-                    'questions': total_questions
-                },
-                'activity': {
-                    'total_submissions': total_quiz_attempts,
-                    'recent_submissions': recent_quiz_attempts
-                }
-            }
+        # Cache for 10 minutes, served stale while one worker refreshes
+        return current_app.cache.get_or_compute(
+            'admin_dashboard_stats', compute_dashboard_stats, timeout=600)
+
+
+def compute_dashboard_charts():
+    from datetime import datetime, timedelta
+
+    # User signups over time (last 30 days)
+    thirty_days_ago = datetime.now() - timedelta(days=30)
+    user_signups = db.session.query(
+        func.date(User.created_at).label('date'),
+        func.count(User.id).label('count')
+    ).filter(
+        User.created_at >= thirty_days_ago,
+        User.role == 'user'
+    ).group_by(func.date(User.created_at)).all()
+
+    # Quiz submission volume by day (last 30 days)
+    submission_volume = db.session.query(
+        func.date(Submission.timestamp).label('date'),
+        func.count(Submission.id).label('count')
+    ).filter(
+        Submission.timestamp >= thirty_days_ago
+    ).group_by(func.date(Submission.timestamp)).all()
+
+    # Course popularity (submission counts)
+    course_popularity = db.session.query(
+        Course.name,
+        func.count(Submission.id).label('submissions')
+    ).select_from(Course).join(Chapter).join(Quiz).join(Submission).group_by(Course.id, Course.name).all()
+
+    # User engagement data
+    total_users = User.query.filter_by(role='user').count()
+    subscribed_users = db.session.query(
+        User.id).join(Subscription).distinct().count()
+    unsubscribed_users = total_users - subscribed_users
+
+    result = {
+        'user_signups': [
+            {'date': str(item.date), 'count': item.count}
+            for item in user_signups
+        ],
+        'submission_volume': [
+            {'date': str(item.date), 'count': item.count}
+            for item in submission_volume
+        ],
+        'course_popularity': [
+            {'course': item.name, 'submissions': item.submissions}
+            for item in course_popularity
+        ],
+        'user_engagement': {
+            'subscribed': subscribed_users,
+            'unsubscribed': unsubscribed_users
         }
-
-        # Cache for 10 minutes
-        current_app.cache.set(cache_key_name, result, timeout=600)
-        return result
+    }
+    return result
 
 
 class DashboardChartsResource(Resource):
     @jwt_required()
     @admin_required
     def get(self):
-        cache_key_name = 'admin_dashboard_charts'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
-        from datetime import datetime, timedelta
-
-        # User signups over time (last 30 days)
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        user_signups = db.session.query(
-            func.date(User.created_at).label('date'),
-            func.count(User.id).label('count')
-        ).filter(
-            User.created_at >= thirty_days_ago,
-            User.role == 'user'
-        ).group_by(func.date(User.created_at)).all()
-
-        # Quiz submission volume by day (last 30 days)
-        submission_volume = db.session.query(
-            func.date(Submission.timestamp).label('date'),
-            func.count(Submission.id).label('count')
-        ).filter(
-            Submission.timestamp >= thirty_days_ago
-        ).group_by(func.date(Submission.timestamp)).all()
-
-        # Course popularity (submission counts)
-        course_popularity = db.session.query(
-            Course.name,
-            func.count(Submission.id).label('submissions')
-        ).select_from(Course).join(Chapter).join(Quiz).join(Submission).group_by(Course.id, Course.name).all()
-
-        # User engagement data
-        total_users = User.query.filter_by(role='user').count()
-        subscribed_users = db.session.query(
-            User.id).join(Subscription).distinct().count()
-        unsubscribed_users = total_users - subscribed_users
-
-        result = {
-            'user_signups': [
-                {'date': str(item.date), 'count': item.count}
-                for item in user_signups
-            ],
-            'submission_volume': [
-                {'date': str(item.date), 'count': item.count}
-                for item in submission_volume
-            ],
-            'course_popularity': [
-                {'course': item.name, 'submissions': item.submissions}
-                for item in course_popularity
-            ],
-            'user_engagement': {
-                'subscribed': subscribed_users,
-                'unsubscribed': unsubscribed_users
-            }
-        }
-
-        # Cache for 15 minutes
-        current_app.cache.set(cache_key_name, result, timeout=900)
-        return result
+        # Cache for 15 minutes, served stale while one worker refreshes
+        return current_app.cache.get_or_compute(
+            'admin_dashboard_charts', compute_dashboard_charts, timeout=900)
 
 
 class CourseAnalyticsResource(Resource):
     @jwt_required()
     @admin_required
+    @cache_result('admin_course_analytics_{course_id}', timeout=1800)
     def get(self, course_id):
-        cache_key_name = f'admin_course_analytics_{course_id}'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
         course = Course.query.get_or_404(course_id)
 
         # Chapter quiz attempt rates
@@ -1058,26 +1039,18 @@ class CourseAnalyticsResource(Resource):
             ]
         }
 
-        # Cache for 30 minutes
-        current_app.cache.set(cache_key_name, result, timeout=1800)
         return result
 
 
 class UsersManagementResource(Resource):
     @jwt_required()
     @admin_required
+    @cache_result('admin_users_management', timeout=300, query_args=('search', 'page', 'per_page'))
     def get(self):
         search_query = request.args.get('search', '').strip()
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
 
-        # Build cache key based on search parameters
-        cache_key_name = f'admin_users_management_{search_query}_{page}_{per_page}'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
         # Start with base query (exclude admin users)
         query = User.query.filter_by(role='user')
 
@@ -1159,8 +1132,6 @@ class UsersManagementResource(Resource):
             'has_prev': page > 1
         }
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
     @jwt_required()
@@ -1190,11 +1161,10 @@ class UsersManagementResource(Resource):
             # 3. Finally delete the user
             db.session.delete(user)
             db.session.commit()
+            revoke_user_tokens(args['user_id'])
 
             # Clear all related caches
-            current_app.cache.delete_pattern('admin_users_management*')
-            current_app.cache.delete('admin_dashboard_stats')
-            current_app.cache.delete('admin_charts_data')
+            invalidate_content_cache()
 
             current_app.logger.info(
                 f"Admin deleted user {user.username} (ID: {user.id}). "
@@ -1,7 +1,7 @@
 from app.models import User, db
 from flask import request, current_app
 from flask_restful import Resource, reqparse
-from app.utils import hash_password, verify_password, get_current_user
+from app.utils import hash_password, verify_password, get_current_user, get_token_version, token_issued_ms
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 
 
@@ -106,8 +106,15 @@ class LoginResource(Resource):
 
         print("Login successful, creating token...")
 
-        # Create access token with string identity
-        access_token = create_access_token(identity=str(user.id))
+        # Create access token with string identity, role and token version
+        # claims let the auth decorators authorize without a lookup
+        access_token = create_access_token(
+            identity=str(user.id),
+            additional_claims={
+                'role': user.role,
+                'ver': get_token_version(),
+                'iat_ms': token_issued_ms()
+            })
 
         return {
             'message': 'Login successful',
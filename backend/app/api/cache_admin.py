@@ -30,7 +30,7 @@ class CacheClearResource(Resource):
         if args['type'] == 'all':
             # Clear all cache
             try:
-                current_app.cache.redis_client.flushdb()
+                current_app.cache.clear_all()
                 cleared = "all"
             except Exception as e:
                 return {'message': f'Error clearing cache: {e}'}, 500
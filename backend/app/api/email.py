@@ -1,8 +1,9 @@
+from datetime import datetime
 from flask import current_app
-from flask_restful import Resource, reqparse
+from flask_restful import Resource, inputs, reqparse
 from flask_jwt_extended import jwt_required
-from app.utils import user_required, admin_required, get_current_user
-from app.models import User, Quiz, Submission, db
+from app.utils import user_required, admin_required, get_current_user, update_job_status
+from app.models import User, Quiz, QuizAttempt
 
 
 class SendCertificateEmailResource(Resource):
@@ -39,6 +40,29 @@ class SendCertificateEmailResource(Resource):
             }, 500
 
 
+def schedule_bulk_certificates(quiz_id, resend=False):
+    job_id = f"bulk_certificates_{quiz_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    update_job_status(job_id, 'pending', 0, 'Bulk certificate job queued')
+
+    try:
+        # Import here to avoid circular imports
+        from app.services.celery_tasks import issue_bulk_certificates_task
+        issue_bulk_certificates_task.delay(quiz_id, job_id, resend)
+        return job_id, False
+    except Exception as e:
+        # Broker unavailable, fall back to issuing inline
+        current_app.logger.warning(
+            f"Could not queue bulk certificates for quiz {quiz_id}: {str(e)}")
+
+    try:
+        from app.services.bulk_certificates import issue_quiz_certificates
+        issue_quiz_certificates(quiz_id, job_id=job_id, resend=resend)
+    except Exception as e:
+        update_job_status(job_id, 'failed', 0, f'Bulk certificates failed: {str(e)}')
+        raise
+    return job_id, True
+
+
 class BulkCertificateEmailResource(Resource):
     @jwt_required()
     @admin_required
@@ -46,49 +70,36 @@ class BulkCertificateEmailResource(Resource):
         parser = reqparse.RequestParser()
         parser.add_argument('quiz_id', type=int,
                             required=True, help='Quiz ID is required')
+        parser.add_argument('resend', type=inputs.boolean, default=False,
+                            help='Email users who already received this certificate')
         args = parser.parse_args()
 
         quiz_id = args['quiz_id']
 
         try:
-            from app.services.email_service import get_email_service
-            email_service = get_email_service()
-
-            # Get all users who completed this quiz
-            completed_users = db.session.query(Submission.user_id).filter_by(
-                quiz_id=quiz_id
-            ).distinct().all()
+            total_users = QuizAttempt.query.filter(
+                QuizAttempt.quiz_id == quiz_id,
+                QuizAttempt.completed_at.isnot(None)
+            ).count()
 
-            user_ids = [u[0] for u in completed_users]
-
-            if not user_ids:
+            if not total_users:
                 return {
                     'message': 'No users have completed this quiz'
                 }, 404
 
-            # Send emails to all users
-            success_count = 0
-            failed_count = 0
-
-            for user_id in user_ids:
-                try:
-                    success = email_service.send_certificate_email(
-                        user_id, quiz_id)
-                    if success:
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                except Exception as e:
-                    current_app.logger.error(
-                        f"Failed to send email to user {user_id}: {e}")
-                    failed_count += 1
+            job_id, completed = schedule_bulk_certificates(
+                quiz_id, resend=args['resend'])
 
-            return {
-                'message': f'Bulk email completed',
-                'total_users': len(user_ids),
-                'emails_sent': success_count,
-                'failed_emails': failed_count
+            response = {
+                'message': 'Bulk email completed' if completed else 'Bulk email queued',
+                'job_id': job_id,
+                'status_url': f'/api/export/status/{job_id}',
+                'total_users': total_users
             }
+            if completed:
+                response['job'] = current_app.cache.get(f'job_status_{job_id}')
+                return response
+            return response, 202
 
         except ImportError:
             return {
@@ -1,3 +1,4 @@
+import os
 import io
 from flask_jwt_extended import jwt_required
 from flask_restful import Resource, reqparse
@@ -48,24 +49,22 @@ def download_certificate(quiz_id):
         return {'message': message}, 400
 
     try:
-        # Generate PDF bytes
-        pdf_bytes = cert_generator.generate_certificate_pdf(user.id, quiz_id)
-        certificate_data = cert_generator.get_certificate_data(
+        # Rendered once per certificate, repeat downloads stream the stored file
+        file_path, certificate_data = cert_generator.get_certificate_file(
             user.id, quiz_id)
 
-        # Create a file-like object from bytes
-        pdf_buffer = io.BytesIO(pdf_bytes)
-        pdf_buffer.seek(0)
-
         # Generate filename
         filename = f"certificate_{certificate_data['certificate_id']}.pdf"
 
         # Return PDF file
         return send_file(
-            pdf_buffer,
+            file_path,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            conditional=True,
+            # The file name is its content hash, unlike the mtime it is stable
+            etag=os.path.splitext(os.path.basename(file_path))[0]
         )
 
     except Exception as e:
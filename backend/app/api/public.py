@@ -1,21 +1,17 @@
 from flask import current_app, request
 from flask_restful import Resource
 from datetime import datetime
-from app.utils import get_user_quiz_stats, categorize_quizzes
-from app.models import User, Submission, Quiz, Question, Course, Chapter, db
+from app.cache import cache_result
+from app.utils import get_user_quiz_stats, categorize_quizzes, cache_key
+from app.models import User, Quiz, Course, Chapter
 
 
 class PublicProfileResource(Resource):
+    @cache_result('public_profile_{username}', timeout=3600)
     def get(self, username):
         if username.startswith('@'):
             username = username[1:]
 
-        cache_key_name = f'public_profile_{username}'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
         user = User.query.filter_by(username=username).first()
         if not user:
             return {'message': 'User not found'}, 404
@@ -25,32 +21,14 @@ class PublicProfileResource(Resource):
         quiz_scores = stats.get('quiz_scores', [])
         top_performances = sorted(
             quiz_scores,
-            key=lambda x: x['score']['percentage'],
+            key=lambda x: x['score'],
             reverse=True
         )[:5]
 
         total_marks_obtained = sum(
-            score['score']['obtained_marks'] for score in quiz_scores)
+            score['obtained_marks'] for score in quiz_scores)
         total_marks_possible = sum(
-            score['score']['total_marks'] for score in quiz_scores)
-
-        # Calculate total time spent
-        submissions = Submission.query.filter_by(user_id=user.id).all()
-        total_time_spent = 0
-        for submission in submissions:
-            if submission.time_duration:
-                try:
-                    time_parts = submission.time_duration.split(':')
-                    if len(time_parts) == 3:  # HH:MM:SS format
-                        hours = int(time_parts[0])
-                        minutes = int(time_parts[1])
-                        duration_minutes = hours * 60 + minutes
-                        total_time_spent += duration_minutes
-                    elif len(time_parts) == 2:  # MM:SS format
-                        minutes = int(time_parts[0])
-                        total_time_spent += minutes
-                except (ValueError, IndexError):
-                    continue
+            score['total_marks'] for score in quiz_scores)
 
         result = {
             'user': {
@@ -64,101 +42,94 @@ class PublicProfileResource(Resource):
                 'overall_accuracy': stats['overall_accuracy'],
                 'total_marks_obtained': total_marks_obtained,
                 'total_marks_possible': total_marks_possible,
-                'total_time_spent': total_time_spent
+                'total_allotted_minutes': stats['total_allotted_minutes']
             },
             'top_performances': [
                 {
                     'quiz_title': perf['quiz_title'],
-                    'percentage': perf['score']['percentage'],
-                    'obtained_marks': perf['score']['obtained_marks'],
-                    'total_marks': perf['score']['total_marks']
+                    'percentage': perf['score'],
+                    'obtained_marks': perf['obtained_marks'],
+                    'total_marks': perf['total_marks']
                 }
                 for perf in top_performances
             ]
         }
 
-        # Cache for 1 hour
-        current_app.cache.set(cache_key_name, result, timeout=3600)
         return result
 
 
-class PublicCoursesResource(Resource):
-    def get(self):
-        cache_key_name = 'public_courses_list'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
+def compute_public_courses(search_query):
+    courses = Course.query.all()
 
-        # Get search query if provided
-        search_query = request.args.get('search', '').lower()
+    result_courses = []
+    for course in courses:
+        # Filter by search if provided
+        if search_query and search_query not in course.name.lower():
+            continue
 
-        courses = Course.query.all()
+        course_data = {
+            'id': course.id,
+            'name': course.name,
+            'description': course.description,
+            'chapters': []
+        }
 
-        result_courses = []
-        for course in courses:
-            # Filter by search if provided
-            if search_query and search_query not in course.name.lower():
-                continue
+        for chapter in course.chapters:
+            # Get quiz counts by type using new categorization
+            all_quizzes = chapter.quizzes
+            categorized = categorize_quizzes(all_quizzes, datetime.now())
+
+            live_quizzes = categorized['live']
+            upcoming_quizzes = categorized['upcoming']
+            general_quizzes = categorized['general']
+            ended_quizzes = categorized['ended']
+
+            # Get next upcoming quiz
+            next_quiz = None
+            if upcoming_quizzes:
+                next_quiz_obj = min(
+                    upcoming_quizzes, key=lambda x: x.date_of_quiz)
+                next_quiz = {
+                    'date': next_quiz_obj.date_of_quiz.isoformat(),
+                    'title': next_quiz_obj.title
+                }
 
-            course_data = {
-                'id': course.id,
-                'name': course.name,
-                'description': course.description,
-                'chapters': []
+            chapter_data = {
+                'id': chapter.id,
+                'name': chapter.name,
+                'description': chapter.description,
+                'quiz_counts': {
+                    'total': len(all_quizzes),
+                    'live': len(live_quizzes),
+                    'upcoming': len(upcoming_quizzes),
+                    'general': len(general_quizzes)
+                },
+                'next_upcoming_quiz': next_quiz
             }
+            course_data['chapters'].append(chapter_data)
 
-            for chapter in course.chapters:
-                # Get quiz counts by type using new categorization
-                all_quizzes = chapter.quizzes
-                categorized = categorize_quizzes(all_quizzes, datetime.now())
-
-                live_quizzes = categorized['live']
-                upcoming_quizzes = categorized['upcoming']
-                general_quizzes = categorized['general']
-                ended_quizzes = categorized['ended']
-
-                # Get next upcoming quiz
-                next_quiz = None
-                if upcoming_quizzes:
-                    next_quiz_obj = min(
-                        upcoming_quizzes, key=lambda x: x.date_of_quiz)
-                    next_quiz = {
-                        'date': next_quiz_obj.date_of_quiz.isoformat(),
-                        'title': next_quiz_obj.title
-                    }
-
-                chapter_data = {
-                    'id': chapter.id,
-                    'name': chapter.name,
-                    'description': chapter.description,
-                    'quiz_counts': {
-                        'total': len(all_quizzes),
-                        'live': len(live_quizzes),
-                        'upcoming': len(upcoming_quizzes),
-                        'general': len(general_quizzes)
-                    },
-                    'next_upcoming_quiz': next_quiz
-                }
-                course_data['chapters'].append(chapter_data)
+        result_courses.append(course_data)
 
-            result_courses.append(course_data)
+    return {'courses': result_courses}
 
-        result = {'courses': result_courses}
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
-        return result
+class PublicCoursesResource(Resource):
+    def get(self):
+        # Get search query if provided
+        search_query = request.args.get('search', '').lower()
 
+        cache_key_name = 'public_courses_list'
+        if search_query:
+            cache_key_name = f'public_courses_list_{cache_key(search_query)}'
 
-class PublicChapterQuizzesResource(Resource):
-    def get(self, course_id, chapter_id):
-        cache_key_name = f'public_chapter_{chapter_id}_quizzes'
-        cached_result = current_app.cache.get(cache_key_name)
+        # Cache for 5 minutes, served stale while one worker refreshes
+        return current_app.cache.get_or_compute(
+            cache_key_name, lambda: compute_public_courses(search_query), timeout=300)
 
-        if cached_result:
-            return cached_result
 
+class PublicChapterQuizzesResource(Resource):
+    @cache_result('public_chapter_{chapter_id}_quizzes_{course_id}', timeout=300)
+    def get(self, course_id, chapter_id):
         chapter = Chapter.query.filter_by(
             id=chapter_id, course_id=course_id).first()
         if not chapter:
@@ -206,8 +177,6 @@ class PublicChapterQuizzesResource(Resource):
             'quizzes': categorized_quizzes
         }
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
@@ -2,21 +2,58 @@ from flask import current_app
 from datetime import datetime, timedelta
 from flask_jwt_extended import jwt_required
 from flask_restful import Resource, reqparse
-from app.cache import invalidate_user_cache, invalidate_quiz_cache
+from redis.exceptions import RedisError
+from app.cache import cache_result, invalidate_user_cache, invalidate_quiz_cache
+from app.grading import get_answer_key
+from app.services.certificate_mailer import queue_certificate_email
+from app.services.quiz_session import get_quiz_session_buffer
 from app.models import Quiz, Question, Submission, Subscription, Chapter, Course, db
-from app.utils import user_required, get_current_user, validate_quiz_access, format_quiz_result
+from app.utils import user_required, get_current_user, get_current_identity, get_quiz_access_grant, check_quiz_access_grant, quiz_access_key, validate_quiz_access, format_quiz_result, update_quiz_attempt, upsert_submissions
+
+
+@cache_result('quiz_{quiz_id}_questions_user', timeout=900)
+def quiz_questions_payload(quiz_id):
+    # Shared by every user, so access checks stay in the resource
+    quiz = db.session.get(Quiz, quiz_id)
+    if quiz is None:
+        return None
+
+    questions = Question.query.filter_by(
+        quiz_id=quiz_id).order_by(Question.id).all()
+
+    result = {
+        'quiz': {
+            'id': quiz.id,
+            'title': quiz.title,
+            'chapter': quiz.chapter.name,
+            'course': quiz.chapter.course.name,
+            'time_duration': quiz.time_duration,
+            'total_questions': len(questions),
+            'total_marks': sum(q.marks for q in questions),
+            'instructions': quiz.remarks
+        },
+        'questions': [
+            {
+                'id': question.id,
+                'question_number': idx + 1,
+                'question_statement': question.question_statement,
+                'question_type': question.question_type,
+                'options': question.options,
+                'marks': question.marks
+            }
+            for idx, question in enumerate(questions)
+        ]
+    }
+
+    return result
 
 
 class UpcomingQuizzesResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_upcoming_quizzes', timeout=300)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_upcoming_quizzes'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         # Get user's subscribed chapters
         subscriptions = Subscription.query.filter_by(
@@ -49,21 +86,15 @@ class UpcomingQuizzesResource(Resource):
             ]
         }
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
 class OpenQuizzesResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_open_quizzes', timeout=180)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_open_quizzes'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         # Get user's subscribed chapters
         subscriptions = Subscription.query.filter_by(
@@ -116,8 +147,6 @@ class OpenQuizzesResource(Resource):
             ]
         }
 
-        # Cache for 3 minutes
-        current_app.cache.set(cache_key_name, result, timeout=180)
         return result
 
 
@@ -125,63 +154,39 @@ class QuizQuestionsResource(Resource):
     @jwt_required()
     @user_required
     def get(self, quiz_id):
-        user = get_current_user()
-
-        # Validate access
-        can_access, message = validate_quiz_access(quiz_id, user.id)
-        if not can_access:
-            return {'message': message}, 403
-
-        # Get quiz to check if it's scheduled
-        quiz = Quiz.query.get(quiz_id)
-        if not quiz:
+        user_id, _ = get_current_identity()
+
+        # A warmed grant settles access and the submitted check, so the herd
+        # at a scheduled start is served without database queries
+        grant = get_quiz_access_grant(quiz_id, user_id)
+        if grant is not None:
+            can_access, message = check_quiz_access_grant(grant)
+            if not can_access:
+                return {'message': message}, 403
+        else:
+            # Validate access
+            can_access, message = validate_quiz_access(quiz_id, user_id)
+            if not can_access:
+                return {'message': message}, 403
+
+            # Get quiz to check if it's scheduled
+            quiz = Quiz.query.get(quiz_id)
+            if not quiz:
+                return {'message': 'Quiz not found'}, 404
+
+            # Check if already submitted (only for scheduled quizzes)
+            if quiz.is_scheduled:
+                existing_submission = Submission.query.filter_by(
+                    user_id=user_id,
+                    quiz_id=quiz_id
+                ).first()
+
+                if existing_submission:
+                    return {'message': 'Quiz already submitted'}, 400
+
+        result = quiz_questions_payload(quiz_id)
+        if result is None:
             return {'message': 'Quiz not found'}, 404
-
-        # Check if already submitted (only for scheduled quizzes)
-        if quiz.is_scheduled:
-            existing_submission = Submission.query.filter_by(
-                user_id=user.id,
-                quiz_id=quiz_id
-            ).first()
-
-            if existing_submission:
-                return {'message': 'Quiz already submitted'}, 400
-
-        cache_key_name = f'quiz_{quiz_id}_questions_user'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
-        questions = Question.query.filter_by(
-            quiz_id=quiz_id).order_by(Question.id).all()
-
-        result = {
-            'quiz': {
-                'id': quiz.id,
-                'title': quiz.title,
-                'chapter': quiz.chapter.name,
-                'course': quiz.chapter.course.name,
-                'time_duration': quiz.time_duration,
-                'total_questions': len(questions),
-                'total_marks': sum(q.marks for q in questions),
-                'instructions': quiz.remarks
-            },
-            'questions': [
-                {
-                    'id': question.id,
-                    'question_number': idx + 1,
-                    'question_statement': question.question_statement,
-                    'question_type': question.question_type,
-                    'options': question.options,
-                    'marks': question.marks
-                }
-                for idx, question in enumerate(questions)
-            ]
-        }
-
-        # Cache for 15 minutes
-        current_app.cache.set(cache_key_name, result, timeout=900)
         return result
 
 
@@ -201,139 +206,87 @@ class QuizSubmitResource(Resource):
                             help='List of answers: [{"question_id": 1, "answer": [0]}, ...]')
         args = parser.parse_args()
 
-        # Get all questions for this quiz
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        question_dict = {q.id: q for q in questions}
-
-        # Get existing submissions for this user and quiz
-        existing_submissions = Submission.query.filter_by(
-            user_id=user.id,
-            quiz_id=quiz_id
-        ).all()
-        existing_by_question = {
-            sub.question_id: sub for sub in existing_submissions}
-
-        # Process answers
-        submissions_to_add = []
-        submissions_to_update = []
-
-        for answer_data in args['answers']:
+        # Autosaved answers count towards the submission
+        session_buffer = get_quiz_session_buffer()
+        answers = args['answers']
+        if session_buffer is not None:
+            try:
+                answers = session_buffer.merge(user.id, quiz_id, answers)
+            except RedisError as e:
+                # State store down: grade the answers as sent, autosaves
+                # made meanwhile went to the database
+                current_app.logger.warning(f"Quiz session buffer unavailable for quiz {quiz_id}: {e}")
+                session_buffer = None
+
+        # Compiled answer key for this quiz
+        answer_key = get_answer_key(quiz_id)
+
+        # One row per question, a repeated question_id keeps the last answer
+        # (Postgres rejects an upsert that touches the same row twice)
+        rows = {}
+        submitted_at = datetime.now()
+
+        for answer_data in answers:
             question_id = answer_data.get('question_id')
             answer = answer_data.get('answer')
 
-            if question_id not in question_dict:
+            if question_id not in answer_key:
                 continue
 
-            question = question_dict[question_id]
+            question_type = answer_key.question_types[question_id]
 
             # Validate answer format based on question type
-            if question.question_type in ['MCQ', 'MSQ']:
+            if question_type in ['MCQ', 'MSQ']:
                 if not isinstance(answer, list):
                     return {'message': f'Answer for question {question_id} must be a list'}, 400
-            elif question.question_type == 'NAT':
+            elif question_type == 'NAT':
                 if not isinstance(answer, (list, int, float, str)):
                     return {'message': f'Invalid answer format for question {question_id}'}, 400
                 if not isinstance(answer, list):
                     answer = [answer]  # Convert to list for consistency
 
-            # Check if answer is correct
-            is_correct = answer == question.correct_answer
-
-            # Update existing submission or create new one
-            if question_id in existing_by_question:
-                submission = existing_by_question[question_id]
-                submission.answer = answer
-                submission.is_correct = is_correct
-                submission.timestamp = datetime.now()
-                submissions_to_update.append(submission)
-            else:
-                submission = Submission(
-                    user_id=user.id,
-                    quiz_id=quiz_id,
-                    question_id=question_id,
-                    answer=answer,
-                    is_correct=is_correct,
-                    timestamp=datetime.now()
-                )
-                submissions_to_add.append(submission)
+            rows[question_id] = {
+                'user_id': user.id,
+                'quiz_id': quiz_id,
+                'question_id': question_id,
+                'answer': answer,
+                'is_correct': answer_key.grade(question_id, answer),
+                'timestamp': submitted_at
+            }
 
-        # Save all submissions
-        if submissions_to_add:
-            db.session.add_all(submissions_to_add)
+        # A single INSERT ... ON CONFLICT DO UPDATE and one commit, instead of
+        # loading every existing submission and updating it row by row
+        upsert_submissions(list(rows.values()))
+        attempt = update_quiz_attempt(user.id, quiz_id)
+        completed_at = attempt.completed_at if attempt else None
         db.session.commit()
 
+        if session_buffer is not None:
+            try:
+                session_buffer.discard(user.id, quiz_id)
+            except RedisError as e:
+                # Left-over answers are older than this submit, and the
+                # flusher never overwrites newer ones
+                current_app.logger.warning(f"Failed to discard quiz session {quiz_id}:{user.id}: {e}")
+
         # Clear relevant caches
         invalidate_user_cache(user.id)
         invalidate_quiz_cache(quiz_id)
 
-        # Always generate certificate and send completion email
-        certificate_info = None
-        try:
-            from app.services.certificate_generator import get_certificate_generator
-            cert_generator = get_certificate_generator()
-
-            if cert_generator:
-                # Always generate certificate data
-                certificate_data = cert_generator.get_certificate_data(
-                    user.id, quiz_id)
-                certificate_info = {
-                    'certificate_available': True,
-                    'certificate_id': certificate_data['certificate_id'],
-                    'download_url': f'/certificate/{quiz_id}/download'
-                }
+        # Certificate rendering and the completion email run on the
+        # certificates Celery queue, the response only carries the job id
+        certificate_job_id = queue_certificate_email(user.id, quiz_id, completed_at)
 
-                # Always send completion email with certificate attachment
-                try:
-                    from app.services.email_service import get_email_service
-                    email_service = get_email_service()
-
-                    # Send email in background with application context
-                    import threading
-                    from flask import current_app
-
-                    # Capture the Flask app instance before threading
-                    app = current_app._get_current_object()
-
-                    def send_completion_email_with_context():
-                        with app.app_context():
-                            email_service.send_certificate_email(
-                                user.id, quiz_id)
-
-                    email_thread = threading.Thread(
-                        target=send_completion_email_with_context)
-                    email_thread.daemon = True
-                    email_thread.start()
-
-                    current_app.logger.info(
-                        f"Quiz completion email with certificate queued for user {user.id}, quiz {quiz_id}")
-
-                except Exception as e:
-                    current_app.logger.error(
-                        f"Failed to queue completion email: {e}")
-            else:
-                current_app.logger.warning(
-                    "Certificate generator not available")
-
-        except ImportError:
-            current_app.logger.info(
-                "Certificate generator not available - WeasyPrint not installed")
-        except Exception as e:
-            current_app.logger.error(
-                f"Certificate generation failed: {e}")
-
-        total_submissions = len(submissions_to_add) + \
-            len(submissions_to_update)
         response_data = {
             'message': 'Quiz submitted successfully',
             'quiz_id': quiz_id,
-            'submitted_answers': total_submissions,
-            'total_questions': len(questions)
+            'submitted_answers': len(rows),
+            'total_questions': len(answer_key),
+            'certificate_available': True,
+            'certificate_job_id': certificate_job_id,
+            'download_url': f'/certificate/{quiz_id}/download'
         }
 
-        # Add certificate info if available
-        if certificate_info:
-            response_data.update(certificate_info)
-
         return response_data
 
 
@@ -341,10 +294,10 @@ class QuizQuestionSubmitResource(Resource):
     @jwt_required()
     @user_required
     def post(self, quiz_id):
-        user = get_current_user()
+        user_id, _ = get_current_identity()
 
         # Validate access
-        can_access, message = validate_quiz_access(quiz_id, user.id)
+        can_access, message = validate_quiz_access(quiz_id, user_id)
         if not can_access:
             return {'message': message}, 403
 
@@ -359,47 +312,51 @@ class QuizQuestionSubmitResource(Resource):
         answer = args['answer']
 
         # Check if question belongs to this quiz
-        question = Question.query.filter_by(
-            id=question_id, quiz_id=quiz_id).first()
-        if not question:
+        answer_key = get_answer_key(quiz_id)
+        if question_id not in answer_key:
             return {'message': 'Question not found'}, 404
 
+        question_type = answer_key.question_types[question_id]
+
         # Validate answer format based on question type
-        if question.question_type in ['MCQ', 'MSQ']:
+        if question_type in ['MCQ', 'MSQ']:
             if not isinstance(answer, list):
                 return {'message': 'Answer must be a list for MCQ/MSQ'}, 400
-        elif question.question_type == 'NAT':
+        elif question_type == 'NAT':
             if not isinstance(answer, list) or len(answer) != 1:
                 return {'message': 'NAT answer must be a single-item list'}, 400
 
         # Check if answer is correct
-        is_correct = answer == question.correct_answer
-
-        # Check if submission already exists for this question
-        existing_submission = Submission.query.filter_by(
-            user_id=user.id,
-            quiz_id=quiz_id,
-            question_id=question_id
-        ).first()
-
-        if existing_submission:
-            # Update existing submission
-            existing_submission.answer = answer
-            existing_submission.is_correct = is_correct
-            existing_submission.timestamp = datetime.now()
-        else:
-            # Create new submission
-            submission = Submission(
-                user_id=user.id,
-                quiz_id=quiz_id,
-                question_id=question_id,
-                answer=answer,
-                is_correct=is_correct,
-                timestamp=datetime.now()
-            )
-            db.session.add(submission)
-
-        db.session.commit()
+        is_correct = answer_key.grade(question_id, answer)
+
+        # Autosave into the session buffer, flushed on final submit or by
+        # the periodic flusher, so answer clicks never hit the database
+        session_buffer = get_quiz_session_buffer()
+        buffered = False
+        if session_buffer is not None:
+            try:
+                session_buffer.record(user_id, quiz_id, question_id, answer)
+                buffered = True
+            except RedisError as e:
+                # State store down, save straight to the database instead
+                current_app.logger.warning(f"Quiz session buffer unavailable for quiz {quiz_id}: {e}")
+
+        if not buffered:
+            # Insert or update the answer in a single statement
+            upsert_submissions([{
+                'user_id': user_id,
+                'quiz_id': quiz_id,
+                'question_id': question_id,
+                'answer': answer,
+                'is_correct': is_correct,
+                'timestamp': datetime.now()
+            }])
+
+            update_quiz_attempt(user_id, quiz_id)
+            db.session.commit()
+
+            # The user now has a submission, so a warmed grant no longer holds
+            current_app.cache.delete(quiz_access_key(quiz_id, user_id))
 
         return {
             'message': 'Answer saved successfully',
@@ -408,9 +365,47 @@ class QuizQuestionSubmitResource(Resource):
         }
 
 
+class QuizSessionResource(Resource):
+    @jwt_required()
+    @user_required
+    def get(self, quiz_id):
+        user_id, _ = get_current_identity()
+
+        can_access, message = validate_quiz_access(quiz_id, user_id)
+        if not can_access:
+            return {'message': message}, 403
+
+        # Lets a client resume after a reload or a crash mid-quiz
+        session_buffer = get_quiz_session_buffer()
+        answers = {}
+        if session_buffer is not None:
+            try:
+                answers = session_buffer.answers(user_id, quiz_id)
+            except RedisError as e:
+                current_app.logger.warning(f"Quiz session buffer unavailable for quiz {quiz_id}: {e}")
+
+        # Answers already persisted, e.g. by the idle flusher, which drops
+        # the buffered copies
+        persisted = db.session.query(
+            Submission.question_id, Submission.answer, Submission.timestamp
+        ).filter_by(user_id=user_id, quiz_id=quiz_id).all()
+        for question_id, answer, answered_at in persisted:
+            answers.setdefault(question_id, (answer, answered_at))
+
+        return {
+            'quiz_id': quiz_id,
+            'answers': [
+                {'question_id': question_id, 'answer': answer,
+                 'answered_at': answered_at.isoformat() if answered_at else None}
+                for question_id, (answer, answered_at) in sorted(answers.items())
+            ]
+        }
+
+
 class QuizResultResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('quiz_{quiz_id}_result_{user_id}', timeout=1800, tags=['user:{user_id}'])
     def get(self, quiz_id):
         user = get_current_user()
 
@@ -423,12 +418,6 @@ class QuizResultResource(Resource):
         if not submission_exists:
             return {'message': 'Quiz not submitted yet'}, 400
 
-        cache_key_name = f'quiz_{quiz_id}_result_{user.id}'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
         # Get quiz and questions
         quiz = Quiz.query.get(quiz_id)
         if not quiz:
@@ -471,21 +460,15 @@ class QuizResultResource(Resource):
             'submission_time': max(s.timestamp for s in submissions).isoformat() if submissions else None
         }
 
-        # Cache for 30 minutes
-        current_app.cache.set(cache_key_name, result, timeout=1800)
         return result
 
 
 class ChapterQuizzesResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_course_{course_id}_chapter_{chapter_id}_quizzes', timeout=300)
     def get(self, course_id, chapter_id):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_chapter_{chapter_id}_quizzes'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         chapter = Chapter.query.filter_by(
             id=chapter_id, course_id=course_id).first()
@@ -570,23 +553,15 @@ class ChapterQuizzesResource(Resource):
             'quizzes': categorized_quizzes
         }
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
 class CourseQuizzesResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_course_{course_id}_quizzes', timeout=180)
     def get(self, course_id):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_course_{course_id}_quizzes'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         course = Course.query.get(course_id)
         if not course:
@@ -671,8 +646,6 @@ class CourseQuizzesResource(Resource):
             'quizzes': categorized_quizzes
         }
 
-        # Cache for 3 minutes
-        current_app.cache.set(cache_key_name, result, timeout=180)
         return result
 
 
@@ -683,6 +656,7 @@ def register_quiz_api(api):
     api.add_resource(QuizQuestionSubmitResource,
                      '/quiz/<int:quiz_id>/submit-answer')
     api.add_resource(QuizSubmitResource, '/quiz/<int:quiz_id>/submit')
+    api.add_resource(QuizSessionResource, '/quiz/<int:quiz_id>/session')
     api.add_resource(QuizResultResource, '/quiz/<int:quiz_id>/result')
     api.add_resource(ChapterQuizzesResource,
                      '/quiz/courses/<int:course_id>/chapters/<int:chapter_id>')
@@ -1,24 +1,96 @@
+import os
 from datetime import datetime
 from flask import current_app
 from flask_jwt_extended import jwt_required
 from flask_restful import Resource, reqparse
 from app.services.report_generator import ReportGenerator
 from app.services.certificate_generator import get_certificate_generator
-from app.cache import invalidate_user_cache, invalidate_quiz_cache
-from app.models import User, Quiz, Question, Submission, Subscription, Chapter, Course, db
-from app.utils import user_required, get_current_user, get_user_quiz_stats, validate_quiz_access, calculate_quiz_score
+from app.cache import cache_result, invalidate_user_cache, invalidate_quiz_cache
+from app.grading import get_answer_key
+from app.services.quiz_session import get_quiz_session_buffer
+from sqlalchemy import func
+from app.models import User, Quiz, QuizAttempt, Question, Submission, Subscription, Chapter, Course, db
+from app.utils import user_required, get_current_user, get_user_quiz_stats, validate_quiz_access, calculate_quiz_score, update_quiz_attempt
+
+
+@cache_result('quiz_{quiz_id}_metadata', timeout=600)
+def quiz_metadata_payload(quiz_id):
+    # Shared by every user, so access checks stay in the resource
+    quiz = Quiz.query.get(quiz_id)
+    if not quiz:
+        return {'message': 'Quiz not found'}, 404
+
+    questions = Question.query.filter_by(quiz_id=quiz_id).all()
+
+    result = {
+        'quiz': {
+            'id': quiz.id,
+            'title': quiz.title,
+            'chapter': quiz.chapter.name,
+            'course': quiz.chapter.course.name,
+            'date_of_quiz': quiz.date_of_quiz.isoformat() if quiz.date_of_quiz else None,
+            'time_duration': quiz.time_duration,
+            'is_scheduled': quiz.is_scheduled,
+            'remarks': quiz.remarks,
+            'total_questions': len(questions),
+            'total_marks': sum(q.marks for q in questions)
+        },
+        'questions': [
+            {
+                'id': question.id,
+                'question_statement': question.question_statement,
+                'question_type': question.question_type,
+                'options': question.options,
+                'marks': question.marks
+            }
+            for question in questions
+        ]
+    }
+
+    return result
+
+
+@cache_result('user_profile_{username}_{viewer_id}', timeout=600)
+def user_profile_payload(username, viewer_id):
+    # Find target user by username
+    target_user = User.query.filter_by(username=username).first()
+    if not target_user:
+        return {'message': 'User not found'}, 404
+
+    # Get user stats
+    stats = get_user_quiz_stats(target_user.id)
+
+    # Prepare user data
+    user_data = {
+        'username': target_user.username,
+        'name': target_user.name,
+        'created_at': target_user.created_at.isoformat()
+    }
+
+    # Include email only if viewing own profile
+    if viewer_id == target_user.id:
+        user_data['email'] = target_user.email
+
+    result = {
+        'user': user_data,
+        'stats': {
+            'total_quizzes_taken': stats['total_quizzes'],
+            'total_questions_answered': stats['total_questions'],
+            'overall_accuracy': stats['overall_accuracy'],
+            'total_allotted_minutes': stats['total_allotted_minutes']
+        },
+        'is_own_profile': viewer_id == target_user.id
+    }
+
+    return result
 
 
 class DashboardResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_dashboard', timeout=300)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_dashboard'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         # Get user's subscribed chapters
         subscriptions = Subscription.query.filter_by(
@@ -88,7 +160,6 @@ class DashboardResource(Resource):
             }
         }
 
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
@@ -101,43 +172,7 @@ class QuizMetadataResource(Resource):
         if not can_access:
             return {'message': message}, 403
 
-        cache_key_name = f'quiz_{quiz_id}_metadata'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
-        quiz = Quiz.query.get(quiz_id)
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-
-        result = {
-            'quiz': {
-                'id': quiz.id,
-                'title': quiz.title,
-                'chapter': quiz.chapter.name,
-                'course': quiz.chapter.course.name,
-                'date_of_quiz': quiz.date_of_quiz.isoformat() if quiz.date_of_quiz else None,
-                'time_duration': quiz.time_duration,
-                'is_scheduled': quiz.is_scheduled,
-                'remarks': quiz.remarks,
-                'total_questions': len(questions),
-                'total_marks': sum(q.marks for q in questions)
-            },
-            'questions': [
-                {
-                    'id': question.id,
-                    'question_statement': question.question_statement,
-                    'question_type': question.question_type,
-                    'options': question.options,
-                    'marks': question.marks
-                }
-                for question in questions
-            ]
-        }
-
-        # Cache for 10 minutes
-        current_app.cache.set(cache_key_name, result, timeout=600)
-        return result
+        return quiz_metadata_payload(quiz_id)
 
 
 class QuizSubmissionResource(Resource):
@@ -183,16 +218,22 @@ class QuizSubmissionResource(Resource):
 
         submissions_to_add = []
         submissions_to_update = []
+        answer_key = get_answer_key(quiz_id)
+
+        # Autosaved answers count towards the submission
+        session_buffer = get_quiz_session_buffer()
+        answers = args['answers']
+        if session_buffer is not None:
+            answers = session_buffer.merge(user.id, quiz_id, answers)
 
-        for answer_data in args['answers']:
+        for answer_data in answers:
             question_id = answer_data.get('question_id')
             answer = answer_data.get('answer')
 
-            question = Question.query.get(question_id)
-            if not question or question.quiz_id != quiz_id:
+            if question_id not in answer_key:
                 continue
 
-            is_correct = answer == question.correct_answer
+            is_correct = answer_key.grade(question_id, answer)
 
             # For non-scheduled quizzes, update existing submissions or create new ones
             if not quiz.is_scheduled and question_id in existing_submissions_dict:
@@ -215,8 +256,12 @@ class QuizSubmissionResource(Resource):
         # Save all submissions
         if submissions_to_add:
             db.session.add_all(submissions_to_add)
+        update_quiz_attempt(user.id, quiz_id)
         db.session.commit()
 
+        if session_buffer is not None:
+            session_buffer.discard(user.id, quiz_id)
+
         invalidate_user_cache(user.id)
         score = calculate_quiz_score(quiz_id, user.id)
 
@@ -232,13 +277,9 @@ class QuizSubmissionResource(Resource):
 class SubscriptionsResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_subscriptions', timeout=600)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_subscriptions'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         subscriptions = Subscription.query.filter_by(
             user_id=user.id,
@@ -260,8 +301,6 @@ class SubscriptionsResource(Resource):
             ]
         }
 
-        # Cache for 10 minutes
-        current_app.cache.set(cache_key_name, result, timeout=600)
         return result
 
     @jwt_required()
@@ -455,8 +494,8 @@ class UserDataExportResource(Resource):
                 ['Overall Accuracy', f"{stats.get('overall_accuracy', 0):.1f}%"])
             writer.writerow(
                 ['Average Score', f"{stats.get('average_score', 0):.1f}%"])
-            writer.writerow(['Total Time Spent (minutes)',
-                            stats.get('total_time_spent', 0)])
+            writer.writerow(['Total Allotted Quiz Time (minutes)',
+                            stats.get('total_allotted_minutes', 0)])
 
             # Create response
             output.seek(0)
@@ -499,13 +538,9 @@ class UserExportResource(Resource):
 class UserStatsResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_detailed_stats', timeout=900)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_detailed_stats'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         stats = get_user_quiz_stats(user.id)
         subscriptions = Subscription.query.filter_by(
@@ -543,8 +578,6 @@ class UserStatsResource(Resource):
             'chapter_performance': chapter_performance
         }
 
-        # Cache for 15 minutes
-        current_app.cache.set(cache_key_name, result, timeout=900)
         return result
 
 
@@ -606,13 +639,9 @@ class CourseSubscriptionResource(Resource):
 class UserUpcomingQuizzesResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_upcoming_schedule', timeout=300)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_upcoming_quizzes'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         # Get user's subscribed chapters
         subscriptions = Subscription.query.filter_by(
@@ -681,38 +710,36 @@ class UserUpcomingQuizzesResource(Resource):
                 continue
 
         result = {'quizzes': quiz_list}
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
 class UserAnalyticsResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_analytics', timeout=600)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_analytics'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         stats = get_user_quiz_stats(user.id)
         quiz_scores = stats.get('quiz_scores', [])
 
         # Get course attempts data
-        course_attempts = {}
-        for quiz_score in quiz_scores:
-            quiz = Quiz.query.get(quiz_score['quiz_id'])
-            if quiz and quiz.chapter and quiz.chapter.course:
-                course_name = quiz.chapter.course.name
-                if course_name not in course_attempts:
-                    course_attempts[course_name] = 0
-                course_attempts[course_name] += 1
+        course_attempts = db.session.query(
+            Course.name,
+            func.count(QuizAttempt.id)
+        ).select_from(QuizAttempt).join(
+            Quiz, QuizAttempt.quiz_id == Quiz.id
+        ).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Course, Chapter.course_id == Course.id
+        ).filter(
+            QuizAttempt.user_id == user.id
+        ).group_by(Course.id, Course.name).all()
 
         course_attempts_list = [
             {'course_name': course, 'attempts': count}
-            for course, count in course_attempts.items()
+            for course, count in course_attempts
         ]
 
         result = {
@@ -720,21 +747,15 @@ class UserAnalyticsResource(Resource):
             'course_attempts': course_attempts_list
         }
 
-        # Cache for 10 minutes
-        current_app.cache.set(cache_key_name, result, timeout=600)
         return result
 
 
 class UserSubmissionsResource(Resource):
     @jwt_required()
     @user_required
+    @cache_result('user_{user_id}_detailed_submissions', timeout=300)
     def get(self):
         user = get_current_user()
-        cache_key_name = f'user_{user.id}_detailed_submissions'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
 
         # Get all quizzes user has participated in
         quiz_ids = db.session.query(Submission.quiz_id).filter_by(
@@ -803,8 +824,6 @@ class UserSubmissionsResource(Resource):
             'total_time_spent': total_time_spent
         }
 
-        # Cache for 5 minutes
-        current_app.cache.set(cache_key_name, result, timeout=300)
         return result
 
 
@@ -828,9 +847,8 @@ class UnsubscribeResource(Resource):
             db.session.delete(subscription)
             db.session.commit()
 
-            # Clear cache
-            cache_key_name = f'user_{user.id}_subscriptions'
-            current_app.cache.delete(cache_key_name)
+            # Clear cache, including any prebuilt quiz access grants
+            invalidate_user_cache(user.id)
 
             return {'message': 'Successfully unsubscribed from chapter'}, 200
 
@@ -853,63 +871,7 @@ class UserProfileResource(Resource):
         if username.startswith('@'):
             username = username[1:]
 
-        cache_key_name = f'user_profile_{username}_{current_user.id}'
-        cached_result = current_app.cache.get(cache_key_name)
-
-        if cached_result:
-            return cached_result
-
-        # Find target user by username
-        target_user = User.query.filter_by(username=username).first()
-        if not target_user:
-            return {'message': 'User not found'}, 404
-
-        # Get user stats
-        stats = get_user_quiz_stats(target_user.id)
-
-        # Calculate total time spent
-        submissions = Submission.query.filter_by(user_id=target_user.id).all()
-        total_time_spent = 0
-        for submission in submissions:
-            if submission.time_duration:
-                try:
-                    time_parts = submission.time_duration.split(':')
-                    if len(time_parts) == 3:  # HH:MM:SS format
-                        hours = int(time_parts[0])
-                        minutes = int(time_parts[1])
-                        duration_minutes = hours * 60 + minutes
-                        total_time_spent += duration_minutes
-                    elif len(time_parts) == 2:  # MM:SS format
-                        minutes = int(time_parts[0])
-                        total_time_spent += minutes
-                except (ValueError, IndexError):
-                    continue
-
-        # Prepare user data
-        user_data = {
-            'username': target_user.username,
-            'name': target_user.name,
-            'created_at': target_user.created_at.isoformat()
-        }
-
-        # Include email only if viewing own profile
-        if current_user.id == target_user.id:
-            user_data['email'] = target_user.email
-
-        result = {
-            'user': user_data,
-            'stats': {
-                'total_quizzes_taken': stats['total_quizzes'],
-                'total_questions_answered': stats['total_questions'],
-                'overall_accuracy': stats['overall_accuracy'],
-                'total_time_spent': total_time_spent
-            },
-            'is_own_profile': current_user.id == target_user.id
-        }
-
-        # Cache for 10 minutes
-        current_app.cache.set(cache_key_name, result, timeout=600)
-        return result
+        return user_profile_payload(username, current_user.id)
 
 
 class QuizSubmissionDetailResource(Resource):
@@ -986,7 +948,7 @@ class QuizCertificateResource(Resource):
     @jwt_required()
     @user_required
     def get(self, quiz_id):
-        from flask import send_file, make_response
+        from flask import send_file
         import io
 
         user = get_current_user()
@@ -1012,17 +974,19 @@ class QuizCertificateResource(Resource):
             return {'message': message}, 400
 
         try:
-            # Generate certificate PDF
-            certificate_pdf = cert_generator.generate_certificate_pdf(
+            # Streams the stored PDF, rendering only on the first request
+            file_path, _ = cert_generator.get_certificate_file(
                 user.id, quiz_id)
 
-            # Create response with PDF
-            response = make_response(certificate_pdf)
-            response.headers['Content-Type'] = 'application/pdf'
-            response.headers[
-                'Content-Disposition'] = f'attachment; filename="quiz_{quiz_id}_certificate.pdf"'
-
-            return response
+            return send_file(
+                file_path,
+                as_attachment=True,
+                download_name=f"quiz_{quiz_id}_certificate.pdf",
+                mimetype='application/pdf',
+                conditional=True,
+                # The file name is its content hash, unlike the mtime it is stable
+                etag=os.path.splitext(os.path.basename(file_path))[0]
+            )
 
         except Exception as e:
             current_app.logger.error(f"Error generating certificate: {str(e)}")
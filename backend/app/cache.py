@@ -1,15 +1,97 @@
+import os
+import math
+import time
+import random
+import uuid
+import re
 import redis
-import json
-import pickle
+import fnmatch
+import inspect
+import functools
+import threading
+from collections import OrderedDict
 from flask import current_app
+from app.cache_codecs import CacheSerializer
 from typing import Any, Optional, Union
 
 
+class LocalCache:
+    
+    def __init__(self, max_size: int = 1024, default_ttl: int = 30):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.generation = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+    
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            # An invalidation raced with the fetch, don't cache what may be stale
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def delete(self, key: str):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+    
+    def delete_pattern(self, pattern: str):
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]:
+                del self._data[key]
+    
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+    
+    def __len__(self):
+        return len(self._data)
+
+
+# Generation namespaces derived from the key naming convention: entity keys
+# such as user_5_dashboard embed that entity's generation, shared content
+# keys (admin_, course_, chapter_, public_) embed the content generation
+ENTITY_KEY_RE = re.compile(r'^(user|quiz|chapter)_(\d+)_')
+CONTENT_KEY_RE = re.compile(r'^(admin|course|chapter|public)_')
+CONTENT_NAMESPACE = 'content'
+_MAX_CACHED_GENERATIONS = 10000
+
 
 class RedisCache:
     
     def __init__(self, app=None):
         self.redis_client = None
+        self.local_cache = None
+        self.serializer = CacheSerializer()
+        self.stats = {'l1_hits': 0, 'l1_misses': 0, 'l2_hits': 0, 'l2_misses': 0}
+        self.key_prefix = 'quizzo:'
+        self.generation_ttl = 5
+        self.tag_ttl = 86400
+        self._generations = {}
+        self._node_id = uuid.uuid4().hex
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
         if app is not None:
             self.init_app(app)
     
@@ -27,39 +109,209 @@ class RedisCache:
             self.redis_client.ping()
         except Exception as e:
             raise Exception(f"Redis connection failed: {e}")
+        
+        self.serializer = CacheSerializer(
+            compression=app.config.get('CACHE_COMPRESSION', 'zlib'),
+            threshold=app.config.get('CACHE_COMPRESS_THRESHOLD', 1024)
+        )
+        
+        self.key_prefix = app.config.get('CACHE_KEY_PREFIX', 'quizzo:')
+        self.tag_ttl = app.config.get('CACHE_TAG_TTL', 86400)
+        self.generation_ttl = app.config.get('CACHE_GENERATION_TTL', 5)
+        self.invalidation_channel = self.key_prefix + 'cache_invalidation'
+        
+        # Optional in-process L1 tier, kept coherent through pub/sub
+        if app.config.get('CACHE_L1_ENABLED', False):
+            self.local_cache = LocalCache(
+                max_size=app.config.get('CACHE_L1_MAX_SIZE', 1024),
+                default_ttl=app.config.get('CACHE_L1_TTL', 30)
+            )
+    
+    def _ensure_listener(self):
+        # Threads don't survive fork, so (re)start the subscriber per process
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._reset_local_state()
+            thread = threading.Thread(target=self._listen, daemon=True)
+            thread.start()
+    
+    def _reset_local_state(self):
+        self._generations = {}
+        if self.local_cache is not None:
+            self.local_cache.clear()
+    
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.invalidation_channel)
+                # Anything published while we were disconnected is lost
+                self._reset_local_state()
+                for message in pubsub.listen():
+                    self._handle_invalidation(message.get('data'))
+            except Exception:
+                time.sleep(1)
+    
+    def _handle_invalidation(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        if not isinstance(data, str) or data.count(':') < 2:
+            return
+        
+        node_id, kind, key = data.split(':', 2)
+        if node_id == self._node_id:
+            return
+        
+        if kind == 'gen':
+            namespace, _, generation = key.rpartition('=')
+            self._remember_generation(namespace, int(generation))
+        elif kind == 'key' and self.local_cache is not None:
+            self.local_cache.delete(key)
+        elif kind == 'pattern':
+            if key == '*':
+                self._reset_local_state()
+            elif self.local_cache is not None:
+                self.local_cache.delete_pattern(key)
+    
+    def _publish(self, pipe, kind: str, key: str):
+        if self.local_cache is not None:
+            pipe.publish(self.invalidation_channel, f"{self._node_id}:{kind}:{key}")
     
     def _serialize(self, value: Any) -> bytes:
-        try:
-            return json.dumps(value).encode('utf-8')
-        except (TypeError, ValueError):
-            return pickle.dumps(value)
+        return self.serializer.dumps(value)
     
     def _deserialize(self, value: bytes) -> Any:
-        try:
-            # Try JSON first
-            return json.loads(value.decode('utf-8'))
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            # Fall back to pickle
-            return pickle.loads(value)
+        return self.serializer.loads(value)
+    
+    def _prefixed(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+    
+    def _namespaces(self, key: str) -> list:
+        namespaces = []
+        match = ENTITY_KEY_RE.match(key)
+        if match:
+            namespaces.append(f"{match.group(1)}:{match.group(2)}")
+        if CONTENT_KEY_RE.match(key):
+            namespaces.append(CONTENT_NAMESPACE)
+        return namespaces
+    
+    def _remember_generation(self, namespace: str, generation: int):
+        if len(self._generations) > _MAX_CACHED_GENERATIONS:
+            self._generations = {}
+        self._generations[namespace] = (
+            generation, time.monotonic() + self.generation_ttl)
+    
+    def _get_generations(self, namespaces) -> list:
+        self._ensure_listener()
+        now = time.monotonic()
+        generations = {}
+        missing = []
+        for namespace in namespaces:
+            entry = self._generations.get(namespace)
+            if entry and entry[1] > now:
+                generations[namespace] = entry[0]
+            else:
+                missing.append(namespace)
+        
+        if missing:
+            generation_keys = [self._prefixed(f"gen:{namespace}") for namespace in missing]
+            for namespace, generation_key, value in zip(missing, generation_keys,
+                                                         self.redis_client.mget(generation_keys)):
+                if value is None:
+                    # Seed from the clock so an evicted counter never goes backwards
+                    self.redis_client.set(generation_key, int(time.time() * 1000), nx=True)
+                    value = self.redis_client.get(generation_key)
+                generations[namespace] = int(value)
+                self._remember_generation(namespace, generations[namespace])
+        
+        return [generations[namespace] for namespace in namespaces]
     
     def _make_key(self, key: str) -> str:
-        prefix = current_app.config.get('CACHE_KEY_PREFIX', 'quizzo:')
-        return f"{prefix}{key}"
+        namespaces = self._namespaces(key)
+        if not namespaces:
+            return self._prefixed(key)
+        generations = self._get_generations(namespaces)
+        return f"{self.key_prefix}{key}|g{'.'.join(str(g) for g in generations)}"
+    
+    def bump_generation(self, *namespaces) -> dict:
+        if not self.redis_client or not namespaces:
+            return {}
+        
+        try:
+            # Invalidating a namespace is one INCR, old entries age out via TTL
+            pipe = self.redis_client.pipeline(transaction=False)
+            seed = int(time.time() * 1000)
+            for namespace in namespaces:
+                pipe.set(self._prefixed(f"gen:{namespace}"), seed, nx=True)
+                pipe.incr(self._prefixed(f"gen:{namespace}"))
+            generations = dict(zip(namespaces, pipe.execute()[1::2]))
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            for namespace, generation in generations.items():
+                self._remember_generation(namespace, generation)
+                pipe.publish(self.invalidation_channel,
+                             f"{self._node_id}:gen:{namespace}={generation}")
+            pipe.execute()
+            return generations
+        except Exception:
+            return {}
     
     def get(self, key: str) -> Optional[Any]:
         if not self.redis_client:
             return None
         
         try:
+            if self.local_cache is not None:
+                # L1 entries are only safe to serve while this process
+                # hears invalidations, whatever the key's namespace
+                self._ensure_listener()
             cache_key = self._make_key(key)
-            value = self.redis_client.get(cache_key)
+            
+            generation = None
+            if self.local_cache is not None:
+                # L1 keeps the serialized form so callers never share mutable objects
+                found, value = self.local_cache.get(cache_key)
+                if found:
+                    self.stats['l1_hits'] += 1
+                    return self._deserialize(value)
+                self.stats['l1_misses'] += 1
+                generation = self.local_cache.generation
+            
+            if self.local_cache is None:
+                value = self.redis_client.get(cache_key)
+            else:
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.get(cache_key)
+                pipe.pttl(cache_key)
+                value, ttl_ms = pipe.execute()
+            
             if value is None:
+                self.stats['l2_misses'] += 1
                 return None
+            self.stats['l2_hits'] += 1
+            
+            if self.local_cache is not None:
+                # Never let the L1 copy outlive the Redis entry
+                ttl = ttl_ms / 1000.0 if ttl_ms and ttl_ms > 0 else None
+                self.local_cache.set(cache_key, value, ttl, generation)
             return self._deserialize(value)
         except Exception as e:
             return None
     
-    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+    def _tag_key(self, tag: str) -> str:
+        return self._prefixed(f"tag:{tag}")
+    
+    def _add_to_tags(self, pipe, cache_key: str, tags, timeout: int):
+        for tag in tags or ():
+            tag_key = self._tag_key(tag)
+            pipe.sadd(tag_key, cache_key)
+            pipe.expire(tag_key, max(timeout, self.tag_ttl))
+    
+    def set(self, key: str, value: Any, timeout: Optional[int] = None, tags=None) -> bool:
         if not self.redis_client:
             return False
         
@@ -70,7 +322,20 @@ class RedisCache:
             if timeout is None:
                 timeout = current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
             
-            return self.redis_client.setex(cache_key, timeout, serialized_value)
+            if self.local_cache is None and not tags:
+                return self.redis_client.setex(cache_key, timeout, serialized_value)
+            
+            # Value, tag membership and L1 invalidation in one round trip
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.setex(cache_key, timeout, serialized_value)
+            self._add_to_tags(pipe, cache_key, tags, timeout)
+            self._publish(pipe, 'key', cache_key)
+            result = pipe.execute()[0]
+            
+            if self.local_cache is not None:
+                self.local_cache.delete(cache_key)
+                self.local_cache.set(cache_key, serialized_value, timeout)
+            return result
         except Exception as e:
             return False
     
@@ -80,44 +345,293 @@ class RedisCache:
         
         try:
             cache_key = self._make_key(key)
-            return bool(self.redis_client.delete(cache_key))
+            if self.local_cache is None:
+                return bool(self.redis_client.delete(cache_key))
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(cache_key)
+            self._publish(pipe, 'key', cache_key)
+            deleted = pipe.execute()[0]
+            # Evict after Redis so a concurrent refill can't resurrect the value
+            self.local_cache.delete(cache_key)
+            return bool(deleted)
         except Exception as e:
             return False
     
+    def get_many(self, keys) -> dict:
+        if not self.redis_client or not keys:
+            return {}
+        
+        results = {}
+        try:
+            if self.local_cache is not None:
+                self._ensure_listener()
+            cache_keys = {key: self._make_key(key) for key in keys}
+            
+            pending = []
+            generation = None
+            if self.local_cache is not None:
+                generation = self.local_cache.generation
+                for key, cache_key in cache_keys.items():
+                    found, value = self.local_cache.get(cache_key)
+                    if found:
+                        self.stats['l1_hits'] += 1
+                        results[key] = value
+                    else:
+                        self.stats['l1_misses'] += 1
+                        pending.append(key)
+            else:
+                pending = list(cache_keys)
+            
+            if pending:
+                if self.local_cache is None:
+                    values = self.redis_client.mget([cache_keys[key] for key in pending])
+                    ttls = [None] * len(values)
+                else:
+                    pipe = self.redis_client.pipeline(transaction=False)
+                    for key in pending:
+                        pipe.get(cache_keys[key])
+                        pipe.pttl(cache_keys[key])
+                    replies = pipe.execute()
+                    values, ttls = replies[0::2], replies[1::2]
+                
+                for key, value, ttl_ms in zip(pending, values, ttls):
+                    if value is None:
+                        self.stats['l2_misses'] += 1
+                        continue
+                    self.stats['l2_hits'] += 1
+                    results[key] = value
+                    if self.local_cache is not None:
+                        ttl = ttl_ms / 1000.0 if ttl_ms and ttl_ms > 0 else None
+                        self.local_cache.set(cache_keys[key], value, ttl, generation)
+        except Exception:
+            pass
+        
+        decoded = {}
+        for key, value in results.items():
+            try:
+                decoded[key] = self._deserialize(value)
+            except Exception:
+                continue
+        return decoded
+    
+    def set_many(self, mapping: dict, timeout: Optional[int] = None, tags=None, chunk_size: int = 500) -> bool:
+        if not self.redis_client or not mapping:
+            return False
+        
+        if timeout is None:
+            timeout = current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        
+        try:
+            items = []
+            for key, value in mapping.items():
+                try:
+                    items.append((self._make_key(key), self._serialize(value)))
+                except Exception:
+                    continue
+            
+            for i in range(0, len(items), chunk_size):
+                pipe = self.redis_client.pipeline(transaction=False)
+                for cache_key, value in items[i:i + chunk_size]:
+                    pipe.setex(cache_key, timeout, value)
+                    self._add_to_tags(pipe, cache_key, tags, timeout)
+                    self._publish(pipe, 'key', cache_key)
+                pipe.execute()
+            
+            if self.local_cache is not None:
+                for cache_key, value in items:
+                    self.local_cache.delete(cache_key)
+                    self.local_cache.set(cache_key, value, timeout)
+            return len(items) == len(mapping)
+        except Exception:
+            return False
+    
+    def _delete_cache_keys(self, cache_keys, chunk_size: int = 500) -> int:
+        deleted = 0
+        # One round trip per chunk instead of one per key
+        for i in range(0, len(cache_keys), chunk_size):
+            chunk = cache_keys[i:i + chunk_size]
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(*chunk)
+            for cache_key in chunk:
+                self._publish(pipe, 'key', cache_key)
+            deleted += pipe.execute()[0]
+            
+            if self.local_cache is not None:
+                for cache_key in chunk:
+                    self.local_cache.delete(cache_key)
+        return deleted
+    
+    def delete_many(self, keys, chunk_size: int = 500) -> int:
+        if not self.redis_client or not keys:
+            return 0
+        
+        try:
+            return self._delete_cache_keys([self._make_key(key) for key in keys], chunk_size)
+        except Exception:
+            return 0
+    
     def delete_pattern(self, pattern: str) -> int:
         if not self.redis_client:
             return 0
         
         try:
-            cache_pattern = self._make_key(pattern)
-            keys = self.redis_client.keys(cache_pattern)
-            if keys:
-                return self.redis_client.delete(*keys)
-            return 0
+            # Matches physical keys, so generation-suffixed keys need a trailing *
+            cache_pattern = self._prefixed(pattern)
+            deleted = 0
+            batch = []
+            # SCAN in batches rather than KEYS, which blocks Redis
+            for cache_key in self.redis_client.scan_iter(match=cache_pattern, count=1000):
+                batch.append(cache_key)
+                if len(batch) >= 500:
+                    deleted += self.redis_client.delete(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis_client.delete(*batch)
+            
+            if self.local_cache is not None:
+                self.local_cache.delete_pattern(cache_pattern)
+                self.redis_client.publish(
+                    self.invalidation_channel, f"{self._node_id}:pattern:{cache_pattern}")
+            return deleted
         except Exception as e:
             return 0
     
+    def _acquire_lock(self, key: str, lock_timeout: int):
+        token = uuid.uuid4().hex
+        try:
+            if self.redis_client.set(self._prefixed(f"lock:{key}"), token, nx=True, px=int(lock_timeout * 1000)):
+                return token
+        except Exception:
+            pass
+        return None
+    
+    def _release_lock(self, key: str, token: str):
+        try:
+            lock_key = self._prefixed(f"lock:{key}")
+            current = self.redis_client.get(lock_key)
+            if current is not None and current.decode('utf-8') == token:
+                self.redis_client.delete(lock_key)
+        except Exception:
+            pass
+    
+    def _compute_and_store(self, key, compute, timeout, stale_ttl, tags):
+        started = time.time()
+        value = compute()
+        delta = time.time() - started
+        envelope = {'__swr__': 1, 'v': value, 'd': delta, 'e': time.time() + timeout}
+        # Keep the entry around past its logical expiry so it can be served stale
+        self.set(key, envelope, timeout + stale_ttl, tags=tags)
+        return value
+    
+    def get_or_compute(self, key: str, compute, timeout: Optional[int] = None, tags=None,
+                       stale_ttl: Optional[int] = None, beta: float = 1.0, lock_timeout: int = 30):
+        if timeout is None:
+            timeout = current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+        if stale_ttl is None:
+            stale_ttl = timeout
+        
+        entry = self.get(key)
+        if isinstance(entry, dict) and entry.get('__swr__'):
+            # XFetch: refresh early with a probability that grows towards expiry,
+            # weighted by how long the value took to compute
+            expires_at = entry['e'] - entry['d'] * beta * math.log(1.0 - random.random())
+            if time.time() < expires_at:
+                return entry['v']
+            
+            token = self._acquire_lock(key, lock_timeout)
+            if not token:
+                # Another worker is refreshing, serve the stale value meanwhile
+                return entry['v']
+            try:
+                return self._compute_and_store(key, compute, timeout, stale_ttl, tags)
+            except Exception as e:
+                current_app.logger.warning(f"Cache refresh failed for {key}: {e}")
+                return entry['v']
+            finally:
+                self._release_lock(key, token)
+        
+        # Cold miss, let one worker compute while the rest wait for its result
+        token = self._acquire_lock(key, lock_timeout)
+        if not token:
+            deadline = time.time() + current_app.config.get('CACHE_LOCK_WAIT', 5)
+            while time.time() < deadline:
+                time.sleep(0.05)
+                entry = self.get(key)
+                if isinstance(entry, dict) and entry.get('__swr__'):
+                    return entry['v']
+            return compute()
+        try:
+            return self._compute_and_store(key, compute, timeout, stale_ttl, tags)
+        finally:
+            self._release_lock(key, token)
+    
+    def invalidate_tags(self, *tags) -> int:
+        if not self.redis_client or not tags:
+            return 0
+        
+        try:
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = [k.decode('utf-8') if isinstance(k, bytes) else k
+                       for k in set().union(*pipe.execute())]
+            
+            deleted = self._delete_cache_keys(members) if members else 0
+            self.redis_client.delete(*tag_keys)
+            return deleted
+        except Exception:
+            return 0
+    
+    def clear_all(self):
+        self.redis_client.flushdb()
+        self._reset_local_state()
+        self.redis_client.publish(
+            self.invalidation_channel, f"{self._node_id}:pattern:*")
+    
     def clear_user_cache(self, user_id: int) -> int:
-        return self.delete_pattern(f"user_{user_id}_*")
+        self.bump_generation(f"user:{user_id}")
+        # Explicitly tagged entries live outside the user_<id>_ key space
+        return self.invalidate_tags(f"user:{user_id}")
     
     def clear_quiz_cache(self, quiz_id: int) -> int:
-        return self.delete_pattern(f"quiz_{quiz_id}_*")
+        self.bump_generation(f"quiz:{quiz_id}")
+        return self.invalidate_tags(f"quiz:{quiz_id}")
+    
+    def clear_chapter_cache(self, chapter_id: int) -> int:
+        self.bump_generation(f"chapter:{chapter_id}")
+        return self.invalidate_tags(f"chapter:{chapter_id}")
     
     def clear_admin_cache(self) -> int:
-        deleted = 0
-        deleted += self.delete_pattern("admin_*")
-        deleted += self.delete_pattern("course_*")
-        deleted += self.delete_pattern("chapter_*")
-        return deleted
+        self.bump_generation(CONTENT_NAMESPACE)
+        return self.invalidate_tags(CONTENT_NAMESPACE)
     
     def get_cache_stats(self) -> dict:
         if not self.redis_client:
             return {"status": "disconnected"}
         
+        # Per-process counters, each worker reports its own tiers
+        tiers = {
+            "l1": {
+                "enabled": self.local_cache is not None,
+                "hits": self.stats['l1_hits'],
+                "misses": self.stats['l1_misses'],
+                "size": len(self.local_cache) if self.local_cache is not None else 0,
+                "max_size": self.local_cache.max_size if self.local_cache is not None else 0
+            },
+            "l2": {
+                "hits": self.stats['l2_hits'],
+                "misses": self.stats['l2_misses']
+            },
+            "views": get_view_cache_stats()
+        }
+        
         try:
             info = self.redis_client.info()
             return {
                 "status": "connected",
+                "tiers": tiers,
                 "used_memory": info.get('used_memory_human', 'Unknown'),
                 "connected_clients": info.get('connected_clients', 0),
                 "total_commands_processed": info.get('total_commands_processed', 0),
@@ -126,43 +640,225 @@ class RedisCache:
                 "uptime_in_seconds": info.get('uptime_in_seconds', 0)
             }
         except Exception as e:
-            return {"status": "error", "error": str(e)}
+            return {"status": "error", "error": str(e), "tiers": tiers}
+
+
+# Per-view counters for cache_result, reported alongside the tier stats
+_view_stats = {}
+_warmable_views = {}
+
+
+def _view_counters(name: str) -> dict:
+    counters = _view_stats.get(name)
+    if counters is None:
+        counters = _view_stats.setdefault(name, {
+            'hits': 0, 'misses': 0, 'negative_hits': 0,
+            'hit_ms': 0.0, 'compute_ms': 0.0
+        })
+    return counters
+
+
+def get_view_cache_stats() -> dict:
+    stats = {}
+    for name, counters in _view_stats.items():
+        lookups = counters['hits'] + counters['misses']
+        stats[name] = {
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'negative_hits': counters['negative_hits'],
+            'hit_rate': round(counters['hits'] / lookups, 3) if lookups else 0.0,
+            'avg_hit_ms': round(counters['hit_ms'] / counters['hits'], 3) if counters['hits'] else 0.0,
+            'avg_compute_ms': round(counters['compute_ms'] / counters['misses'], 3) if counters['misses'] else 0.0
+        }
+    return stats
+
+
+def _hash_arguments(arguments: dict) -> str:
+    # md5 rather than hash(), which is randomized per process
+    from app.utils import cache_key
+    return cache_key(**arguments)
+
+
+def _jittered(timeout: int, jitter: float) -> int:
+    # Spread expiry so keys written together don't all miss together
+    if not jitter or timeout <= 1:
+        return timeout
+    return max(1, int(round(timeout * random.uniform(1 - jitter, 1 + jitter))))
 
 
-def cache_result(key_func=None, timeout=None):
+def cache_result(key=None, timeout=None, query_args=(), tags=None,
+                 negative_timeout=None, jitter=None, warm=False):
+    # key is a template such as 'quiz_{quiz_id}_metadata' formatted with the
+    # call's arguments ({user_id} resolves to the requesting user), or a
+    # callable returning the key. Without one the key is derived from the
+    # qualified name and an md5 of the arguments, stable across processes.
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            # Generate cache key
-            if key_func:
-                cache_key = key_func(*args, **kwargs)
+        signature = inspect.signature(func)
+        name = func.__qualname__
+        counters = _view_counters(name)
+        
+        def bind_arguments(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {k: v for k, v in bound.arguments.items() if k not in ('self', 'cls')}
+            if isinstance(key, str) and '{user_id}' in key and 'user_id' not in arguments:
+                from app.utils import get_current_identity
+                arguments['user_id'] = get_current_identity()[0]
+            return arguments
+        
+        def make_key(*args, **kwargs):
+            if callable(key):
+                cache_key_name = key(*args, **kwargs)
             else:
-                # Default key generation
-                cache_key = f"{func.__name__}_{hash(str(args) + str(kwargs))}"
+                arguments = bind_arguments(args, kwargs)
+                if key:
+                    cache_key_name = key.format(**arguments)
+                else:
+                    cache_key_name = f"view_{func.__module__}.{name}_{_hash_arguments(arguments)}"
             
-            # Try to get from cache
-            cached_result = current_app.cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
+            if query_args:
+                from flask import request
+                params = {arg: request.args.get(arg, '') for arg in query_args}
+                if any(params.values()):
+                    cache_key_name = f"{cache_key_name}_{_hash_arguments(params)}"
+            return cache_key_name
+        
+        def make_tags(args, kwargs):
+            if not tags:
+                return None
+            arguments = bind_arguments(args, kwargs)
+            return [tag.format(**arguments) for tag in tags]
+        
+        def store(cache_key_name, result, args, kwargs):
+            config = current_app.config
+            jitter_ratio = config.get('CACHE_TTL_JITTER', 0.1) if jitter is None else jitter
+            
+            status = None
+            body = result
+            if isinstance(result, tuple):
+                body, status = result[0], result[1] if len(result) > 1 else 200
             
-            # Execute function and cache result
+            if body is None or status == 404:
+                # Negative caching: remember misses briefly so lookups of absent
+                # rows don't reach the database on every request
+                ttl = negative_timeout if negative_timeout is not None else \
+                    config.get('CACHE_NEGATIVE_TIMEOUT', 60)
+                if ttl:
+                    current_app.cache.set(cache_key_name, {'__negative__': 1, 'b': body, 's': status},
+                                          _jittered(ttl, jitter_ratio), tags=make_tags(args, kwargs))
+                return
+            
+            if status is not None and not 200 <= status < 300:
+                return
+            
+            ttl = timeout if timeout is not None else config.get('CACHE_DEFAULT_TIMEOUT', 300)
+            current_app.cache.set(cache_key_name, body, _jittered(ttl, jitter_ratio),
+                                  tags=make_tags(args, kwargs))
+        
+        def compute(cache_key_name, args, kwargs):
+            started = time.perf_counter()
             result = func(*args, **kwargs)
-            current_app.cache.set(cache_key, result, timeout)
+            counters['compute_ms'] += (time.perf_counter() - started) * 1000
+            store(cache_key_name, result, args, kwargs)
             return result
         
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not hasattr(current_app, 'cache'):
+                return func(*args, **kwargs)
+            
+            started = time.perf_counter()
+            cache_key_name = make_key(*args, **kwargs)
+            cached_result = current_app.cache.get(cache_key_name)
+            
+            # Falsy results are valid cache entries, only None is a miss
+            if cached_result is not None:
+                counters['hits'] += 1
+                counters['hit_ms'] += (time.perf_counter() - started) * 1000
+                if isinstance(cached_result, dict) and cached_result.get('__negative__'):
+                    counters['negative_hits'] += 1
+                    if cached_result['s'] is None:
+                        return cached_result['b']
+                    return cached_result['b'], cached_result['s']
+                return cached_result
+            
+            counters['misses'] += 1
+            return compute(cache_key_name, args, kwargs)
+        
+        def warm_cache(*args, **kwargs):
+            # Recompute and store regardless of what is cached
+            return compute(make_key(*args, **kwargs), args, kwargs)
+        
+        def invalidate(*args, **kwargs):
+            return current_app.cache.delete(make_key(*args, **kwargs))
+        
+        wrapper.make_key = make_key
+        wrapper.warm = warm_cache
+        wrapper.invalidate = invalidate
+        if warm:
+            _warmable_views[name] = wrapper
         return wrapper
     return decorator
 
 
+def warm_cached_views(names=None) -> dict:
+    # Argument-free views registered with warm=True, e.g. from a beat task
+    warmed = {}
+    for name, view in _warmable_views.items():
+        if names is not None and name not in names:
+            continue
+        try:
+            view.warm()
+            warmed[name] = True
+        except Exception as e:
+            current_app.logger.warning(f"Cache warming failed for {name}: {e}")
+            warmed[name] = False
+    return warmed
+
+
 def invalidate_user_cache(user_id: int):
     if hasattr(current_app, 'cache'):
         current_app.cache.clear_user_cache(user_id)
 
 
+def invalidate_users_cache(user_ids, chunk_size: int = 1000) -> int:
+    if not hasattr(current_app, 'cache'):
+        return 0
+    
+    # One pipelined INCR per chunk, plus any explicitly tagged entries
+    user_ids = list(user_ids)
+    deleted = 0
+    for i in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[i:i + chunk_size]
+        current_app.cache.bump_generation(*[f"user:{user_id}" for user_id in chunk])
+        deleted += current_app.cache.invalidate_tags(
+            *[f"user:{user_id}" for user_id in chunk])
+    return deleted
+
+
 def invalidate_quiz_cache(quiz_id: int, chapter_id: int = None):
     if hasattr(current_app, 'cache'):
         current_app.cache.clear_quiz_cache(quiz_id)
         if chapter_id:
-            current_app.cache.delete(f'chapter_{chapter_id}_quizzes')
+            current_app.cache.clear_chapter_cache(chapter_id)
         # Clear related caches
-        current_app.cache.delete('upcoming_quizzes')
-        current_app.cache.delete('open_quizzes')
+        current_app.cache.delete_many(['upcoming_quizzes', 'open_quizzes'])
+
+
+def invalidate_quizzes_cache(quiz_ids, chunk_size: int = 1000) -> int:
+    if not hasattr(current_app, 'cache'):
+        return 0
+    
+    quiz_ids = list(quiz_ids)
+    deleted = 0
+    for i in range(0, len(quiz_ids), chunk_size):
+        chunk = quiz_ids[i:i + chunk_size]
+        current_app.cache.bump_generation(*[f"quiz:{quiz_id}" for quiz_id in chunk])
+        deleted += current_app.cache.invalidate_tags(
+            *[f"quiz:{quiz_id}" for quiz_id in chunk])
+    return deleted
+
+
+def invalidate_content_cache():
+    if hasattr(current_app, 'cache'):
+        current_app.cache.clear_admin_cache()
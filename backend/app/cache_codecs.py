@@ -0,0 +1,108 @@
+import json
+import zlib
+
+
+# Every payload starts with one tag byte: 0xC0 | compression << 2 | codec.
+# 0xC0-0xCF can't start a JSON document, so untagged legacy values are
+# still recognised. Pickle is never used. Only the standard library is
+# used, the tag leaves room for other codecs once they are dependencies.
+TAG_BASE = 0xC0
+
+CODEC_JSON = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+
+
+class CacheCodecError(Exception):
+    pass
+
+
+def _json_dumps(value):
+    return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data):
+    return json.loads(data.decode('utf-8'))
+
+
+CODECS = {
+    'json': (CODEC_JSON, _json_dumps, _json_loads),
+}
+
+AVAILABLE_CODECS = {
+    'json': True,
+}
+
+AVAILABLE_COMPRESSION = {
+    'none': True,
+    'zlib': True,
+}
+
+
+class CacheSerializer:
+
+    def __init__(self, codec='json', compression='zlib', threshold=1024, level=3):
+        if not AVAILABLE_CODECS.get(codec):
+            raise CacheCodecError(f"Cache codec '{codec}' is not available")
+
+        if not AVAILABLE_COMPRESSION.get(compression):
+            raise CacheCodecError(
+                f"Cache compression '{compression}' is not available")
+
+        self.codec = codec
+        self.compression = compression
+        self.threshold = threshold
+        self.level = level
+
+        self._codec_id, self._dumps, _ = CODECS[codec]
+        self._decoders = {
+            codec_id: loads for name, (codec_id, _, loads) in CODECS.items()
+            if AVAILABLE_CODECS[name]
+        }
+
+    def _compress(self, payload):
+        if self.compression == 'none' or len(payload) < self.threshold:
+            return COMPRESSION_NONE, payload
+
+        compressed = zlib.compress(payload, self.level)
+
+        # Incompressible payloads are stored as is
+        if len(compressed) >= len(payload):
+            return COMPRESSION_NONE, payload
+        return COMPRESSION_ZLIB, compressed
+
+    def _decompress(self, algorithm, payload):
+        if algorithm == COMPRESSION_NONE:
+            return payload
+        if algorithm == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        raise CacheCodecError(f"Unsupported cache compression {algorithm}")
+
+    def dumps(self, value) -> bytes:
+        try:
+            payload = self._dumps(value)
+        except (TypeError, ValueError) as e:
+            raise CacheCodecError(f"Value is not serializable: {e}")
+
+        algorithm, payload = self._compress(payload)
+        return bytes([TAG_BASE | (algorithm << 2) | self._codec_id]) + payload
+
+    def loads(self, data: bytes):
+        if not data:
+            raise CacheCodecError("Empty cache payload")
+
+        tag = data[0]
+        if tag & 0xF0 != TAG_BASE:
+            # Untagged value written before the codec layer, JSON only
+            try:
+                return json.loads(data.decode('utf-8'))
+            except (UnicodeDecodeError, ValueError):
+                raise CacheCodecError("Unrecognised legacy cache payload")
+
+        codec_id, algorithm = tag & 0x03, (tag >> 2) & 0x03
+        loads = self._decoders.get(codec_id)
+        if loads is None:
+            raise CacheCodecError(f"Unsupported cache codec {codec_id}")
+
+        return loads(self._decompress(algorithm, data[1:]))
@@ -27,6 +27,20 @@ def make_celery(app=None):
                 'task': 'app.services.celery_tasks.send_monthly_reports_task',
                 'schedule': crontab(day_of_month=1, hour=11, minute=30),
             },
+            # Overlaps QUIZ_WARM_WINDOW_MINUTES so every quiz is warmed at least twice
+            'warm-upcoming-quizzes': {
+                'task': 'app.services.celery_tasks.warm_upcoming_quizzes_task',
+                'schedule': crontab(minute='*/5'),
+            },
+            'flush-quiz-sessions': {
+                'task': 'app.services.celery_tasks.flush_quiz_sessions_task',
+                'schedule': crontab(minute='*'),
+            },
+            # Well before the monthly reports, which read last month's ranks
+            'rollup-monthly-activity': {
+                'task': 'app.services.celery_tasks.rollup_monthly_activity_task',
+                'schedule': crontab(hour=0, minute=30),
+            },
         },
         # Additional Celery settings
         task_routes={
@@ -35,6 +49,14 @@ def make_celery(app=None):
             'app.services.celery_tasks.send_individual_daily_reminder_task': {'queue': 'email'},
             'app.services.celery_tasks.send_individual_monthly_report_task': {'queue': 'email'},
             'app.services.celery_tasks.schedule_user_emails_task': {'queue': 'default'},
+            'app.services.celery_tasks.revaluate_quiz_task': {'queue': 'default'},
+            'app.services.celery_tasks.warm_upcoming_quizzes_task': {'queue': 'default'},
+            'app.services.celery_tasks.flush_quiz_sessions_task': {'queue': 'default'},
+            'app.services.celery_tasks.rollup_monthly_activity_task': {'queue': 'default'},
+            # PDF rendering is slow, keep it from delaying reminder emails
+            'app.services.celery_tasks.send_certificate_email_task': {'queue': 'certificates'},
+            'app.services.celery_tasks.issue_bulk_certificates_task': {'queue': 'certificates'},
+            'app.services.celery_tasks.issue_certificate_chunk_task': {'queue': 'certificates'},
         },
         task_default_queue='default',
         task_default_exchange='default',
@@ -16,10 +16,34 @@ class Config:
     CACHE_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/1")
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
     CACHE_KEY_PREFIX = "quizzo:"
+    # Optional per-process L1 cache in front of Redis
+    CACHE_L1_ENABLED = os.getenv("CACHE_L1_ENABLED", "false").lower() == "true"
+    CACHE_L1_MAX_SIZE = int(os.getenv("CACHE_L1_MAX_SIZE", 1024))
+    CACHE_L1_TTL = int(os.getenv("CACHE_L1_TTL", 30))  # seconds
+    # Cache payloads are tagged JSON; compression (zlib or none) applies
+    # above the threshold in bytes
+    CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zlib")
+    CACHE_COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", 1024))
+    # Non-evicting Redis for runtime state that must not be lost to cache
+    # eviction (token revocations, buffered quiz sessions)
+    STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://localhost:6380/0")
+    # Tag sets for explicitly tagged entries
+    CACHE_TAG_TTL = 86400
+    # Namespace generations (user, quiz, chapter, content) are embedded in
+    # keys; peers hear bumps over pub/sub, this bounds staleness otherwise
+    CACHE_GENERATION_TTL = 5
+    # cache_result: TTLs are spread by +/- this ratio; None results and 404s
+    # are cached for CACHE_NEGATIVE_TIMEOUT seconds (0 disables)
+    CACHE_TTL_JITTER = 0.1
+    CACHE_NEGATIVE_TIMEOUT = 60
 
     # JWT configuration
     JWT_ACCESS_TOKEN_EXPIRES = 60 * 60 * 24 * 30  # 30 days
     JWT_IDENTITY_CLAIM = "sub"
+    # Bump to force every issued token through the role lookup
+    JWT_TOKEN_VERSION = int(os.getenv("JWT_TOKEN_VERSION", 1))
+    # Per-process cache of each user's revocation time, in seconds
+    JWT_REVOCATION_TTL = 5
 
     # Rate Limiting configuration
     RATELIMIT_STORAGE_URL = os.getenv("REDIS_URL", "redis://localhost:6379/2")
@@ -27,6 +51,11 @@ class Config:
     RATELIMIT_DEFAULT = "1000 per hour"
     RATELIMIT_ENABLED = True
 
+    # Per-question autosaves are buffered in Redis and written on final
+    # submit; sessions idle for QUIZ_SESSION_IDLE_FLUSH seconds are flushed
+    QUIZ_SESSION_BUFFER = os.getenv("QUIZ_SESSION_BUFFER", "true").lower() == "true"
+    QUIZ_SESSION_IDLE_FLUSH = int(os.getenv("QUIZ_SESSION_IDLE_FLUSH", 600))
+
     # Email configuration
     MAIL_SERVER = os.getenv("MAIL_SERVER", "localhost")
     MAIL_PORT = int(os.getenv("MAIL_PORT", 587))
@@ -37,10 +66,29 @@ class Config:
     MAIL_DEFAULT_SENDER = os.getenv(
         "MAIL_DEFAULT_SENDER", "noreply@quizzo.com")
     MAIL_SENDER_NAME = os.getenv("MAIL_SENDER_NAME", "Quizzo Team")
+    # Persistent SMTP connections shared by every send in a process
+    MAIL_POOL_SIZE = int(os.getenv("MAIL_POOL_SIZE", 4))
+    MAIL_MAX_MESSAGES_PER_CONNECTION = int(
+        os.getenv("MAIL_MAX_MESSAGES_PER_CONNECTION", 100))
+    # Bulk campaigns (reminders, monthly reports) go through the async
+    # delivery engine; every attempt is appended to a ledger under
+    # MAIL_LEDGER_DIR so a rerun skips recipients already delivered
+    MAIL_ASYNC_CONNECTIONS = int(os.getenv("MAIL_ASYNC_CONNECTIONS", 10))
+    MAIL_DOMAIN_CONCURRENCY = int(os.getenv("MAIL_DOMAIN_CONCURRENCY", 4))
+    MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", 4))
+    MAIL_RETRY_BACKOFF = float(os.getenv("MAIL_RETRY_BACKOFF", 2.0))
+    MAIL_LEDGER_DIR = os.getenv("MAIL_LEDGER_DIR", "/tmp/mail_ledger")
 
     # Certificate configuration
     CERTIFICATE_OUTPUT_DIR = os.getenv(
         "CERTIFICATE_OUTPUT_DIR", "/tmp/certificates")
+    # Bundled certificate fonts, rendering never fetches anything remotely
+    CERTIFICATE_FONTS_DIR = os.getenv(
+        "CERTIFICATE_FONTS_DIR",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "fonts"))
+    # Rendered PDFs kept on disk, least recently used evicted beyond this
+    CERTIFICATE_CACHE_MAX_BYTES = int(os.getenv(
+        "CERTIFICATE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
 
     # Frontend URLs
     FRONTEND_DASHBOARD_URL = os.getenv(
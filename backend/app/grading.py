@@ -0,0 +1,160 @@
+import uuid
+import threading
+from collections import OrderedDict
+from flask import current_app
+from app.models import Question, db
+
+
+ANSWER_KEY_VERSION_TIMEOUT = 7 * 24 * 3600
+_MAX_CACHED_KEYS = 512
+
+_answer_keys = OrderedDict()
+_answer_keys_lock = threading.Lock()
+
+
+def _never(answer):
+    return False
+
+
+def _option(value):
+    # Options are indexes, but tolerate "1" vs 1 from clients
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _compile_mcq(correct_answer):
+    if not isinstance(correct_answer, list) or len(correct_answer) == 0:
+        return _never
+    expected = _option(correct_answer[0])
+
+    def grade(answer):
+        if not isinstance(answer, list) or len(answer) == 0:
+            return False
+        return _option(answer[0]) == expected
+    return grade
+
+
+def _compile_msq(correct_answer):
+    if not isinstance(correct_answer, list):
+        return _never
+    try:
+        expected = frozenset(_option(option) for option in correct_answer)
+    except TypeError:
+        return _never
+
+    def grade(answer):
+        if not isinstance(answer, list):
+            return False
+        try:
+            return frozenset(_option(option) for option in answer) == expected
+        except TypeError:
+            return False
+    return grade
+
+
+def _compile_nat(correct_answer, tolerance):
+    try:
+        expected = float(correct_answer[0])
+    except (IndexError, TypeError, ValueError):
+        return _never
+
+    # Allow small floating point differences
+    low, high = expected - tolerance, expected + tolerance
+
+    def grade(answer):
+        if isinstance(answer, list):
+            if len(answer) == 0:
+                return False
+            answer = answer[0]
+        try:
+            return low < float(answer) < high
+        except (TypeError, ValueError):
+            return False
+    return grade
+
+
+def compile_question(question_type, correct_answer, tolerance=0.01):
+    if question_type == 'MCQ':
+        return _compile_mcq(correct_answer)
+    if question_type == 'MSQ':
+        return _compile_msq(correct_answer)
+    if question_type == 'NAT':
+        return _compile_nat(correct_answer, tolerance)
+    return _never
+
+
+class AnswerKey:
+
+    def __init__(self, quiz_id, rows, tolerance=0.01):
+        self.quiz_id = quiz_id
+        self.graders = {}
+        self.question_types = {}
+        self.marks = {}
+
+        for question_id, question_type, correct_answer, marks in rows:
+            self.graders[question_id] = compile_question(
+                question_type, correct_answer, tolerance)
+            self.question_types[question_id] = question_type
+            self.marks[question_id] = marks
+
+    def __len__(self):
+        return len(self.graders)
+
+    def __contains__(self, question_id):
+        return question_id in self.graders
+
+    def grade(self, question_id, answer):
+        grader = self.graders.get(question_id)
+        if grader is None:
+            return False
+        return grader(answer)
+
+
+def _version_key(quiz_id):
+    # Outside the quiz_<id>_ namespace so cache invalidation doesn't discard
+    # it; every writer of a quiz's questions calls bump_answer_key_version
+    return f'answer_key_version_quiz_{quiz_id}'
+
+
+def get_answer_key_version(quiz_id):
+    version = current_app.cache.get(_version_key(quiz_id))
+    if version is None:
+        # Unknown or evicted version, never reuse a previously compiled key
+        version = bump_answer_key_version(quiz_id)
+    return version
+
+
+def bump_answer_key_version(quiz_id):
+    version = uuid.uuid4().hex
+    current_app.cache.set(_version_key(quiz_id), version,
+                          timeout=ANSWER_KEY_VERSION_TIMEOUT)
+    return version
+
+
+def build_answer_key(quiz_id):
+    rows = db.session.query(
+        Question.id, Question.question_type, Question.correct_answer, Question.marks
+    ).filter(Question.quiz_id == quiz_id).all()
+    tolerance = current_app.config.get('NAT_ANSWER_TOLERANCE', 0.01)
+    return AnswerKey(quiz_id, rows, tolerance)
+
+
+def get_answer_key(quiz_id):
+    version = get_answer_key_version(quiz_id)
+    cache_id = (quiz_id, version)
+
+    with _answer_keys_lock:
+        answer_key = _answer_keys.get(cache_id)
+        if answer_key is not None:
+            _answer_keys.move_to_end(cache_id)
+            return answer_key
+
+    answer_key = build_answer_key(quiz_id)
+
+    with _answer_keys_lock:
+        _answer_keys[cache_id] = answer_key
+        while len(_answer_keys) > _MAX_CACHED_KEYS:
+            _answer_keys.popitem(last=False)
+    return answer_key
@@ -20,6 +20,10 @@ class User(db.Model):
         "Submission", backref="user", lazy=True, cascade="all,delete")
     subscriptions = db.relationship(
         "Subscription", backref="user", lazy=True, cascade="all,delete")
+    quiz_attempts = db.relationship(
+        "QuizAttempt", backref="user", lazy=True, cascade="all,delete")
+    monthly_activities = db.relationship(
+        "MonthlyActivity", backref="user", lazy=True, cascade="all,delete")
 
 
 class Course(db.Model):
@@ -65,6 +69,8 @@ class Quiz(db.Model):
         "Question", backref="quiz", lazy=True, cascade="all,delete")
     submissions = db.relationship(
         "Submission", backref="quiz", lazy=True, cascade="all,delete")
+    attempts = db.relationship(
+        "QuizAttempt", backref="quiz", lazy=True, cascade="all,delete")
 
 
 class Question(db.Model):
@@ -83,6 +89,13 @@ class Question(db.Model):
 
 class Submission(db.Model):
     __tablename__ = "submission"
+    __table_args__ = (
+        # Also serves (user_id, quiz_id) lookups through its leftmost prefix
+        db.Index("uq_submission_user_quiz_question",
+                 "user_id", "quiz_id", "question_id", unique=True),
+        db.Index("ix_submission_quiz_user", "quiz_id", "user_id"),
+        db.Index("ix_submission_timestamp", "timestamp"),
+    )
     id = db.Column(db.Integer, primary_key=True)
 
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -99,6 +112,10 @@ class Submission(db.Model):
 
 class Subscription(db.Model):
     __tablename__ = "subscription"
+    __table_args__ = (
+        db.Index("ix_subscription_user_chapter_active",
+                 "user_id", "chapter_id", "is_active"),
+    )
     id = db.Column(db.Integer, primary_key=True)
 
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
@@ -107,3 +124,58 @@ class Subscription(db.Model):
     subscribed_on = db.Column(db.DateTime, default=datetime.now)
     # Active or inactive subscription
     is_active = db.Column(db.Boolean, default=True)
+
+
+class QuizAttempt(db.Model):
+    # Materialized per (user, quiz) score summary, kept in sync with Submission
+    __tablename__ = "quiz_attempt"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "quiz_id", name="uq_quiz_attempt_user_quiz"),
+        # Monthly activity rollups read one month of attempts at a time
+        db.Index("ix_quiz_attempt_completed_at", "completed_at"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id"), nullable=False)
+    obtained_marks = db.Column(db.Float, nullable=False, default=0.0)
+    total_marks = db.Column(db.Float, nullable=False, default=0.0)
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
+    question_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def percentage(self):
+        return (self.obtained_marks / self.total_marks * 100) if self.total_marks > 0 else 0
+
+
+class MonthlyActivity(db.Model):
+    # Per (user, calendar month) rollup of completed attempts. Refreshed for
+    # the submitting user on every submit; the nightly rollup rebuilds whole
+    # months and assigns ranks
+    __tablename__ = "monthly_activity"
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "month", name="uq_monthly_activity_user_month"),
+        db.Index("ix_monthly_activity_month", "month"),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # First day of the month
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    questions_answered = db.Column(db.Integer, nullable=False, default=0)
+    correct_answers = db.Column(db.Integer, nullable=False, default=0)
+    obtained_marks = db.Column(db.Float, nullable=False, default=0.0)
+    total_marks = db.Column(db.Float, nullable=False, default=0.0)
+    # Mean of the month's attempt percentages
+    average_score = db.Column(db.Float, nullable=False, default=0.0)
+    best_quiz_id = db.Column(db.Integer, db.ForeignKey("quiz.id", ondelete="SET NULL"),
+                             nullable=True)
+    best_score = db.Column(db.Float, nullable=True)
+    # Position by average score among the month's active users
+    rank = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.now)
+
+    @property
+    def accuracy(self):
+        return (self.correct_answers / self.questions_answered * 100) if self.questions_answered > 0 else 0
@@ -1,16 +1,18 @@
 from flask import request
 from flask_limiter import Limiter
-from flask_jwt_extended import get_jwt_identity
+from flask_jwt_extended import verify_jwt_in_request
 from flask_limiter.util import get_remote_address
 
 
 def get_rate_limit_key():
     try:
-        user_id = get_jwt_identity()
+        # Limits are checked before the view's jwt_required runs
+        verify_jwt_in_request(optional=True)
+
+        from app.utils import get_current_identity
+        user_id, role = get_current_identity()
         if user_id:
-            from app.models import User
-            user = User.query.get(user_id)
-            if user and user.role == 'admin':
+            if role == 'admin':
                 return f"admin:{user_id}"
             return f"user:{user_id}"
     except:
@@ -0,0 +1,81 @@
+import click
+from sqlalchemy import func, inspect
+from flask import current_app
+from app.models import db, Submission, Subscription, QuizAttempt
+from app.services.monthly_activity import backfill_monthly_activity
+from app.utils import rebuild_quiz_attempts, sync_quiz_attempts
+
+
+# Indexes added after the initial schema; db.create_all() only creates them
+# for brand new tables, so existing databases are upgraded here.
+UPGRADE_TABLES = [Submission, Subscription, QuizAttempt]
+
+
+def _dedupe_submissions():
+    # Keep the newest row per (user, quiz, question) so the unique index can be built
+    latest = db.session.query(func.max(Submission.id)).group_by(
+        Submission.user_id, Submission.quiz_id, Submission.question_id)
+
+    quiz_ids = [quiz_id for (quiz_id,) in db.session.query(
+        Submission.quiz_id
+    ).filter(
+        Submission.id.notin_(latest)
+    ).distinct().all()]
+
+    deleted = Submission.query.filter(
+        Submission.id.notin_(latest)
+    ).delete(synchronize_session=False)
+
+    if deleted:
+        current_app.logger.warning(
+            f"Removed {deleted} duplicate submissions before adding unique index")
+
+    # Attempts were aggregated over the duplicates too
+    for quiz_id in quiz_ids:
+        rebuild_quiz_attempts(quiz_id)
+    db.session.commit()
+    return deleted
+
+
+def upgrade_schema():
+    inspector = inspect(db.engine)
+
+    for model in UPGRADE_TABLES:
+        table = model.__table__
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+
+            if index.unique and model is Submission:
+                _dedupe_submissions()
+
+            index.create(bind=db.engine, checkfirst=True)
+            current_app.logger.info(
+                f"Created index {index.name} on {table.name}")
+
+
+def init_schema():
+    # One-shot, never from create_app: every web and Celery process would
+    # otherwise race on the DDL and the dedupe at boot
+    db.create_all()
+
+    # Add indexes introduced after the tables were first created
+    upgrade_schema()
+
+    # Backfill attempt summaries for submissions that predate them
+    attempts = sync_quiz_attempts()
+
+    # Fill the monthly activity rollup on first run after it was added
+    months = backfill_monthly_activity()
+    return attempts, months
+
+
+def register_schema_commands(app):
+    @app.cli.command('upgrade-schema',
+                     help='Create missing tables and indexes, then backfill derived tables.')
+    def upgrade_schema_command():
+        attempts, months = init_schema()
+        click.echo(f"Schema up to date, {attempts} attempts backfilled"
+                   + (f", monthly activity rolled up for {', '.join(months)}" if months else ''))
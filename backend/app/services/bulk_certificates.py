@@ -0,0 +1,221 @@
+import os
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, wait
+from flask import current_app
+from app.models import Chapter, Course, Quiz, QuizAttempt, User, db
+from app.services.certificate_generator import get_certificate_generator, make_render_pool, submit_render
+from app.services.certificate_mailer import certificate_attempt, certificate_emails_sent, mark_certificate_email_sent
+from app.services.email_service import get_email_service
+from app.utils import update_job_status
+
+PROGRESS_FIELDS = ('rendered', 'cached', 'emailed', 'skipped', 'failed')
+
+
+class BulkCertificateIssuer:
+    # Issues certificates to everyone who completed a quiz. Certificate data is
+    # loaded one chunk of users at a time, cache misses are rendered in a
+    # bounded process pool and each PDF is emailed as soon as it is ready
+
+    def __init__(self, quiz_id, job_id=None, send_email=True, resend=False,
+                 chunk_size=None, processes=None):
+        self.quiz_id = quiz_id
+        self.job_id = job_id
+        self.send_email = send_email
+        self.resend = resend
+        self.chunk_size = chunk_size or current_app.config.get(
+            'CERTIFICATE_BULK_CHUNK_SIZE', 200)
+        self.processes = processes or current_app.config.get(
+            'CERTIFICATE_BULK_PROCESSES') or os.cpu_count() or 1
+        # Renders in flight; no more users are read until the pool catches up
+        self.max_pending = self.processes * 2
+        self.generator = get_certificate_generator()
+        self.stats = dict.fromkeys(PROGRESS_FIELDS, 0)
+        self._reported = dict.fromkeys(PROGRESS_FIELDS, 0)
+        self._total = None
+
+    def _attempts(self, user_ids=None):
+        query = QuizAttempt.query.filter(
+            QuizAttempt.quiz_id == self.quiz_id,
+            QuizAttempt.completed_at.isnot(None)
+        )
+        if user_ids is not None:
+            query = query.filter(QuizAttempt.user_id.in_(user_ids))
+        return query
+
+    def count(self, user_ids=None):
+        return self._attempts(user_ids).count()
+
+    def iter_user_ids(self):
+        last_user_id = 0
+        while True:
+            user_ids = [row[0] for row in db.session.query(QuizAttempt.user_id).filter(
+                QuizAttempt.quiz_id == self.quiz_id,
+                QuizAttempt.completed_at.isnot(None),
+                QuizAttempt.user_id > last_user_id
+            ).order_by(QuizAttempt.user_id).limit(self.chunk_size).all()]
+            if not user_ids:
+                return
+            yield user_ids
+            last_user_id = user_ids[-1]
+
+    def iter_rows(self, user_ids=None):
+        # Keyset pagination, one joined query per chunk of users
+        last_user_id = 0
+        while True:
+            rows = db.session.query(User, QuizAttempt).join(
+                QuizAttempt, QuizAttempt.user_id == User.id
+            ).filter(
+                QuizAttempt.quiz_id == self.quiz_id,
+                QuizAttempt.completed_at.isnot(None),
+                QuizAttempt.user_id > last_user_id,
+                *([QuizAttempt.user_id.in_(user_ids)] if user_ids is not None else [])
+            ).order_by(QuizAttempt.user_id).limit(self.chunk_size).all()
+            if not rows:
+                return
+            yield rows
+            last_user_id = rows[-1][0].id
+
+    def _progress_key(self):
+        cache = getattr(current_app, 'cache', None)
+        if not self.job_id or cache is None or cache.redis_client is None:
+            return None, None
+        return cache.redis_client, f"{cache.key_prefix}bulk_certificates:{self.job_id}"
+
+    def start(self, total):
+        # Chunks may run in separate workers, so the counters live in Redis
+        self._total = total
+        redis, key = self._progress_key()
+        if redis is not None:
+            pipe = redis.pipeline(transaction=False)
+            pipe.delete(key)
+            pipe.hset(key, mapping={'total': total, **dict.fromkeys(PROGRESS_FIELDS, 0)})
+            pipe.expire(key, current_app.config.get('CERTIFICATE_BULK_PROGRESS_TTL', 24 * 3600))
+            pipe.execute()
+        self.report()
+
+    def report(self):
+        redis, key = self._progress_key()
+        # A chunk of a larger job can only report through the shared counters
+        if not self.job_id or (redis is None and self._total is None):
+            return
+        totals = dict(self.stats, total=self._total)
+        if redis is not None:
+            pipe = redis.pipeline(transaction=False)
+            for field in PROGRESS_FIELDS:
+                delta = self.stats[field] - self._reported[field]
+                if delta:
+                    pipe.hincrby(key, field, delta)
+            pipe.hgetall(key)
+            stored = pipe.execute()[-1]
+            totals = {field.decode('utf-8'): int(value) for field, value in stored.items()}
+            self._reported = dict(self.stats)
+
+        total = totals.get('total', 0)
+        done = sum(totals.get(field, 0) for field in ('rendered', 'cached', 'skipped', 'failed'))
+        message = (f"{done}/{total} certificates: {totals.get('rendered', 0)} rendered, "
+                   f"{totals.get('cached', 0)} cached, {totals.get('emailed', 0)} emailed, "
+                   f"{totals.get('skipped', 0)} already sent, {totals.get('failed', 0)} failed")
+        if done >= total:
+            update_job_status(self.job_id, 'completed', 100, message)
+        else:
+            update_job_status(self.job_id, 'running', int(done * 100 / total), message)
+
+    def fail_remaining(self, total):
+        processed = sum(self.stats[field] for field in ('rendered', 'cached', 'skipped', 'failed'))
+        self.stats['failed'] += max(0, total - processed)
+        self.report()
+
+    def _deliver(self, data, attempt, file_path):
+        if not self.send_email:
+            return
+        try:
+            if get_email_service().send_certificate_file_email(data, file_path):
+                self.stats['emailed'] += 1
+                mark_certificate_email_sent(data['user_id'], self.quiz_id,
+                                            certificate_attempt(attempt.completed_at))
+            else:
+                self.stats['failed'] += 1
+        except Exception as e:
+            current_app.logger.error(
+                f"Certificate email failed for user {data['user_id']}, quiz {self.quiz_id}: {str(e)}")
+            self.stats['failed'] += 1
+
+    def _drain(self, pending, return_when):
+        done, _ = wait(pending, return_when=return_when)
+        for future in done:
+            data, attempt = pending.pop(future)
+            try:
+                file_path = future.result()
+            except Exception as e:
+                current_app.logger.error(
+                    f"Certificate render failed for user {data['user_id']}, quiz {self.quiz_id}: {str(e)}")
+                self.stats['failed'] += 1
+                continue
+            self.stats['rendered'] += 1
+            self._deliver(data, attempt, file_path)
+
+    def run(self, user_ids=None):
+        context = db.session.query(Quiz, Chapter, Course).join(
+            Chapter, Quiz.chapter_id == Chapter.id
+        ).join(
+            Course, Chapter.course_id == Course.id
+        ).filter(Quiz.id == self.quiz_id).first()
+        if context is None:
+            raise ValueError(f"Quiz {self.quiz_id} not found")
+        quiz, chapter, course = context
+
+        renderer = self.generator.get_renderer()
+        pool = make_render_pool(self.generator.fonts_dir, self.processes)
+        pending = {}
+        try:
+            for rows in self.iter_rows(user_ids):
+                already_sent = set()
+                if self.send_email and not self.resend:
+                    already_sent = certificate_emails_sent(
+                        self.quiz_id, [attempt for _, attempt in rows])
+
+                for user, attempt in rows:
+                    if user.id in already_sent:
+                        self.stats['skipped'] += 1
+                        continue
+
+                    data = self.generator.build_certificate_data(
+                        user, quiz, chapter, course, attempt)
+                    file_path, html_content, cached = self.generator.certificate_path(data)
+                    if cached:
+                        self.stats['cached'] += 1
+                        self._deliver(data, attempt, file_path)
+                    elif pool is None:
+                        try:
+                            renderer.render_to_file(html_content, file_path)
+                            self.stats['rendered'] += 1
+                        except Exception as e:
+                            current_app.logger.error(
+                                f"Certificate render failed for user {user.id}, quiz {self.quiz_id}: {str(e)}")
+                            self.stats['failed'] += 1
+                            continue
+                        self._deliver(data, attempt, file_path)
+                    else:
+                        pending[submit_render(pool, (html_content, file_path))] = (data, attempt)
+                        if len(pending) >= self.max_pending:
+                            self._drain(pending, FIRST_COMPLETED)
+
+                self.report()
+
+            if pending:
+                self._drain(pending, ALL_COMPLETED)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        self.generator.evict()
+        self.report()
+        return dict(self.stats)
+
+    def issue(self):
+        self.start(self.count())
+        return self.run()
+
+
+def issue_quiz_certificates(quiz_id, job_id=None, send_email=True, resend=False):
+    return BulkCertificateIssuer(quiz_id, job_id=job_id, send_email=send_email,
+                                 resend=resend).issue()
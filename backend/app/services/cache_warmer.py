@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import exists
+from app.api.quiz import quiz_questions_payload
+from app.api.user import quiz_metadata_payload
+from app.grading import get_answer_key_version
+from app.models import Quiz, Submission, Subscription, db
+from app.utils import quiz_access_key, quiz_access_grant
+
+
+class QuizCacheWarmer:
+
+    def __init__(self, window_minutes=None, chunk_size=None):
+        self.window_minutes = window_minutes or current_app.config.get(
+            'QUIZ_WARM_WINDOW_MINUTES', 15)
+        self.chunk_size = chunk_size or current_app.config.get(
+            'QUIZ_WARM_CHUNK_SIZE', 1000)
+        self.access_timeout = current_app.config.get(
+            'QUIZ_WARM_ACCESS_TIMEOUT', 4 * 3600)
+
+    def upcoming_quizzes(self, now=None):
+        now = now or datetime.now()
+        # Quizzes that just went live are included so a late first run still helps
+        return Quiz.query.filter(
+            Quiz.is_scheduled == True,
+            Quiz.date_of_quiz.isnot(None),
+            Quiz.date_of_quiz >= now - timedelta(minutes=5),
+            Quiz.date_of_quiz <= now + timedelta(minutes=self.window_minutes)
+        ).order_by(Quiz.date_of_quiz).all()
+
+    def warm_access(self, quiz):
+        grant = quiz_access_grant(quiz)
+        warmed = 0
+        last_user_id = 0
+
+        # Keyset pagination over subscribers, one pipelined write per chunk
+        while True:
+            # Users who already submitted keep going through the database checks
+            user_ids = [row[0] for row in db.session.query(Subscription.user_id).filter(
+                Subscription.chapter_id == quiz.chapter_id,
+                Subscription.is_active == True,
+                Subscription.user_id > last_user_id,
+                ~exists().where(
+                    Submission.user_id == Subscription.user_id,
+                    Submission.quiz_id == quiz.id
+                )
+            ).order_by(Subscription.user_id).limit(self.chunk_size).all()]
+
+            if not user_ids:
+                return warmed
+
+            current_app.cache.set_many(
+                {quiz_access_key(quiz.id, user_id): grant for user_id in user_ids},
+                timeout=self.access_timeout,
+                tags=[f'quiz:{quiz.id}']
+            )
+            warmed += len(user_ids)
+            last_user_id = user_ids[-1]
+
+    def warm_quiz(self, quiz):
+        # Recomputed even when cached so the entries outlive the quiz start
+        quiz_questions_payload.warm(quiz.id)
+        quiz_metadata_payload.warm(quiz.id)
+        get_answer_key_version(quiz.id)
+        return self.warm_access(quiz)
+
+    def run(self):
+        warmed = []
+        for quiz in self.upcoming_quizzes():
+            try:
+                users = self.warm_quiz(quiz)
+                warmed.append({'quiz_id': quiz.id, 'users': users})
+            except Exception as e:
+                current_app.logger.warning(
+                    f"Cache warming failed for quiz {quiz.id}: {e}")
+        return {'quizzes': len(warmed), 'warmed': warmed}
+
+
+def warm_upcoming_quizzes(window_minutes=None):
+    return QuizCacheWarmer(window_minutes=window_minutes).run()
@@ -1,6 +1,13 @@
-from celery import current_app as celery_app
+from celery import current_app as celery_app, group
 from app.models import User, db
-from app.services.email_service import EmailService
+from app.services.email_service import get_email_service
+from app.services.bulk_certificates import BulkCertificateIssuer
+from app.services.cache_warmer import warm_upcoming_quizzes
+from app.services.certificate_mailer import send_certificate_email, release_certificate_email
+from app.services.monthly_activity import rollup_monthly_activity
+from app.services.quiz_session import flush_quiz_sessions
+from app.services.regrader import regrade_quiz
+from app.utils import update_job_status
 import logging
 
 # Set up logging
@@ -20,7 +27,8 @@ def send_daily_reminders_task(self):
         try:
             logger.info("Starting daily reminders task...")
 
-            email_service = EmailService()
+            # Shared per worker process so its SMTP connections are reused
+            email_service = get_email_service()
             result = email_service.send_bulk_daily_reminders()
 
             logger.info(f"Daily reminders task completed. Result: {result}")
@@ -43,7 +51,7 @@ def send_monthly_reports_task(self):
         try:
             logger.info("Starting monthly reports task...")
 
-            email_service = EmailService()
+            email_service = get_email_service()
             result = email_service.send_bulk_monthly_reports()
 
             logger.info(f"Monthly reports task completed. Result: {result}")
@@ -72,7 +80,7 @@ def schedule_user_emails_task(self, user_id):
                 return {'status': 'error', 'message': 'User not found'}
 
             # Send welcome email with information about upcoming features
-            email_service = EmailService()
+            email_service = get_email_service()
 
             # Note: The user will automatically be included in the bulk daily reminders
             # and monthly reports that run on schedule. No need to create individual schedules.
@@ -100,7 +108,7 @@ def send_individual_daily_reminder_task(self, user_id):
         try:
             logger.info(f"Sending daily reminder to user {user_id}...")
 
-            email_service = EmailService()
+            email_service = get_email_service()
             success = email_service.send_daily_reminder_email(user_id)
 
             if success:
@@ -131,7 +139,7 @@ def send_individual_monthly_report_task(self, user_id):
         try:
             logger.info(f"Sending monthly report to user {user_id}...")
 
-            email_service = EmailService()
+            email_service = get_email_service()
             success = email_service.send_monthly_report_email(user_id)
 
             if success:
@@ -153,3 +161,172 @@ def send_individual_monthly_report_task(self, user_id):
             logger.error(
                 f"Individual monthly report task failed for user {user_id}: {str(e)}")
             raise self.retry(countdown=300, max_retries=3, exc=e)
+
+
+@celery_app.task(bind=True, max_retries=3)
+def revaluate_quiz_task(self, quiz_id, job_id=None):
+    app = get_app_context()
+    with app.app_context():
+        try:
+            logger.info(f"Regrading submissions for quiz {quiz_id}...")
+
+            result = regrade_quiz(quiz_id, job_id=job_id)
+
+            logger.info(
+                f"Regrading completed for quiz {quiz_id}. Result: {result}")
+            return {
+                'status': 'success',
+                'message': f'Submissions regraded for quiz {quiz_id}',
+                'result': result
+            }
+
+        except Exception as e:
+            logger.error(f"Regrading task failed for quiz {quiz_id}: {str(e)}")
+            if self.request.retries >= self.max_retries:
+                if job_id:
+                    update_job_status(job_id, 'failed', 0,
+                                      f'Regrading failed: {str(e)}')
+                raise
+            if job_id:
+                update_job_status(job_id, 'pending', 0,
+                                  f'Regrading failed, retrying: {str(e)}')
+            raise self.retry(countdown=60, exc=e)
+
+
+@celery_app.task(bind=True)
+def warm_upcoming_quizzes_task(self):
+    app = get_app_context()
+    with app.app_context():
+        try:
+            result = warm_upcoming_quizzes()
+            if result['quizzes']:
+                logger.info(f"Warmed caches for upcoming quizzes: {result}")
+            return {
+                'status': 'success',
+                'message': f"Warmed {result['quizzes']} upcoming quizzes",
+                'result': result
+            }
+
+        except Exception as e:
+            logger.error(f"Cache warming task failed: {str(e)}")
+            # The next beat run retries, a late warm-up is no use
+            return {'status': 'error', 'message': str(e)}
+
+
+@celery_app.task(bind=True)
+def flush_quiz_sessions_task(self):
+    app = get_app_context()
+    with app.app_context():
+        try:
+            result = flush_quiz_sessions()
+            if result['answers']:
+                logger.info(f"Flushed idle quiz sessions: {result}")
+            return {
+                'status': 'success',
+                'message': f"Flushed {result['answers']} buffered answers",
+                'result': result
+            }
+
+        except Exception as e:
+            logger.error(f"Quiz session flush failed: {str(e)}")
+            # Unflushed sessions stay marked dirty for the next run
+            return {'status': 'error', 'message': str(e)}
+
+
+@celery_app.task(bind=True)
+def rollup_monthly_activity_task(self):
+    app = get_app_context()
+    with app.app_context():
+        try:
+            result = rollup_monthly_activity()
+            logger.info(f"Monthly activity rolled up: {result}")
+            return {
+                'status': 'success',
+                'message': 'Monthly activity rolled up',
+                'result': result
+            }
+
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Monthly activity rollup failed: {str(e)}")
+            # Submits keep the rows current meanwhile, only ranks go stale
+            raise self.retry(countdown=600, max_retries=3, exc=e)
+
+
+# Progress is tracked in the job status cache entry, not the result backend
+@celery_app.task(bind=True, max_retries=3, ignore_result=True)
+def send_certificate_email_task(self, user_id, quiz_id, job_id=None, attempt=None):
+    app = get_app_context()
+    with app.app_context():
+        try:
+            logger.info(
+                f"Sending certificate email to user {user_id} for quiz {quiz_id}...")
+
+            sent = send_certificate_email(user_id, quiz_id, attempt, job_id=job_id)
+            return {
+                'status': 'success' if sent else 'skipped',
+                'message': f'Certificate email for user {user_id}, quiz {quiz_id} '
+                           f'{"sent" if sent else "already sent"}'
+            }
+
+        except Exception as e:
+            logger.error(
+                f"Certificate email task failed for user {user_id}, quiz {quiz_id}: {str(e)}")
+            if self.request.retries >= self.max_retries:
+                # Give up and let a later submit queue it again
+                if job_id:
+                    release_certificate_email(user_id, quiz_id, attempt, job_id,
+                                              f'Certificate email failed: {str(e)}')
+                return {'status': 'error', 'message': str(e)}
+            raise self.retry(countdown=60 * (2 ** self.request.retries), exc=e)
+
+
+@celery_app.task(bind=True, ignore_result=True)
+def issue_bulk_certificates_task(self, quiz_id, job_id, resend=False):
+    app = get_app_context()
+    with app.app_context():
+        try:
+            issuer = BulkCertificateIssuer(quiz_id, job_id=job_id, resend=resend)
+            issuer.start(issuer.count())
+
+            # One task per chunk of users; worker concurrency bounds the
+            # renders in flight and each worker reuses its compiled renderer
+            chunks = list(issuer.iter_user_ids())
+            if chunks:
+                group(
+                    issue_certificate_chunk_task.si(quiz_id, user_ids, job_id, resend)
+                    for user_ids in chunks
+                ).apply_async()
+
+            logger.info(
+                f"Queued {len(chunks)} certificate chunks for quiz {quiz_id}")
+            return {
+                'status': 'success',
+                'message': f'Queued {len(chunks)} certificate chunks for quiz {quiz_id}'
+            }
+
+        except Exception as e:
+            logger.error(
+                f"Bulk certificate task failed for quiz {quiz_id}: {str(e)}")
+            update_job_status(job_id, 'failed', 0,
+                              f'Bulk certificates failed: {str(e)}')
+            return {'status': 'error', 'message': str(e)}
+
+
+@celery_app.task(bind=True, ignore_result=True)
+def issue_certificate_chunk_task(self, quiz_id, user_ids, job_id, resend=False):
+    app = get_app_context()
+    with app.app_context():
+        issuer = BulkCertificateIssuer(quiz_id, job_id=job_id, resend=resend)
+        try:
+            result = issuer.run(user_ids)
+            return {'status': 'success', 'result': result}
+
+        except Exception as e:
+            logger.error(
+                f"Certificate chunk failed for quiz {quiz_id}: {str(e)}")
+            # Not retried, a rerun would count users twice. Whatever was not
+            # processed is reported as failed so the job still completes, and
+            # issuing again skips everyone already emailed
+            issuer.fail_remaining(len(user_ids))
+            return {'status': 'error', 'message': str(e)}
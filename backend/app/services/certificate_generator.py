@@ -1,14 +1,266 @@
 import os
 import io
 import base64
+import hashlib
+import pathlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from jinja2 import Template
 from flask import current_app
-from datetime import datetime
-from weasyprint import HTML, CSS
-from app.utils import calculate_quiz_score
-from app.models import User, Quiz, Submission, Question
+from weasyprint import HTML, CSS, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+from app.utils import get_quiz_attempt, score_from_attempt
+from app.models import User, Quiz
 
 
+CERTIFICATE_CSS = """
+body {
+    margin: 0;
+    padding: 0;
+    font-family: 'Inter', sans-serif;
+    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    color: #333;
+}
+
+.certificate-container {
+    width: 297mm;
+    height: 210mm;
+    margin: 0;
+    padding: 0;
+    position: relative;
+    background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
+    border: 8px solid #4A90E2;
+    box-sizing: border-box;
+}
+
+.certificate-border {
+    position: absolute;
+    top: 15mm;
+    left: 15mm;
+    right: 15mm;
+    bottom: 15mm;
+    border: 3px solid #2C5AA0;
+    border-radius: 10px;
+    background: white;
+    box-shadow: inset 0 0 30px rgba(0,0,0,0.1);
+}
+
+.certificate-content {
+    padding: 30mm 25mm;
+    text-align: center;
+    position: relative;
+    height: 100%;
+    box-sizing: border-box;
+}
+
+.header {
+    margin-bottom: 20mm;
+}
+
+.logo {
+    width: 60px;
+    height: 60px;
+    background: linear-gradient(135deg, #4A90E2, #357ABD);
+    border-radius: 50%;
+    margin: 0 auto 15mm;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    color: white;
+    font-size: 24px;
+    font-weight: bold;
+}
+
+.title {
+    font-family: 'Playfair Display', serif;
+    font-size: 42px;
+    font-weight: 700;
+    color: #2C5AA0;
+    margin: 0 0 8mm;
+    text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
+}
+
+.subtitle {
+    font-size: 18px;
+    color: #666;
+    margin: 0 0 15mm;
+    font-weight: 300;
+}
+
+.recipient-section {
+    margin: 20mm 0;
+}
+
+.awarded-to {
+    font-size: 16px;
+    color: #888;
+    margin-bottom: 8mm;
+    font-weight: 400;
+}
+
+.recipient-name {
+    font-family: 'Playfair Display', serif;
+    font-size: 36px;
+    font-weight: 700;
+    color: #2C5AA0;
+    margin: 0 0 15mm;
+    padding-bottom: 5mm;
+    border-bottom: 2px solid #4A90E2;
+    display: inline-block;
+    min-width: 200mm;
+}
+
+.achievement-text {
+    font-size: 16px;
+    line-height: 1.6;
+    color: #555;
+    margin: 15mm 0;
+    max-width: 200mm;
+    margin-left: auto;
+    margin-right: auto;
+}
+
+.quiz-details {
+    background: linear-gradient(135deg, #f8f9ff, #e8f0ff);
+    border-radius: 10px;
+    padding: 12mm;
+    margin: 15mm 0;
+    border: 1px solid #e0e8ff;
+}
+
+.quiz-title {
+    font-size: 20px;
+    font-weight: 600;
+    color: #2C5AA0;
+    margin-bottom: 8mm;
+}
+
+.quiz-info {
+    display: flex;
+    justify-content: space-between;
+    font-size: 14px;
+    color: #666;
+    margin-bottom: 8mm;
+}
+
+.score-section {
+    display: flex;
+    justify-content: center;
+    gap: 20mm;
+    margin: 10mm 0;
+}
+
+.score-item {
+    text-align: center;
+}
+
+.score-value {
+    font-size: 24px;
+    font-weight: 700;
+    color: #4A90E2;
+    display: block;
+}
+
+.score-label {
+    font-size: 12px;
+    color: #888;
+    margin-top: 2mm;
+}
+
+.footer {
+    position: absolute;
+    bottom: 15mm;
+    left: 25mm;
+    right: 25mm;
+    display: flex;
+    justify-content: space-between;
+    align-items: center;
+    border-top: 1px solid #ddd;
+    padding-top: 8mm;
+}
+
+.certificate-id {
+    font-size: 12px;
+    color: #888;
+}
+
+.date-issued {
+    font-size: 12px;
+    color: #888;
+}
+
+.verification-note {
+    font-size: 10px;
+    color: #aaa;
+    text-align: center;
+    margin-top: 5mm;
+}
+
+.decorative-elements {
+    position: absolute;
+    top: 20mm;
+    left: 20mm;
+    right: 20mm;
+    bottom: 20mm;
+    pointer-events: none;
+}
+
+.corner-decoration {
+    position: absolute;
+    width: 30px;
+    height: 30px;
+    border: 3px solid #4A90E2;
+    opacity: 0.3;
+}
+
+.corner-decoration.top-left {
+    top: 0;
+    left: 0;
+    border-right: none;
+    border-bottom: none;
+}
+
+.corner-decoration.top-right {
+    top: 0;
+    right: 0;
+    border-left: none;
+    border-bottom: none;
+}
+
+.corner-decoration.bottom-left {
+    bottom: 0;
+    left: 0;
+    border-right: none;
+    border-top: none;
+}
+
+.corner-decoration.bottom-right {
+    bottom: 0;
+    right: 0;
+    border-left: none;
+    border-top: none;
+}
+
+.achievement-badge {
+    position: absolute;
+    top: 15mm;
+    right: 15mm;
+    width: 50px;
+    height: 50px;
+    background: linear-gradient(135deg, #FFD700, #FFA500);
+    border-radius: 50%;
+    display: flex;
+    align-items: center;
+    justify-content: center;
+    color: white;
+    font-size: 20px;
+    font-weight: bold;
+    box-shadow: 0 4px 15px rgba(255, 215, 0, 0.3);
+}
+"""
+
 CERTIFICATE_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="en">
@@ -16,253 +268,6 @@ CERTIFICATE_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Certificate of Achievement</title>
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Playfair+Display:wght@400;700&family=Inter:wght@300;400;500;600&display=swap');
-        
-        body {
-            margin: 0;
-            padding: 0;
-            font-family: 'Inter', sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: #333;
-        }
-        
-        .certificate-container {
-            width: 297mm;
-            height: 210mm;
-            margin: 0;
-            padding: 0;
-            position: relative;
-            background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%);
-            border: 8px solid #4A90E2;
-            box-sizing: border-box;
-        }
-        
-        .certificate-border {
-            position: absolute;
-            top: 15mm;
-            left: 15mm;
-            right: 15mm;
-            bottom: 15mm;
-            border: 3px solid #2C5AA0;
-            border-radius: 10px;
-            background: white;
-            box-shadow: inset 0 0 30px rgba(0,0,0,0.1);
-        }
-        
-        .certificate-content {
-            padding: 30mm 25mm;
-            text-align: center;
-            position: relative;
-            height: 100%;
-            box-sizing: border-box;
-        }
-        
-        .header {
-            margin-bottom: 20mm;
-        }
-        
-        .logo {
-            width: 60px;
-            height: 60px;
-            background: linear-gradient(135deg, #4A90E2, #357ABD);
-            border-radius: 50%;
-            margin: 0 auto 15mm;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-size: 24px;
-            font-weight: bold;
-        }
-        
-        .title {
-            font-family: 'Playfair Display', serif;
-            font-size: 42px;
-            font-weight: 700;
-            color: #2C5AA0;
-            margin: 0 0 8mm;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-        }
-        
-        .subtitle {
-            font-size: 18px;
-            color: #666;
-            margin: 0 0 15mm;
-            font-weight: 300;
-        }
-        
-        .recipient-section {
-            margin: 20mm 0;
-        }
-        
-        .awarded-to {
-            font-size: 16px;
-            color: #888;
-            margin-bottom: 8mm;
-            font-weight: 400;
-        }
-        
-        .recipient-name {
-            font-family: 'Playfair Display', serif;
-            font-size: 36px;
-            font-weight: 700;
-            color: #2C5AA0;
-            margin: 0 0 15mm;
-            padding-bottom: 5mm;
-            border-bottom: 2px solid #4A90E2;
-            display: inline-block;
-            min-width: 200mm;
-        }
-        
-        .achievement-text {
-            font-size: 16px;
-            line-height: 1.6;
-            color: #555;
-            margin: 15mm 0;
-            max-width: 200mm;
-            margin-left: auto;
-            margin-right: auto;
-        }
-        
-        .quiz-details {
-            background: linear-gradient(135deg, #f8f9ff, #e8f0ff);
-            border-radius: 10px;
-            padding: 12mm;
-            margin: 15mm 0;
-            border: 1px solid #e0e8ff;
-        }
-        
-        .quiz-title {
-            font-size: 20px;
-            font-weight: 600;
-            color: #2C5AA0;
-            margin-bottom: 8mm;
-        }
-        
-        .quiz-info {
-            display: flex;
-            justify-content: space-between;
-            font-size: 14px;
-            color: #666;
-            margin-bottom: 8mm;
-        }
-        
-        .score-section {
-            display: flex;
-            justify-content: center;
-            gap: 20mm;
-            margin: 10mm 0;
-        }
-        
-        .score-item {
-            text-align: center;
-        }
-        
-        .score-value {
-            font-size: 24px;
-            font-weight: 700;
-            color: #4A90E2;
-            display: block;
-        }
-        
-        .score-label {
-            font-size: 12px;
-            color: #888;
-            margin-top: 2mm;
-        }
-        
-        .footer {
-            position: absolute;
-            bottom: 15mm;
-            left: 25mm;
-            right: 25mm;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            border-top: 1px solid #ddd;
-            padding-top: 8mm;
-        }
-        
-        .certificate-id {
-            font-size: 12px;
-            color: #888;
-        }
-        
-        .date-issued {
-            font-size: 12px;
-            color: #888;
-        }
-        
-        .verification-note {
-            font-size: 10px;
-            color: #aaa;
-            text-align: center;
-            margin-top: 5mm;
-        }
-        
-        .decorative-elements {
-            position: absolute;
-            top: 20mm;
-            left: 20mm;
-            right: 20mm;
-            bottom: 20mm;
-            pointer-events: none;
-        }
-        
-        .corner-decoration {
-            position: absolute;
-            width: 30px;
-            height: 30px;
-            border: 3px solid #4A90E2;
-            opacity: 0.3;
-        }
-        
-        .corner-decoration.top-left {
-            top: 0;
-            left: 0;
-            border-right: none;
-            border-bottom: none;
-        }
-        
-        .corner-decoration.top-right {
-            top: 0;
-            right: 0;
-            border-left: none;
-            border-bottom: none;
-        }
-        
-        .corner-decoration.bottom-left {
-            bottom: 0;
-            left: 0;
-            border-right: none;
-            border-top: none;
-        }
-        
-        .corner-decoration.bottom-right {
-            bottom: 0;
-            right: 0;
-            border-left: none;
-            border-top: none;
-        }
-        
-        .achievement-badge {
-            position: absolute;
-            top: 15mm;
-            right: 15mm;
-            width: 50px;
-            height: 50px;
-            background: linear-gradient(135deg, #FFD700, #FFA500);
-            border-radius: 50%;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-size: 20px;
-            font-weight: bold;
-            box-shadow: 0 4px 15px rgba(255, 215, 0, 0.3);
-        }
-    </style>
 </head>
 <body>
     <div class="certificate-container">
@@ -334,15 +339,170 @@ CERTIFICATE_TEMPLATE = """
 </html>
 """
 
+CERTIFICATE_PAGE_CSS = """
+    @page {
+        size: A4 landscape;
+        margin: 0;
+    }
+    body {
+        margin: 0;
+        padding: 0;
+    }
+"""
+
+
+# Local font files looked up in CERTIFICATE_FONTS_DIR, first match per face wins
+CERTIFICATE_FONTS = {
+    'Inter': [('Inter-Light', 300), ('Inter-Regular', 400), ('Inter-Medium', 500),
+              ('Inter-SemiBold', 600), ('Inter-Bold', 700)],
+    'Playfair Display': [('PlayfairDisplay-Regular', 400), ('PlayfairDisplay-Bold', 700)],
+}
+FONT_FORMATS = (('.woff2', 'woff2'), ('.woff', 'woff'),
+                ('.ttf', 'truetype'), ('.otf', 'opentype'))
+
+
+def certificate_url_fetcher(url, *args, **kwargs):
+    # Only bundled assets, a certificate render never touches the network
+    if url.startswith(('file:', 'data:')):
+        return default_url_fetcher(url, *args, **kwargs)
+    raise ValueError(f"Refusing to fetch {url} while rendering a certificate")
+
+
+def font_face_css(fonts_dir) -> tuple[str, list]:
+    rules = []
+    missing = []
+    for family, faces in CERTIFICATE_FONTS.items():
+        for name, weight in faces:
+            for extension, font_format in FONT_FORMATS:
+                path = os.path.join(fonts_dir, name + extension) if fonts_dir else None
+                if path and os.path.isfile(path):
+                    rules.append(
+                        f"@font-face {{ font-family: '{family}'; font-weight: {weight}; "
+                        f"src: url('{pathlib.Path(path).as_uri()}') format('{font_format}'); }}")
+                    break
+            else:
+                missing.append(name)
+    return '\n'.join(rules), missing
+
+
+class CertificateRenderer:
+    # Template, stylesheets and font configuration are built once per process;
+    # a render only fills in the template and lays out the page
+
+    def __init__(self, fonts_dir=None):
+        self.template = Template(CERTIFICATE_TEMPLATE)
+        font_css, self.missing_fonts = font_face_css(fonts_dir)
+        stylesheet = font_css + CERTIFICATE_CSS + CERTIFICATE_PAGE_CSS
+        self.font_config = FontConfiguration()
+        self.stylesheets = [CSS(string=stylesheet, font_config=self.font_config,
+                                url_fetcher=certificate_url_fetcher)]
+        # Part of every PDF's content hash, new styles or fonts mean new files
+        self.fingerprint = hashlib.sha256(stylesheet.encode('utf-8')).hexdigest()
+        # Shared font configuration, one layout at a time
+        self._lock = threading.Lock()
+
+    def render_html(self, data: dict) -> str:
+        return self.template.render(**data)
+
+    def content_hash(self, html_content: str) -> str:
+        return hashlib.sha256(
+            (self.fingerprint + html_content).encode('utf-8')).hexdigest()
+
+    def render_pdf(self, html_content: str) -> bytes:
+        with self._lock:
+            return HTML(string=html_content, url_fetcher=certificate_url_fetcher).write_pdf(
+                stylesheets=self.stylesheets, font_config=self.font_config)
+
+    def render_to_file(self, html_content: str, file_path: str) -> str:
+        write_file_atomic(file_path, self.render_pdf(html_content))
+        return file_path
+
+
+def write_file_atomic(file_path: str, content: bytes):
+    # Concurrent renders of the same certificate each write their own temp
+    # file, the rename makes whichever finishes last visible
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+_worker_renderer = None
+
+
+def _init_render_worker(fonts_dir):
+    global _worker_renderer
+    _worker_renderer = CertificateRenderer(fonts_dir)
+
+
+def _render_in_worker(job):
+    return _worker_renderer.render_to_file(*job)
+
+
+def make_render_pool(fonts_dir=None, processes=None):
+    # Layout is CPU bound, so batches go to a process pool where each worker
+    # builds its renderer once. Daemonic processes (Celery prefork workers)
+    # cannot start one, callers render in-process when this returns None
+    processes = processes or os.cpu_count() or 1
+    if processes < 2 or multiprocessing.current_process().daemon:
+        return None
+    return ProcessPoolExecutor(max_workers=processes, initializer=_init_render_worker,
+                               initargs=(fonts_dir,))
+
+
+def submit_render(pool, job):
+    # job is an (html, file_path) pair, the future resolves to file_path
+    return pool.submit(_render_in_worker, job)
+
+
+def render_certificates(renderer: CertificateRenderer, jobs, fonts_dir=None, processes=None) -> list:
+    jobs = list(jobs)
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    pool = make_render_pool(fonts_dir, processes)
+    if pool is None:
+        return [renderer.render_to_file(*job) for job in jobs]
+
+    with pool:
+        return list(pool.map(_render_in_worker, jobs,
+                             chunksize=max(1, len(jobs) // (processes * 4))))
+
 
 class CertificateGenerator:
 
     def __init__(self):
-        self.template = Template(CERTIFICATE_TEMPLATE)
+        self.output_dir = None
+        self.fonts_dir = None
+        self.renderer = None
 
-    def generate_certificate_id(self, user_id: int, quiz_id: int) -> str:
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        return f"CERT-{user_id}-{quiz_id}-{timestamp}"
+    def get_renderer(self):
+        if self.renderer is None:
+            self.fonts_dir = current_app.config.get('CERTIFICATE_FONTS_DIR')
+            self.renderer = CertificateRenderer(self.fonts_dir)
+            if self.renderer.missing_fonts:
+                current_app.logger.warning(
+                    f"Certificate fonts not found in {self.fonts_dir}, using system "
+                    f"fallbacks for: {', '.join(self.renderer.missing_fonts)}")
+        return self.renderer
+
+    def _get_output_dir(self):
+        if self.output_dir is None:
+            self.output_dir = current_app.config.get(
+                'CERTIFICATE_OUTPUT_DIR', '/tmp/certificates')
+        os.makedirs(self.output_dir, exist_ok=True)
+        return self.output_dir
+
+    def generate_certificate_id(self, user_id: int, quiz_id: int, completed_at=None,
+                                obtained_marks: float = 0, total_marks: float = 0) -> str:
+        # Same attempt, same id; a retake or a regrade gives a new one
+        completed = completed_at.isoformat() if completed_at else ''
+        digest = hashlib.sha256(
+            f"{user_id}:{quiz_id}:{completed}:{obtained_marks}:{total_marks}".encode('utf-8')
+        ).hexdigest()
+        return f"CERT-{user_id}-{quiz_id}-{digest[:12].upper()}"
 
     def get_certificate_data(self, user_id: int, quiz_id: int) -> dict:
         user = User.query.get(user_id)
@@ -351,73 +511,134 @@ class CertificateGenerator:
         if not user or not quiz:
             raise ValueError("User or Quiz not found")
 
-        submissions = Submission.query.filter_by(
-            user_id=user_id,
-            quiz_id=quiz_id
-        ).all()
+        attempt = get_quiz_attempt(quiz_id, user_id)
 
-        if not submissions:
+        if not attempt:
             raise ValueError("Quiz not completed by user")
 
-        score = calculate_quiz_score(quiz_id, user_id)
-        completion_date = max([s.timestamp for s in submissions])
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
+        return self.build_certificate_data(user, quiz, quiz.chapter, quiz.chapter.course, attempt)
+
+    def build_certificate_data(self, user, quiz, chapter, course, attempt) -> dict:
+        # From already loaded rows, bulk issuing fetches them set-wise
+        score = score_from_attempt(attempt)
+        completion_date = attempt.completed_at
 
         return {
             'user_name': user.name,
             'user_email': user.email,
             'quiz_title': quiz.title,
-            'chapter_name': quiz.chapter.name,
-            'course_name': quiz.chapter.course.name,
+            'chapter_name': chapter.name,
+            'course_name': course.name,
             'score_percentage': round(score['percentage'], 1),
             'obtained_marks': score['obtained_marks'],
             'total_marks': score['total_marks'],
-            'total_questions': len(questions),
+            'total_questions': attempt.question_count,
             'completion_date': completion_date.strftime("%B %d, %Y"),
-            'certificate_id': self.generate_certificate_id(user_id, quiz_id),
-            'quiz_id': quiz_id,
-            'user_id': user_id
+            'certificate_id': self.generate_certificate_id(
+                user.id, quiz.id, completion_date,
+                score['obtained_marks'], score['total_marks']),
+            'quiz_id': quiz.id,
+            'user_id': user.id
         }
 
     def generate_certificate_html(self, user_id: int, quiz_id: int) -> str:
         try:
             data = self.get_certificate_data(user_id, quiz_id)
-            html_content = self.template.render(**data)
-            return html_content
+            return self.get_renderer().render_html(data)
         except Exception as e:
             current_app.logger.error(
                 f"Error generating certificate HTML: {str(e)}")
             raise
 
-    def generate_certificate_pdf(self, user_id: int, quiz_id: int) -> bytes:
+    def certificate_path(self, data: dict) -> tuple[str, str, bool]:
+        # Rendered PDFs are stored under the hash of everything that goes into
+        # them, so an unchanged certificate is rendered once and then streamed.
+        # Returns the path, the HTML to render it from and whether it exists
+        renderer = self.get_renderer()
+        html_content = renderer.render_html(data)
+        file_path = os.path.join(self._get_output_dir(),
+                                 f"{renderer.content_hash(html_content)}.pdf")
         try:
-            html_content = self.generate_certificate_html(user_id, quiz_id)
-            css = CSS(string="""
-                @page {
-                    size: A4 landscape;
-                    margin: 0;
-                }
-                body {
-                    margin: 0;
-                    padding: 0;
-                }
-            """)
-
-            # Generate PDF
-            html_doc = HTML(string=html_content)
-            pdf_bytes = html_doc.write_pdf(stylesheets=[css])
-
-            return pdf_bytes
+            # Refresh the mtime, eviction drops the least recently used files
+            os.utime(file_path)
+            return file_path, html_content, True
+        except FileNotFoundError:
+            return file_path, html_content, False
 
+    def get_certificate_file(self, user_id: int, quiz_id: int) -> tuple[str, dict]:
+        data = self.get_certificate_data(user_id, quiz_id)
+        file_path, html_content, cached = self.certificate_path(data)
+        if cached:
+            return file_path, data
+
+        try:
+            self.get_renderer().render_to_file(html_content, file_path)
         except Exception as e:
             current_app.logger.error(
                 f"Error generating certificate PDF: {str(e)}")
             raise
 
-        except Exception as e:
-            current_app.logger.error(
-                f"Error saving certificate file: {str(e)}")
-            raise
+        self.evict(keep=file_path)
+        return file_path, data
+
+    def get_certificate_files(self, pairs, processes=None) -> dict:
+        # Batch form of get_certificate_file for (user_id, quiz_id) pairs,
+        # cache misses are rendered together in a process pool
+        files = {}
+        jobs = []
+        for user_id, quiz_id in pairs:
+            data = self.get_certificate_data(user_id, quiz_id)
+            file_path, html_content, cached = self.certificate_path(data)
+            files[(user_id, quiz_id)] = (file_path, data)
+            if not cached:
+                jobs.append((html_content, file_path))
+
+        if jobs:
+            # Several pairs can share one file only if their content is identical
+            jobs = list(dict((path, (html, path)) for html, path in jobs).values())
+            render_certificates(self.get_renderer(), jobs,
+                                fonts_dir=self.fonts_dir, processes=processes)
+            self.evict(keep={path for _, path in jobs})
+        return files
+
+    def evict(self, keep=None):
+        max_bytes = current_app.config.get(
+            'CERTIFICATE_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+
+        entries = []
+        total = 0
+        with os.scandir(self._get_output_dir()) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= max_bytes:
+            return 0
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if path == keep or (isinstance(keep, set) and path in keep):
+                continue
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def generate_certificate_pdf(self, user_id: int, quiz_id: int) -> bytes:
+        file_path, _ = self.get_certificate_file(user_id, quiz_id)
+        with open(file_path, 'rb') as pdf_file:
+            return pdf_file.read()
 
     def can_generate_certificate(self, user_id: int, quiz_id: int) -> tuple[bool, str]:
         try:
@@ -429,12 +650,7 @@ class CertificateGenerator:
             if not quiz:
                 return False, "Quiz not found"
 
-            submissions = Submission.query.filter_by(
-                user_id=user_id,
-                quiz_id=quiz_id
-            ).all()
-
-            if not submissions:
+            if not get_quiz_attempt(quiz_id, user_id):
                 return False, "Quiz not completed"
 
             return True, "Certificate can be generated"
@@ -445,6 +661,15 @@ class CertificateGenerator:
             return False, f"Error: {str(e)}"
 
 
+_certificate_generator = None
+_certificate_generator_lock = threading.Lock()
+
+
 def get_certificate_generator() -> CertificateGenerator:
-    certificate_generator = CertificateGenerator()
-    return certificate_generator
+    # One per process so the compiled template and stylesheets are reused
+    global _certificate_generator
+    if _certificate_generator is None:
+        with _certificate_generator_lock:
+            if _certificate_generator is None:
+                _certificate_generator = CertificateGenerator()
+    return _certificate_generator
@@ -0,0 +1,101 @@
+from flask import current_app
+from app.utils import update_job_status
+
+
+def certificate_attempt(completed_at):
+    # Every submit moves the attempt's completion time, so a retake gets its
+    # own email while redeliveries of one attempt share a marker
+    return completed_at.strftime('%Y%m%d%H%M%S%f') if completed_at else 'none'
+
+
+def certificate_job_id(user_id, quiz_id, attempt):
+    # Stable per attempt so task redeliveries share one job
+    return f"certificate_{quiz_id}_{user_id}_{attempt}"
+
+
+def _marker_key(cache, user_id, quiz_id, attempt):
+    return f"{cache.key_prefix}certificate_email:{quiz_id}:{user_id}:{attempt}"
+
+
+def _marker(user_id, quiz_id, attempt):
+    cache = getattr(current_app, 'cache', None)
+    if cache is None or cache.redis_client is None:
+        return None, None
+    return cache.redis_client, _marker_key(cache, user_id, quiz_id, attempt)
+
+
+def queue_certificate_email(user_id, quiz_id, completed_at):
+    attempt = certificate_attempt(completed_at)
+    job_id = certificate_job_id(user_id, quiz_id, attempt)
+    redis, marker = _marker(user_id, quiz_id, attempt)
+
+    # Only the first queue of an attempt sends the email, later ones reuse its job
+    if redis is not None and not redis.set(
+            marker, 'queued', nx=True,
+            ex=current_app.config.get('CERTIFICATE_EMAIL_DEDUPE_TTL', 24 * 3600)):
+        return job_id
+
+    update_job_status(job_id, 'pending', 0, 'Certificate email queued')
+    try:
+        # Import here to avoid circular imports
+        from app.services.celery_tasks import send_certificate_email_task
+        # Fail fast on a broker outage rather than stalling the submit request
+        send_certificate_email_task.apply_async(
+            (user_id, quiz_id, job_id, attempt),
+            retry_policy={'max_retries': 2, 'interval_start': 0, 'interval_step': 0.5})
+    except Exception as e:
+        # Let the next submit try again, the certificate stays downloadable
+        release_certificate_email(user_id, quiz_id, attempt, job_id,
+                                  f'Could not queue certificate email: {str(e)}')
+        current_app.logger.error(
+            f"Could not queue certificate email for user {user_id}, quiz {quiz_id}: {str(e)}")
+    return job_id
+
+
+def certificate_emails_sent(quiz_id, attempts) -> set:
+    # User ids whose current attempt, as a QuizAttempt, was already emailed
+    cache = getattr(current_app, 'cache', None)
+    if cache is None or cache.redis_client is None or not attempts:
+        return set()
+    attempts = list(attempts)
+    markers = cache.redis_client.mget([
+        _marker_key(cache, attempt.user_id, quiz_id, certificate_attempt(attempt.completed_at))
+        for attempt in attempts
+    ])
+    return {attempt.user_id for attempt, value in zip(attempts, markers) if value == b'sent'}
+
+
+def mark_certificate_email_sent(user_id, quiz_id, attempt):
+    redis, marker = _marker(user_id, quiz_id, attempt)
+    if redis is not None:
+        redis.set(marker, 'sent',
+                  ex=current_app.config.get('CERTIFICATE_EMAIL_DEDUPE_TTL', 24 * 3600))
+
+
+def release_certificate_email(user_id, quiz_id, attempt, job_id, message):
+    redis, marker = _marker(user_id, quiz_id, attempt)
+    if redis is not None:
+        redis.delete(marker)
+    update_job_status(job_id, 'failed', 0, message)
+
+
+def send_certificate_email(user_id, quiz_id, attempt, job_id=None):
+    from app.services.email_service import get_email_service
+
+    job_id = job_id or certificate_job_id(user_id, quiz_id, attempt)
+    redis, marker = _marker(user_id, quiz_id, attempt)
+
+    # Celery delivers at least once, a redelivered task must not mail twice
+    if redis is not None and redis.get(marker) == b'sent':
+        update_job_status(job_id, 'completed', 100, 'Certificate email already sent')
+        return False
+
+    update_job_status(job_id, 'running', 50, 'Rendering and sending certificate')
+    if not get_email_service().send_certificate_email(user_id, quiz_id):
+        raise RuntimeError(
+            f"Certificate email for user {user_id}, quiz {quiz_id} was not sent")
+
+    if redis is not None:
+        redis.set(marker, 'sent', xx=True, keepttl=True)
+    update_job_status(job_id, 'completed', 100, 'Certificate email sent')
+    return True
@@ -1,12 +1,13 @@
-import smtplib
+import threading
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
 from email import encoders
 from flask import current_app
-from app.models import User, Quiz, Subscription, Submission
-from datetime import datetime, timedelta
-from app.utils import get_user_quiz_stats
+from app.services.smtp_pool import SMTPConnectionPool
+from app.services.mail_delivery import get_delivery_engine
+from app.services.reminder_planner import ReminderPlanner
+from app.services.monthly_activity import MonthlyReportPlanner, format_best_quiz, format_rank
 import tempfile
 import os
 
@@ -149,7 +150,7 @@ EMAIL_TEMPLATES = {
                 <div class="content">
                     <p>Hello {user_name},</p>
                     
-                    <p>Here's your quiz performance summary for the past month:</p>
+                    <p>Here's your quiz performance summary for {month_year}:</p>
                     
                     <div class="stats-box">
                         <h3 class="stats-title">📈 Monthly Activity</h3>
@@ -157,6 +158,9 @@ EMAIL_TEMPLATES = {
                             <li class="stats-item"><strong>Quizzes Taken:</strong> {monthly_quizzes}</li>
                             <li class="stats-item"><strong>Questions Answered:</strong> {monthly_questions}</li>
                             <li class="stats-item"><strong>Correct Answers:</strong> {monthly_correct}</li>
+                            <li class="stats-item"><strong>Average Score:</strong> {average_score}%</li>
+                            <li class="stats-item"><strong>Best Quiz:</strong> {best_quiz}</li>
+                            <li class="stats-item"><strong>Rank:</strong> {rank}</li>
                         </ul>
                         <div class="highlight">{monthly_accuracy}% Monthly Accuracy</div>
                     </div>
@@ -195,78 +199,114 @@ class EmailService:
         self.smtp_email = None
         self.smtp_password = None
         self.smtp_use_tls = None
+        self.smtp_use_ssl = None
         self.sender_name = None
+        self.smtp_pool = None
+        self._init_lock = threading.Lock()
 
-    def _init_config(self):
+    def _ensure_initialized(self):
         if self._initialized:
-            from flask import current_app
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
             self.smtp_server = current_app.config.get(
                 'MAIL_SERVER', 'localhost')
             self.smtp_port = current_app.config.get('MAIL_PORT', 587)
             self.smtp_email = current_app.config.get('MAIL_EMAIL', '')
             self.smtp_password = current_app.config.get('MAIL_PASSWORD', '')
             self.smtp_use_tls = current_app.config.get('MAIL_USE_TLS', True)
+            self.smtp_use_ssl = current_app.config.get('MAIL_USE_SSL', False)
             self.sender_name = current_app.config.get(
                 'MAIL_SENDER_NAME', 'Quizzo Team')
+
+            pool_options = {
+                'size': current_app.config.get('MAIL_POOL_SIZE', 4),
+                'max_messages': current_app.config.get('MAIL_MAX_MESSAGES_PER_CONNECTION', 100),
+                'keepalive_interval': current_app.config.get('MAIL_KEEPALIVE_INTERVAL', 30),
+                'timeout': current_app.config.get('MAIL_TIMEOUT', 30)
+            }
+            if self.smtp_email and self.smtp_password:
+                # Use authenticated SMTP
+                self.smtp_pool = SMTPConnectionPool(
+                    self.smtp_server, self.smtp_port,
+                    username=self.smtp_email, password=self.smtp_password,
+                    use_tls=self.smtp_use_tls and not self.smtp_use_ssl,
+                    use_ssl=self.smtp_use_ssl, **pool_options)
+            else:
+                # Use local SMTP without authentication
+                self.smtp_pool = SMTPConnectionPool('localhost', 25, **pool_options)
             self._initialized = True
 
-    def send_email(self, recipient_email: str, subject: str, html_body: str, attachments: list = None):
+    def build_message(self, recipient_email: str, subject: str, html_body: str, attachments: list = None):
+        self._ensure_initialized()
 
+        # Create message
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.sender_name} <{self.smtp_email}>"
+        msg['To'] = recipient_email
+        msg['Subject'] = subject
+
+        # Add HTML body
+        html_part = MIMEText(html_body, 'html')
+        msg.attach(html_part)
+
+        # Add attachments if provided
+        if attachments:
+            for attachment in attachments:
+                if isinstance(attachment, dict):
+                    filename = attachment.get('filename', 'attachment')
+                    content = attachment.get('content', b'')
+                    mimetype = attachment.get(
+                        'mimetype', 'application/octet-stream')
+
+                    part = MIMEBase('application', 'octet-stream')
+                    part.set_payload(content)
+                    encoders.encode_base64(part)
+                    part.add_header(
+                        'Content-Disposition',
+                        f'attachment; filename= {filename}'
+                    )
+                    msg.attach(part)
+
+        return msg
+
+    def send_message(self, msg):
         self._ensure_initialized()
 
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.sender_name} <{self.smtp_email}>"
-            msg['To'] = recipient_email
-            msg['Subject'] = subject
-
-            # Add HTML body
-            html_part = MIMEText(html_body, 'html')
-            msg.attach(html_part)
-
-            # Add attachments if provided
-            if attachments:
-                for attachment in attachments:
-                    if isinstance(attachment, dict):
-                        filename = attachment.get('filename', 'attachment')
-                        content = attachment.get('content', b'')
-                        mimetype = attachment.get(
-                            'mimetype', 'application/octet-stream')
-
-                        part = MIMEBase('application', 'octet-stream')
-                        part.set_payload(content)
-                        encoders.encode_base64(part)
-                        part.add_header(
-                            'Content-Disposition',
-                            f'attachment; filename= {filename}'
-                        )
-                        msg.attach(part)
-
-            # Send email
-            if self.smtp_email and self.smtp_password:
-                # Use authenticated SMTP
-                server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-                if self.smtp_use_tls:
-                    server.starttls()
-                server.login(self.smtp_email, self.smtp_password)
-                server.send_message(msg)
-                server.quit()
-            else:
-                # Use local SMTP without authentication
-                server = smtplib.SMTP('localhost', 25)
-                server.send_message(msg)
-                server.quit()
+            # Send over a pooled connection, repeated sends skip the
+            # per-message connect, STARTTLS and login
+            self.smtp_pool.send_message(msg)
 
             current_app.logger.info(
-                f"Email sent successfully to {recipient_email}")
+                f"Email sent successfully to {msg['To']}")
             return True
 
+        except Exception as e:
+            current_app.logger.error(
+                f"Failed to send email to {msg['To']}: {str(e)}")
+            return False
+
+    def send_email(self, recipient_email: str, subject: str, html_body: str, attachments: list = None):
+        # Synchronous one-off send; bulk campaigns go through deliver_bulk
+        try:
+            msg = self.build_message(
+                recipient_email, subject, html_body, attachments)
         except Exception as e:
             current_app.logger.error(
                 f"Failed to send email to {recipient_email}: {str(e)}")
             return False
 
+        return self.send_message(msg)
+
+    def deliver_bulk(self, campaign: str, messages, on_progress=None):
+        # messages yields (key, message) pairs; keys already delivered in an
+        # earlier run of the same campaign are skipped
+        self._ensure_initialized()
+        return get_delivery_engine(self.smtp_pool, campaign).deliver(
+            messages, on_progress=on_progress)
+
     def send_certificate_email(self, user_id: int, quiz_id: int):
         self._ensure_initialized()
 
@@ -283,65 +323,11 @@ class EmailService:
                     f"Cannot generate certificate for user {user_id}, quiz {quiz_id}: {message}")
                 return False
 
-            # Get user and certificate data
-            user = User.query.get(user_id)
-            quiz = Quiz.query.get(quiz_id)
-
-            if not user or not quiz:
-                current_app.logger.error(
-                    f"User {user_id} or Quiz {quiz_id} not found")
-                return False
-
-            certificate_data = cert_generator.get_certificate_data(
+            # Reuses the PDF rendered for downloads, if any
+            certificate_path, certificate_data = cert_generator.get_certificate_file(
                 user_id, quiz_id)
 
-            # Generate certificate PDF
-            pdf_bytes = cert_generator.generate_certificate_pdf(
-                user_id, quiz_id)
-
-            # Prepare email content
-            template = EMAIL_TEMPLATES['certificate_completion']
-            subject = template['subject'].format(quiz_title=quiz.title)
-
-            # Dashboard URL (you can configure this in app config)
-            dashboard_url = current_app.config.get(
-                'FRONTEND_DASHBOARD_URL', 'http://localhost:3000/dashboard')
-
-            html_body = template['html_template'].format(
-                user_name=user.name,
-                quiz_title=quiz.title,
-                course_name=quiz.chapter.course.name,
-                chapter_name=quiz.chapter.name,
-                completion_date=certificate_data['completion_date'],
-                score_percentage=certificate_data['score_percentage'],
-                total_questions=certificate_data['total_questions'],
-                obtained_marks=certificate_data['obtained_marks'],
-                total_marks=certificate_data['total_marks'],
-                certificate_id=certificate_data['certificate_id'],
-                dashboard_url=dashboard_url
-            )
-
-            # Prepare attachment
-            certificate_filename = f"certificate_{certificate_data['certificate_id']}.pdf"
-            attachments = [{
-                'filename': certificate_filename,
-                'content': pdf_bytes,
-                'mimetype': 'application/pdf'
-            }]
-
-            # Send email
-            success = self.send_email(
-                recipient_email=user.email,
-                subject=subject,
-                html_body=html_body,
-                attachments=attachments
-            )
-
-            if success:
-                current_app.logger.info(
-                    f"Certificate email sent to {user.email} for quiz {quiz.title}")
-
-            return success
+            return self.send_certificate_file_email(certificate_data, certificate_path)
 
         except ImportError:
             current_app.logger.error(
@@ -352,78 +338,112 @@ class EmailService:
                 f"Failed to send certificate email: {str(e)}")
             return False
 
-    def send_daily_reminder_email(self, user_id: int):
+    def send_certificate_file_email(self, certificate_data: dict, certificate_path: str):
+        # Everything comes from the certificate data, so bulk sends need no
+        # further queries per recipient
         self._ensure_initialized()
 
-        try:
-            user = User.query.get(user_id)
-            if not user:
-                current_app.logger.error(f"User {user_id} not found")
-                return False
-
-            # Find upcoming quizzes for tomorrow
-            tomorrow = datetime.now() + timedelta(days=1)
+        with open(certificate_path, 'rb') as certificate_file:
+            pdf_bytes = certificate_file.read()
+
+        # Prepare email content
+        template = EMAIL_TEMPLATES['certificate_completion']
+        subject = template['subject'].format(
+            quiz_title=certificate_data['quiz_title'])
+
+        # Dashboard URL (you can configure this in app config)
+        dashboard_url = current_app.config.get(
+            'FRONTEND_DASHBOARD_URL', 'http://localhost:3000/dashboard')
+
+        html_body = template['html_template'].format(
+            user_name=certificate_data['user_name'],
+            quiz_title=certificate_data['quiz_title'],
+            course_name=certificate_data['course_name'],
+            chapter_name=certificate_data['chapter_name'],
+            completion_date=certificate_data['completion_date'],
+            score_percentage=certificate_data['score_percentage'],
+            total_questions=certificate_data['total_questions'],
+            obtained_marks=certificate_data['obtained_marks'],
+            total_marks=certificate_data['total_marks'],
+            certificate_id=certificate_data['certificate_id'],
+            dashboard_url=dashboard_url
+        )
+
+        # Prepare attachment
+        certificate_filename = f"certificate_{certificate_data['certificate_id']}.pdf"
+        attachments = [{
+            'filename': certificate_filename,
+            'content': pdf_bytes,
+            'mimetype': 'application/pdf'
+        }]
+
+        # Send email
+        success = self.send_email(
+            recipient_email=certificate_data['user_email'],
+            subject=subject,
+            html_body=html_body,
+            attachments=attachments
+        )
+
+        if success:
+            current_app.logger.info(
+                f"Certificate email sent to {certificate_data['user_email']} "
+                f"for quiz {certificate_data['quiz_title']}")
+
+        return success
+
+    def build_daily_reminder_email(self, plan: dict):
+        # plan comes from ReminderPlanner: the user's name, email and
+        # upcoming quizzes with their chapter and course names
+
+        # Prepare email content
+        template = EMAIL_TEMPLATES['daily_reminder']
+        subject = template['subject']
+
+        # Dashboard URL
+        dashboard_url = current_app.config.get(
+            'FRONTEND_DASHBOARD_URL', 'http://localhost:3000/dashboard')
+
+        # Generate quiz list HTML
+        quiz_list_html = ""
+        for quiz in plan['quizzes']:
+            quiz_time = quiz['date_of_quiz'].strftime(
+                '%I:%M %p') if quiz['date_of_quiz'] else 'TBD'
+            quiz_list_html += f'''
+            <div class="quiz-item">
+                <h4 style="margin: 0 0 10px 0; color: #4A90E2;">{quiz['title']}</h4>
+                <p style="margin: 5px 0;"><strong>Course:</strong> {quiz['course_name']}</p>
+                <p style="margin: 5px 0;"><strong>Chapter:</strong> {quiz['chapter_name']}</p>
+                <p style="margin: 5px 0;"><strong>Time:</strong> {quiz_time}</p>
+                <p style="margin: 5px 0;"><strong>Duration:</strong> {quiz['time_duration'] or 'No limit'}</p>
+            </div>
+            '''
 
-            # Get user's subscribed chapters
-            subscriptions = Subscription.query.filter_by(
-                user_id=user_id, is_active=True).all()
-            chapter_ids = [sub.chapter_id for sub in subscriptions]
+        html_body = template['html_template'].format(
+            user_name=plan['name'],
+            quiz_list=quiz_list_html,
+            dashboard_url=dashboard_url
+        )
 
-            if not chapter_ids:
-                # No subscriptions, no reminders needed
-                return False
+        return self.build_message(plan['email'], subject, html_body)
 
-            # Get upcoming scheduled quizzes for tomorrow
-            upcoming_quizzes = Quiz.query.filter(
-                Quiz.chapter_id.in_(chapter_ids),
-                Quiz.is_scheduled == True,
-                Quiz.date_of_quiz >= datetime.now(),
-                Quiz.date_of_quiz <= tomorrow
-            ).all()
+    def send_daily_reminder_email(self, user_id: int):
+        self._ensure_initialized()
 
-            if not upcoming_quizzes:
-                # No upcoming quizzes, no reminder needed
+        try:
+            # No plan when the user does not exist or has nothing due tomorrow
+            plan = next(ReminderPlanner(user_ids=[user_id], role=None).iter_plans(), None)
+            if plan is None:
                 return False
 
-            # Prepare email content
-            template = EMAIL_TEMPLATES['daily_reminder']
-            subject = template['subject']
-
-            # Dashboard URL
-            dashboard_url = current_app.config.get(
-                'FRONTEND_DASHBOARD_URL', 'http://localhost:3000/dashboard')
-
-            # Generate quiz list HTML
-            quiz_list_html = ""
-            for quiz in upcoming_quizzes:
-                quiz_time = quiz.date_of_quiz.strftime(
-                    '%I:%M %p') if quiz.date_of_quiz else 'TBD'
-                quiz_list_html += f'''
-                <div class="quiz-item">
-                    <h4 style="margin: 0 0 10px 0; color: #4A90E2;">{quiz.title}</h4>
-                    <p style="margin: 5px 0;"><strong>Course:</strong> {quiz.chapter.course.name}</p>
-                    <p style="margin: 5px 0;"><strong>Chapter:</strong> {quiz.chapter.name}</p>
-                    <p style="margin: 5px 0;"><strong>Time:</strong> {quiz_time}</p>
-                    <p style="margin: 5px 0;"><strong>Duration:</strong> {quiz.time_duration or 'No limit'}</p>
-                </div>
-                '''
-
-            html_body = template['html_template'].format(
-                user_name=user.name,
-                quiz_list=quiz_list_html,
-                dashboard_url=dashboard_url
-            )
+            msg = self.build_daily_reminder_email(plan)
 
             # Send email
-            success = self.send_email(
-                recipient_email=user.email,
-                subject=subject,
-                html_body=html_body
-            )
+            success = self.send_message(msg)
 
             if success:
                 current_app.logger.info(
-                    f"Daily reminder email sent to {user.email} for {len(upcoming_quizzes)} upcoming quizzes")
+                    f"Daily reminder email sent to {plan['email']} for {len(plan['quizzes'])} upcoming quizzes")
 
             return success
 
@@ -432,77 +452,56 @@ class EmailService:
                 f"Failed to send daily reminder email to user {user_id}: {str(e)}")
             return False
 
+    def build_monthly_report_email(self, report: dict):
+        # report comes from MonthlyReportPlanner: the user's rollup row for
+        # the month plus their lifetime totals
+
+        # Prepare email content
+        template = EMAIL_TEMPLATES['monthly_report']
+        month_year = report['month'].strftime('%B %Y')
+        subject = template['subject'].format(month_year=month_year)
+
+        # Dashboard URL
+        dashboard_url = current_app.config.get(
+            'FRONTEND_DASHBOARD_URL', 'http://localhost:3000/dashboard')
+
+        html_body = template['html_template'].format(
+            user_name=report['name'],
+            month_year=month_year,
+            monthly_quizzes=report['attempts'],
+            monthly_questions=report['questions_answered'],
+            monthly_correct=report['correct_answers'],
+            monthly_accuracy=round(report['accuracy'], 1),
+            average_score=round(report['average_score'], 1),
+            best_quiz=format_best_quiz(report),
+            rank=format_rank(report),
+            total_quizzes=report['total_quizzes'],
+            total_questions=report['total_questions'],
+            overall_accuracy=round(report['overall_accuracy'], 1),
+            dashboard_url=dashboard_url
+        )
+
+        return self.build_message(report['email'], subject, html_body)
+
     def send_monthly_report_email(self, user_id: int):
         self._ensure_initialized()
 
         try:
-            user = User.query.get(user_id)
-            if not user:
-                current_app.logger.error(f"User {user_id} not found")
-                return False
-
-            # Calculate monthly stats (last 30 days)
-            last_month = datetime.now() - timedelta(days=30)
-
-            recent_submissions = Submission.query.filter(
-                Submission.user_id == user_id,
-                Submission.timestamp >= last_month
-            ).all()
-
-            if not recent_submissions:
-                # No activity in the last month, skip sending report
+            # No report when the user does not exist or had no activity
+            report = next(MonthlyReportPlanner(user_ids=[user_id], role=None).iter_reports(), None)
+            if report is None:
                 current_app.logger.info(
-                    f"No recent activity for user {user_id}, skipping monthly report")
+                    f"No activity for user {user_id} last month, skipping monthly report")
                 return False
 
-            # Calculate monthly statistics
-            quiz_ids = list(set([s.quiz_id for s in recent_submissions]))
-            monthly_stats = {
-                'quizzes_taken': len(quiz_ids),
-                'questions_answered': len(recent_submissions),
-                'correct_answers': len([s for s in recent_submissions if s.is_correct]),
-                'accuracy': 0
-            }
-
-            if monthly_stats['questions_answered'] > 0:
-                monthly_stats['accuracy'] = (
-                    monthly_stats['correct_answers'] / monthly_stats['questions_answered']) * 100
-
-            # Get overall statistics
-            overall_stats = get_user_quiz_stats(user_id)
-
-            # Prepare email content
-            template = EMAIL_TEMPLATES['monthly_report']
-            month_year = datetime.now().strftime('%B %Y')
-            subject = template['subject'].format(month_year=month_year)
-
-            # Dashboard URL
-            dashboard_url = current_app.config.get(
-                'FRONTEND_DASHBOARD_URL', 'http://localhost:3000/dashboard')
-
-            html_body = template['html_template'].format(
-                user_name=user.name,
-                month_year=month_year,
-                monthly_quizzes=monthly_stats['quizzes_taken'],
-                monthly_questions=monthly_stats['questions_answered'],
-                monthly_correct=monthly_stats['correct_answers'],
-                monthly_accuracy=round(monthly_stats['accuracy'], 1),
-                total_quizzes=overall_stats['total_quizzes'],
-                total_questions=overall_stats['total_questions'],
-                overall_accuracy=round(overall_stats['overall_accuracy'], 1),
-                dashboard_url=dashboard_url
-            )
+            msg = self.build_monthly_report_email(report)
 
             # Send email
-            success = self.send_email(
-                recipient_email=user.email,
-                subject=subject,
-                html_body=html_body
-            )
+            success = self.send_message(msg)
 
             if success:
                 current_app.logger.info(
-                    f"Monthly report email sent to {user.email} with {monthly_stats['quizzes_taken']} quizzes taken")
+                    f"Monthly report email sent to {report['email']} with {report['attempts']} quizzes taken")
 
             return success
 
@@ -511,51 +510,47 @@ class EmailService:
                 f"Failed to send monthly report email to user {user_id}: {str(e)}")
             return False
 
+    def _campaign_messages(self, recipients, build, key_prefix, stats):
+        # recipients yields (user_id, build argument) pairs. A user whose
+        # email cannot be built is counted as failed, not allowed to abort
+        # the rest of the campaign
+        for user_id, recipient in recipients:
+            try:
+                msg = build(recipient)
+            except Exception as e:
+                current_app.logger.error(
+                    f"Failed to build {key_prefix} email for user {user_id}: {e}")
+                stats['failed'] += 1
+                continue
+            if msg is not None:
+                yield f"{key_prefix}:{user_id}", msg
+
     def send_bulk_daily_reminders(self):
         self._ensure_initialized()
 
         try:
-            # Find users who have upcoming quizzes tomorrow
-            tomorrow = datetime.now() + timedelta(days=1)
-
-            upcoming_quizzes = Quiz.query.filter(
-                Quiz.is_scheduled == True,
-                Quiz.date_of_quiz >= datetime.now(),
-                Quiz.date_of_quiz <= tomorrow
-            ).all()
-
-            if not upcoming_quizzes:
+            # Recipients and their quizzes come from a fixed number of
+            # queries, streamed in chunks, whatever the number of users
+            planner = ReminderPlanner()
+            if not planner.quizzes_by_chapter():
                 current_app.logger.info(
                     "No upcoming quizzes for tomorrow, no reminders to send")
                 return {'sent': 0, 'failed': 0}
 
-            # Get all chapters with upcoming quizzes
-            chapter_ids = [q.chapter_id for q in upcoming_quizzes]
-
-            # Find users subscribed to these chapters
-            subscribed_users = User.query.join(Subscription).filter(
-                Subscription.chapter_id.in_(chapter_ids),
-                Subscription.is_active == True,
-                User.role == 'user'
-            ).distinct().all()
-
-            sent_count = 0
-            failed_count = 0
-
-            for user in subscribed_users:
-                try:
-                    success = self.send_daily_reminder_email(user.id)
-                    if success:
-                        sent_count += 1
-                    else:
-                        failed_count += 1
-                except Exception as e:
-                    current_app.logger.error(
-                        f"Failed to send reminder to user {user.id}: {e}")
-                    failed_count += 1
+            # One campaign per day, a retried task only mails who it missed
+            build_stats = {'failed': 0}
+            result = self.deliver_bulk(
+                f"daily_reminders_{planner.now.strftime('%Y-%m-%d')}",
+                self._campaign_messages(
+                    ((plan['user_id'], plan) for plan in planner.iter_plans()),
+                    self.build_daily_reminder_email, 'daily_reminder', build_stats))
+
+            sent_count = result['sent']
+            failed_count = result['failed'] + build_stats['failed']
 
             current_app.logger.info(
-                f"Daily reminders completed: {sent_count} sent, {failed_count} failed")
+                f"Daily reminders completed: {sent_count} sent, {failed_count} failed, "
+                f"{result['skipped']} already sent")
             return {'sent': sent_count, 'failed': failed_count}
 
         except Exception as e:
@@ -567,27 +562,23 @@ class EmailService:
         self._ensure_initialized()
 
         try:
-            # Get all users with role 'user'
-            users = User.query.filter_by(role='user').all()
-
-            sent_count = 0
-            failed_count = 0
-
-            for user in users:
-                try:
-                    success = self.send_monthly_report_email(user.id)
-                    if success:
-                        sent_count += 1
-                    else:
-                        # User might not have activity, that's okay
-                        pass
-                except Exception as e:
-                    current_app.logger.error(
-                        f"Failed to send monthly report to user {user.id}: {e}")
-                    failed_count += 1
+            # One rollup row per active user, read in a single streamed query
+            planner = MonthlyReportPlanner()
+
+            # One campaign per report month
+            build_stats = {'failed': 0}
+            result = self.deliver_bulk(
+                f"monthly_reports_{planner.month.strftime('%Y-%m')}",
+                self._campaign_messages(
+                    ((report['user_id'], report) for report in planner.iter_reports()),
+                    self.build_monthly_report_email, 'monthly_report', build_stats))
+
+            sent_count = result['sent']
+            failed_count = result['failed'] + build_stats['failed']
 
             current_app.logger.info(
-                f"Monthly reports completed: {sent_count} sent, {failed_count} failed")
+                f"Monthly reports completed: {sent_count} sent, {failed_count} failed, "
+                f"{result['skipped']} already sent")
             return {'sent': sent_count, 'failed': failed_count}
 
         except Exception as e:
@@ -0,0 +1,316 @@
+import os
+import json
+import time
+import random
+import asyncio
+import smtplib
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import parseaddr
+from flask import current_app
+
+try:
+    import aiosmtplib
+except ImportError:  # bulk sends fall back to the blocking pool in threads
+    aiosmtplib = None
+
+# Refused outright, retrying cannot help
+PERMANENT_ERRORS = (smtplib.SMTPNotSupportedError,) + (
+    (aiosmtplib.SMTPNotSupported,) if aiosmtplib else ())
+
+
+def reply_code(exc):
+    # SMTP reply code behind a send error, None for connection-level failures
+    code = getattr(exc, 'smtp_code', None) or getattr(exc, 'code', None)
+    if code is None:
+        recipients = getattr(exc, 'recipients', None)
+        if isinstance(recipients, dict):  # smtplib: {address: (code, message)}
+            code = min((reply[0] for reply in recipients.values()), default=None)
+        elif recipients:  # aiosmtplib: [SMTPRecipientRefused, ...]
+            code = min(getattr(refused, 'code', 500) for refused in recipients)
+    return code if isinstance(code, int) else None
+
+
+def is_transient(exc):
+    # 4xx replies, dropped connections and timeouts are worth another attempt
+    code = reply_code(exc)
+    if code is not None:
+        return 400 <= code < 500
+    return isinstance(exc, (OSError, asyncio.TimeoutError)) and not isinstance(exc, PERMANENT_ERRORS)
+
+
+class DeliveryLedger:
+    # Append-only JSON lines, one per delivery attempt. Rerunning a campaign
+    # skips every message the ledger records as sent or permanently rejected
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def settled_keys(self):
+        keys = set()
+        try:
+            with open(self.path, encoding='utf-8') as ledger:
+                for line in ledger:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of a run that crashed
+                    if entry.get('status') in ('sent', 'rejected'):
+                        keys.add(entry['key'])
+        except FileNotFoundError:
+            pass
+        return keys
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        torn = False
+        try:
+            with open(self.path, 'rb') as ledger:
+                if ledger.seek(0, os.SEEK_END):
+                    ledger.seek(-1, os.SEEK_END)
+                    torn = ledger.read(1) != b'\n'
+        except FileNotFoundError:
+            pass
+        self._file = open(self.path, 'a', encoding='utf-8')
+        # Never append onto a torn line
+        if torn:
+            self._file.write('\n')
+
+    def record(self, key, recipient, status, attempt, error=None):
+        if self._file is None:
+            self._open()
+        entry = {
+            'key': key,
+            'recipient': recipient,
+            'status': status,
+            'attempt': attempt,
+            'at': datetime.now(timezone.utc).isoformat()
+        }
+        if error is not None:
+            entry['error'] = f"{type(error).__name__}: {error}"
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class AioSMTPTransport:
+    # One aiosmtplib connection per engine worker, kept open across messages
+
+    def __init__(self, host, port, username=None, password=None, use_tls=False,
+                 use_ssl=False, max_messages=100, keepalive_interval=30, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username or None
+        self.password = password or None
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.max_messages = max_messages
+        self.keepalive_interval = keepalive_interval
+        self.timeout = timeout
+        self.smtp = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    async def _connect(self):
+        self.smtp = aiosmtplib.SMTP(
+            hostname=self.host, port=self.port, username=self.username,
+            password=self.password, use_tls=self.use_ssl, start_tls=self.use_tls,
+            timeout=self.timeout)
+        await self.smtp.connect()
+        self.sent = 0
+
+    async def _usable(self):
+        if self.smtp is None or self.sent >= self.max_messages:
+            return False
+        if time.monotonic() - self.last_used <= self.keepalive_interval:
+            return True
+        try:
+            await self.smtp.noop()
+            return True
+        except Exception:
+            return False
+
+    async def send(self, msg):
+        if not await self._usable():
+            await self.close()
+            await self._connect()
+        try:
+            await self.smtp.send_message(msg)
+        finally:
+            self.last_used = time.monotonic()
+        self.sent += 1
+
+    async def reset(self):
+        # The connection is in an unknown state, drop it without QUIT
+        if self.smtp is not None:
+            self.smtp.close()
+            self.smtp = None
+
+    async def close(self):
+        if self.smtp is not None:
+            try:
+                await self.smtp.quit()
+            except Exception:
+                self.smtp.close()
+            self.smtp = None
+
+
+class PoolTransport:
+    # Blocking SMTPConnectionPool driven from worker threads, used when
+    # aiosmtplib is not installed
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def send(self, msg):
+        await asyncio.to_thread(self.pool.send_message, msg)
+
+    async def reset(self):
+        pass  # the pool replaces broken connections itself
+
+    async def close(self):
+        pass
+
+
+class DeliveryEngine:
+    # Sends a stream of (key, message) pairs over a fixed number of concurrent
+    # SMTP connections. At most per_domain messages to one recipient domain
+    # are in flight at a time, transient failures are retried with jittered
+    # exponential backoff and every attempt is written to the ledger
+
+    def __init__(self, transport_factory, connections=10, per_domain=4,
+                 max_attempts=4, backoff=2.0, max_backoff=60.0, ledger=None,
+                 progress_every=50):
+        self.transport_factory = transport_factory
+        self.connections = max(1, connections)
+        self.per_domain = max(1, per_domain)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.ledger = ledger
+        self.progress_every = progress_every
+
+    def deliver(self, messages, on_progress=None):
+        # messages is consumed lazily, a campaign is never held in memory
+        return asyncio.run(self._run(messages, on_progress))
+
+    async def _run(self, messages, on_progress):
+        stats = {'sent': 0, 'failed': 0, 'retried': 0, 'skipped': 0}
+        settled = self.ledger.settled_keys() if self.ledger else set()
+        queue = asyncio.Queue(maxsize=self.connections * 2)
+        domains = defaultdict(lambda: asyncio.Semaphore(self.per_domain))
+        workers = [asyncio.create_task(self._worker(queue, domains, stats))
+                   for _ in range(self.connections)]
+        try:
+            for queued, (key, msg) in enumerate(messages, 1):
+                if key in settled:
+                    stats['skipped'] += 1
+                    continue
+                await queue.put((key, msg))
+                if on_progress and queued % self.progress_every == 0:
+                    on_progress(stats)
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            if self.ledger:
+                self.ledger.close()
+
+        if on_progress:
+            on_progress(stats)
+        return stats
+
+    async def _worker(self, queue, domains, stats):
+        transport = self.transport_factory()
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                await self._deliver_one(transport, domains, stats, *item)
+        finally:
+            await transport.close()
+
+    def _retry_delay(self, attempt):
+        # Full jitter keeps workers that failed together from retrying together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def _record(self, key, recipient, status, attempt, error=None):
+        if self.ledger:
+            self.ledger.record(key, recipient, status, attempt, error)
+
+    async def _deliver_one(self, transport, domains, stats, key, msg):
+        recipient = msg['To']
+        domain = parseaddr(recipient)[1].rpartition('@')[2].lower()
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                async with domains[domain]:
+                    await transport.send(msg)
+            except Exception as e:
+                if reply_code(e) is None:
+                    await transport.reset()
+                transient = is_transient(e)
+                if attempt == self.max_attempts or not transient:
+                    # Exhausted retries are tried again by the next run of
+                    # the campaign, rejections are not
+                    stats['failed'] += 1
+                    self._record(key, recipient, 'failed' if transient else 'rejected', attempt, e)
+                    current_app.logger.error(
+                        f"Failed to deliver {key} to {recipient} after {attempt} attempt(s): {str(e)}")
+                    return
+                stats['retried'] += 1
+                self._record(key, recipient, 'retry', attempt, e)
+                await asyncio.sleep(self._retry_delay(attempt))
+            else:
+                stats['sent'] += 1
+                self._record(key, recipient, 'sent', attempt)
+                return
+
+
+def check_delivery_transport(app):
+    # Logged once at startup, the fallback otherwise only shows as slow campaigns
+    if aiosmtplib is None:
+        connections = min(app.config.get('MAIL_ASYNC_CONNECTIONS', 10),
+                          app.config.get('MAIL_POOL_SIZE', 4))
+        app.logger.warning(
+            f"aiosmtplib is not installed, bulk email falls back to the blocking SMTP "
+            f"pool with {connections} concurrent sends instead of "
+            f"MAIL_ASYNC_CONNECTIONS={app.config.get('MAIL_ASYNC_CONNECTIONS', 10)}. "
+            f"Install aiosmtplib for async delivery")
+
+
+def get_delivery_engine(pool, campaign):
+    # Connection settings come from the service's SMTP pool; without
+    # aiosmtplib the pool itself does the sending, so it caps concurrency
+    config = current_app.config
+    if aiosmtplib is not None:
+        def transport_factory():
+            return AioSMTPTransport(
+                pool.host, pool.port, username=pool.username, password=pool.password,
+                use_tls=pool.use_tls, use_ssl=pool.use_ssl,
+                max_messages=pool.max_messages,
+                keepalive_interval=pool.keepalive_interval, timeout=pool.timeout)
+        connections = config.get('MAIL_ASYNC_CONNECTIONS', 10)
+    else:
+        def transport_factory():
+            return PoolTransport(pool)
+        connections = min(config.get('MAIL_ASYNC_CONNECTIONS', 10), pool.size)
+
+    ledger_dir = config.get('MAIL_LEDGER_DIR', '/tmp/mail_ledger')
+    return DeliveryEngine(
+        transport_factory,
+        connections=connections,
+        per_domain=config.get('MAIL_DOMAIN_CONCURRENCY', 4),
+        max_attempts=config.get('MAIL_MAX_ATTEMPTS', 4),
+        backoff=config.get('MAIL_RETRY_BACKOFF', 2.0),
+        ledger=DeliveryLedger(os.path.join(ledger_dir, f"{campaign}.jsonl"))
+    )
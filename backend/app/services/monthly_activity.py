@@ -0,0 +1,316 @@
+from datetime import date, datetime, time
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import func, select
+from app.models import MonthlyActivity, Quiz, QuizAttempt, User, db
+
+ROLLUP_FIELDS = ('attempts', 'questions_answered', 'correct_answers', 'obtained_marks',
+                 'total_marks', 'average_score', 'best_quiz_id', 'best_score')
+
+_ATTEMPT_COLUMNS = (QuizAttempt.user_id, QuizAttempt.quiz_id, QuizAttempt.obtained_marks,
+                    QuizAttempt.total_marks, QuizAttempt.correct_count, QuizAttempt.question_count)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def previous_month(month):
+    return date(month.year - (month.month == 1), (month.month - 2) % 12 + 1, 1)
+
+
+def report_month(now=None):
+    # Monthly reports go out at the start of a month and cover the one before
+    return previous_month(month_start(now or datetime.now()))
+
+
+def _month_bounds(month):
+    return datetime.combine(month, time.min), datetime.combine(next_month(month), time.min)
+
+
+def _summarize(attempts):
+    summary = {
+        'attempts': 0,
+        'questions_answered': 0,
+        'correct_answers': 0,
+        'obtained_marks': 0.0,
+        'total_marks': 0.0,
+        'average_score': 0.0,
+        'best_quiz_id': None,
+        'best_score': None
+    }
+    score_sum = 0.0
+
+    for attempt in attempts:
+        score = (attempt.obtained_marks / attempt.total_marks * 100) if attempt.total_marks > 0 else 0
+        summary['attempts'] += 1
+        summary['questions_answered'] += attempt.question_count
+        summary['correct_answers'] += attempt.correct_count
+        summary['obtained_marks'] += attempt.obtained_marks
+        summary['total_marks'] += attempt.total_marks
+        score_sum += score
+        if summary['best_score'] is None or score > summary['best_score']:
+            summary['best_quiz_id'] = attempt.quiz_id
+            summary['best_score'] = score
+
+    if summary['attempts']:
+        summary['average_score'] = score_sum / summary['attempts']
+    return summary
+
+
+def _upsert_rollups(rows, with_rank=False, chunk_size=500):
+    # INSERT ... ON CONFLICT (user_id, month) DO UPDATE, same as the
+    # submission upsert; a submit's refresh keeps the last nightly rank
+    fields = ROLLUP_FIELDS + ('updated_at',) + (('rank',) if with_rank else ())
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+
+        if insert is None:
+            for row in chunk:
+                rollup = MonthlyActivity.query.filter_by(
+                    user_id=row['user_id'], month=row['month']).first()
+                if not rollup:
+                    rollup = MonthlyActivity(user_id=row['user_id'], month=row['month'])
+                    db.session.add(rollup)
+                for field in fields:
+                    setattr(rollup, field, row[field])
+            db.session.flush()
+            continue
+
+        stmt = insert(MonthlyActivity)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'month'],
+            set_={field: stmt.excluded[field] for field in fields}
+        )
+        db.session.execute(stmt, chunk)
+
+
+def refresh_monthly_activity(user_id, *timestamps):
+    # Recompute one user's rollup for the months of the given timestamps
+    # inside the caller's transaction; the caller is responsible for committing
+    refresh_users_activity((user_id, value) for value in timestamps)
+
+
+def refresh_users_activity(user_timestamps, chunk_size=500):
+    # Batched refresh for (user_id, timestamp) pairs, one query per month and
+    # chunk of users; no commit
+    users_by_month = {}
+    for user_id, value in user_timestamps:
+        if value is not None:
+            users_by_month.setdefault(month_start(value), set()).add(user_id)
+
+    for month, user_ids in users_by_month.items():
+        start, end = _month_bounds(month)
+        user_ids = sorted(user_ids)
+
+        for offset in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[offset:offset + chunk_size]
+            attempts = db.session.query(*_ATTEMPT_COLUMNS).filter(
+                QuizAttempt.user_id.in_(chunk),
+                QuizAttempt.completed_at >= start,
+                QuizAttempt.completed_at < end
+            ).order_by(QuizAttempt.user_id).all()
+
+            rows = [dict(_summarize(user_attempts), user_id=user_id, month=month,
+                         updated_at=datetime.now())
+                    for user_id, user_attempts in groupby(attempts, key=lambda row: row.user_id)]
+            _upsert_rollups(rows)
+
+            # Users without attempts left in the month
+            inactive = set(chunk) - {row['user_id'] for row in rows}
+            if inactive:
+                MonthlyActivity.query.filter(
+                    MonthlyActivity.month == month,
+                    MonthlyActivity.user_id.in_(inactive)
+                ).delete(synchronize_session=False)
+
+
+def remove_quiz_activity(quiz_ids):
+    # Call before deleting quizzes: drops their attempts and refreshes the
+    # rollups those attempts counted towards, so no rollup keeps their
+    # marks or points at them as a best quiz; no commit
+    quiz_ids = list(quiz_ids)
+    if not quiz_ids:
+        return 0
+
+    affected = db.session.query(QuizAttempt.user_id, QuizAttempt.completed_at).filter(
+        QuizAttempt.quiz_id.in_(quiz_ids)).all()
+    QuizAttempt.query.filter(
+        QuizAttempt.quiz_id.in_(quiz_ids)).delete(synchronize_session=False)
+    refresh_users_activity(affected)
+
+    # A rollup left pointing at one of them without a matching attempt
+    MonthlyActivity.query.filter(
+        MonthlyActivity.best_quiz_id.in_(quiz_ids)
+    ).update({'best_quiz_id': None, 'best_score': None}, synchronize_session=False)
+    return len({user_id for user_id, _ in affected})
+
+
+def rebuild_monthly_activity(month, chunk_size=None):
+    # Rebuild every user's rollup for a month from one pass over its attempts
+    # and rank users by average score; no commit
+    chunk_size = chunk_size or current_app.config.get('MONTHLY_ROLLUP_CHUNK_SIZE', 1000)
+    started = datetime.now()
+    start, end = _month_bounds(month)
+
+    result = db.session.execute(
+        select(*_ATTEMPT_COLUMNS).where(
+            QuizAttempt.completed_at >= start,
+            QuizAttempt.completed_at < end
+        ).order_by(QuizAttempt.user_id),
+        execution_options={'yield_per': chunk_size}
+    )
+    rows = [dict(_summarize(attempts), user_id=user_id, month=month, updated_at=started)
+            for user_id, attempts in groupby(result, key=lambda row: row.user_id)]
+
+    # Ties share a rank, the next score down skips past them
+    rows.sort(key=lambda row: row['average_score'], reverse=True)
+    previous_score = None
+    for position, row in enumerate(rows, 1):
+        if row['average_score'] != previous_score:
+            rank, previous_score = position, row['average_score']
+        row['rank'] = rank
+
+    _upsert_rollups(rows, with_rank=True, chunk_size=chunk_size)
+
+    # Users without attempts left in the month; rows refreshed by a submit
+    # since the rebuild started are newer and stay
+    MonthlyActivity.query.filter(
+        MonthlyActivity.month == month,
+        MonthlyActivity.updated_at < started
+    ).delete(synchronize_session=False)
+
+    return len(rows)
+
+
+def rollup_monthly_activity(now=None):
+    # Nightly: the current month picks up ranks, the previous one its last
+    # day of attempts and any regrades, before monthly reports read it
+    current = month_start(now or datetime.now())
+    result = {}
+    for month in (previous_month(current), current):
+        result[month.isoformat()] = rebuild_monthly_activity(month)
+        db.session.commit()
+    return result
+
+
+def backfill_monthly_activity():
+    # Databases that predate the rollup table get the months reports read
+    if MonthlyActivity.query.first() is not None or QuizAttempt.query.first() is None:
+        return None
+    return rollup_monthly_activity()
+
+
+def format_best_quiz(report):
+    if report['best_quiz_title'] is None:
+        return '-'
+    return f"{report['best_quiz_title']} ({round(report['best_score'], 1)}%)"
+
+
+def format_rank(report):
+    # Ranks are assigned by the nightly rollup
+    if report['rank'] is None:
+        return 'Not ranked yet'
+    return f"#{report['rank']} of {report['participants']}"
+
+
+class MonthlyReportPlanner:
+    # Reads everything a monthly report needs in one streamed query: each
+    # user's rollup row for the month, their best quiz's title and their
+    # lifetime totals from QuizAttempt. Users without a rollup row had no
+    # activity that month and get no report
+
+    def __init__(self, month=None, user_ids=None, role='user', chunk_size=None):
+        self.month = month or report_month()
+        self.user_ids = user_ids
+        self.role = role
+        self.chunk_size = chunk_size or current_app.config.get(
+            'MONTHLY_ROLLUP_CHUNK_SIZE', 1000)
+
+    def _filter(self, query, user_column):
+        if self.role is not None:
+            query = query.where(User.role == self.role)
+        if self.user_ids is not None:
+            query = query.where(user_column.in_(self.user_ids))
+        return query
+
+    def participants(self):
+        # Everyone ranked that month, whatever the role filter
+        return db.session.execute(
+            select(func.count(MonthlyActivity.id)).where(
+                MonthlyActivity.month == self.month)
+        ).scalar()
+
+    def count(self):
+        return db.session.execute(self._filter(
+            select(func.count(MonthlyActivity.id)).join(
+                User, MonthlyActivity.user_id == User.id
+            ).where(MonthlyActivity.month == self.month),
+            MonthlyActivity.user_id
+        )).scalar()
+
+    def iter_reports(self):
+        participants = self.participants()
+
+        totals = select(
+            QuizAttempt.user_id,
+            func.count(QuizAttempt.id).label('total_quizzes'),
+            func.sum(QuizAttempt.question_count).label('total_questions'),
+            func.sum(QuizAttempt.correct_count).label('total_correct')
+        ).group_by(QuizAttempt.user_id)
+        if self.user_ids is not None:
+            totals = totals.where(QuizAttempt.user_id.in_(self.user_ids))
+        totals = totals.subquery()
+
+        query = self._filter(
+            select(
+                User.id, User.name, User.email, MonthlyActivity,
+                Quiz.title.label('best_quiz_title'),
+                totals.c.total_quizzes, totals.c.total_questions, totals.c.total_correct
+            ).join(
+                MonthlyActivity, db.and_(MonthlyActivity.user_id == User.id,
+                                         MonthlyActivity.month == self.month)
+            ).outerjoin(
+                Quiz, Quiz.id == MonthlyActivity.best_quiz_id
+            ).outerjoin(
+                totals, totals.c.user_id == User.id
+            ).order_by(User.id),
+            User.id
+        )
+
+        result = db.session.execute(query, execution_options={'yield_per': self.chunk_size})
+        for row in result:
+            rollup = row.MonthlyActivity
+            total_questions = int(row.total_questions or 0)
+            yield {
+                'user_id': row.id,
+                'name': row.name,
+                'email': row.email,
+                'month': self.month,
+                'attempts': rollup.attempts,
+                'questions_answered': rollup.questions_answered,
+                'correct_answers': rollup.correct_answers,
+                'accuracy': rollup.accuracy,
+                'average_score': rollup.average_score,
+                'best_quiz_title': row.best_quiz_title,
+                'best_score': rollup.best_score,
+                'rank': rollup.rank,
+                'participants': participants,
+                'total_quizzes': int(row.total_quizzes or 0),
+                'total_questions': total_questions,
+                'overall_accuracy': (int(row.total_correct or 0) / total_questions * 100)
+                if total_questions > 0 else 0
+            }
@@ -0,0 +1,185 @@
+import json
+import time
+from datetime import datetime
+from flask import current_app
+from redis.exceptions import WatchError
+from app.cache import invalidate_users_cache
+from app.grading import get_answer_key
+from app.models import Quiz, db
+from app.utils import get_quiz_status, upsert_submissions, update_quiz_attempt
+
+
+class QuizSessionBuffer:
+    # Per-question autosaves go to a Redis hash per (user, quiz) instead of
+    # the database; the hash is flushed in one upsert on final submit or by
+    # the periodic flusher, and survives web worker crashes meanwhile. The
+    # hashes live in the non-evicting state store, never in the cache
+
+    def __init__(self, redis_client, key_prefix='quizzo:'):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self.ttl = current_app.config.get('QUIZ_SESSION_TTL', 6 * 3600)
+        self.dirty_key = f"{key_prefix}quiz_sessions:dirty"
+
+    def _key(self, user_id, quiz_id):
+        return f"{self.key_prefix}quiz_session:{quiz_id}:{user_id}"
+
+    def record(self, user_id, quiz_id, question_id, answer):
+        key = self._key(user_id, quiz_id)
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(key, str(question_id), json.dumps({'a': answer, 't': time.time()}))
+        pipe.expire(key, self.ttl)
+        pipe.sadd(self.dirty_key, f"{quiz_id}:{user_id}")
+        pipe.execute()
+
+    def _parse(self, raw):
+        answers = {}
+        for question_id, value in raw.items():
+            try:
+                entry = json.loads(value)
+                answers[int(question_id)] = (entry['a'], datetime.fromtimestamp(entry['t']))
+            except (ValueError, KeyError, TypeError):
+                continue
+        return answers
+
+    def answers(self, user_id, quiz_id):
+        return self._parse(self.redis.hgetall(self._key(user_id, quiz_id)))
+
+    def discard(self, user_id, quiz_id):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self._key(user_id, quiz_id))
+        pipe.srem(self.dirty_key, f"{quiz_id}:{user_id}")
+        pipe.execute()
+
+    def merge(self, user_id, quiz_id, submitted):
+        # Buffered answers fill in questions the final payload leaves out
+        submitted_ids = {answer.get('question_id') for answer in submitted}
+        return list(submitted) + [
+            {'question_id': question_id, 'answer': answer}
+            for question_id, (answer, _) in sorted(self.answers(user_id, quiz_id).items())
+            if question_id not in submitted_ids
+        ]
+
+    def flush(self, user_id, quiz_id, answers=None):
+        # Writes but does not commit, so callers can batch sessions
+        if answers is None:
+            answers = self.answers(user_id, quiz_id)
+        if not answers:
+            return 0
+
+        answer_key = get_answer_key(quiz_id)
+        rows = [
+            {
+                'user_id': user_id,
+                'quiz_id': quiz_id,
+                'question_id': question_id,
+                'answer': answer,
+                'is_correct': answer_key.grade(question_id, answer),
+                'timestamp': answered_at
+            }
+            for question_id, (answer, answered_at) in answers.items()
+            if question_id in answer_key
+        ]
+
+        # Never overwrite a newer answer, e.g. from a final submit racing this flush
+        upsert_submissions(rows, newer_only=True)
+        update_quiz_attempt(user_id, quiz_id)
+        return len(rows)
+
+    def _discard_flushed(self, user_id, quiz_id, snapshot):
+        # Drop a flushed hash unless an autosave landed since it was read;
+        # that autosave marked the session dirty again for the next run
+        key = self._key(user_id, quiz_id)
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.hgetall(key) != snapshot:
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def _open_quiz_ids(self, quiz_ids):
+        # Scheduled quizzes take one attempt, so a session persisted before
+        # the window closes would lock the user out of the final submit
+        quizzes = Quiz.query.filter(Quiz.id.in_(quiz_ids)).all()
+        return {quiz.id for quiz in quizzes if get_quiz_status(quiz) in ('upcoming', 'live')}
+
+    def flush_idle(self, idle_seconds=None, batch_size=None):
+        # Sessions still being answered stay in Redis until the final submit;
+        # abandoned ones are persisted once idle, and for scheduled quizzes
+        # only after the quiz window has closed
+        idle_seconds = idle_seconds if idle_seconds is not None else \
+            current_app.config.get('QUIZ_SESSION_IDLE_FLUSH', 600)
+        batch_size = batch_size or current_app.config.get('QUIZ_SESSION_FLUSH_BATCH', 500)
+        cutoff = datetime.fromtimestamp(time.time() - idle_seconds)
+
+        flushed = 0
+        user_ids = set()
+        active = []
+        remaining = self.redis.scard(self.dirty_key)
+
+        while remaining > 0:
+            members = self.redis.spop(self.dirty_key, min(batch_size, remaining))
+            if not members:
+                break
+            remaining -= len(members)
+
+            flushed_sessions = []
+            try:
+                sessions = [
+                    (member, *(int(part) for part in member.decode('utf-8').split(':')))
+                    for member in members
+                ]
+                open_quiz_ids = self._open_quiz_ids({quiz_id for _, quiz_id, _ in sessions})
+
+                # One transaction per batch of sessions
+                for member, quiz_id, user_id in sessions:
+                    if quiz_id in open_quiz_ids:
+                        active.append(member)
+                        continue
+                    raw = self.redis.hgetall(self._key(user_id, quiz_id))
+                    answers = self._parse(raw)
+                    if answers and max(answered_at for _, answered_at in answers.values()) > cutoff:
+                        active.append(member)
+                        continue
+                    flushed += self.flush(user_id, quiz_id, answers)
+                    flushed_sessions.append((user_id, quiz_id, raw))
+                    user_ids.add(user_id)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Put the batch back, the answers are still in Redis
+                self.redis.sadd(self.dirty_key, *members)
+                raise
+
+            # Persisted, the buffered copies are no longer needed
+            for user_id, quiz_id, raw in flushed_sessions:
+                if raw:
+                    self._discard_flushed(user_id, quiz_id, raw)
+
+        if active:
+            self.redis.sadd(self.dirty_key, *active)
+        if user_ids:
+            invalidate_users_cache(user_ids)
+        return {'answers': flushed, 'users': len(user_ids), 'active_sessions': len(active)}
+
+
+def get_quiz_session_buffer():
+    if not current_app.config.get('QUIZ_SESSION_BUFFER', True):
+        return None
+    state_store = getattr(current_app, 'state_store', None)
+    if state_store is None:
+        return None
+    return QuizSessionBuffer(
+        state_store, current_app.config.get('CACHE_KEY_PREFIX', 'quizzo:'))
+
+
+def flush_quiz_sessions():
+    buffer = get_quiz_session_buffer()
+    if buffer is None:
+        return {'answers': 0, 'users': 0, 'active_sessions': 0}
+    return buffer.flush_idle()
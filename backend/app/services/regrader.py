@@ -0,0 +1,110 @@
+from flask import current_app
+from sqlalchemy import update
+from app.cache import invalidate_quiz_cache, invalidate_users_cache
+from app.grading import get_answer_key
+from app.models import Submission, db
+from app.utils import rebuild_quiz_attempts, update_job_status
+
+
+class QuizRegrader:
+
+    def __init__(self, quiz_id, chunk_size=None, job_id=None):
+        self.quiz_id = quiz_id
+        self.chunk_size = chunk_size or current_app.config.get(
+            'REGRADE_CHUNK_SIZE', 1000)
+        self.job_id = job_id
+
+    def _report(self, status, progress, message):
+        if self.job_id:
+            update_job_status(self.job_id, status, progress, message)
+
+    def _iter_chunks(self):
+        # Keyset pagination over the (quiz_id, ...) index keeps memory flat
+        last_id = 0
+        while True:
+            rows = db.session.query(
+                Submission.id, Submission.user_id, Submission.question_id,
+                Submission.answer, Submission.is_correct
+            ).filter(
+                Submission.quiz_id == self.quiz_id,
+                Submission.id > last_id
+            ).order_by(Submission.id).limit(self.chunk_size).all()
+
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def _apply(self, ids, is_correct):
+        if not ids:
+            return
+        db.session.execute(
+            update(Submission)
+            .where(Submission.id.in_(ids))
+            .values(is_correct=is_correct)
+            .execution_options(synchronize_session=False)
+        )
+
+    def run(self):
+        answer_key = get_answer_key(self.quiz_id)
+        total = db.session.query(Submission.id).filter(
+            Submission.quiz_id == self.quiz_id).count()
+
+        self._report('running', 5, f'Regrading {total} submissions...')
+
+        processed = 0
+        changed = 0
+        user_ids = set()
+
+        try:
+            for rows in self._iter_chunks():
+                now_correct, now_wrong = [], []
+
+                for sub_id, user_id, question_id, answer, was_correct in rows:
+                    user_ids.add(user_id)
+                    if question_id not in answer_key:
+                        continue
+
+                    is_correct = answer_key.grade(question_id, answer)
+                    # Rows never graded (NULL) are written either way
+                    if was_correct is None or is_correct != bool(was_correct):
+                        (now_correct if is_correct else now_wrong).append(sub_id)
+
+                # Two set-based UPDATEs per chunk instead of one per row
+                self._apply(now_correct, True)
+                self._apply(now_wrong, False)
+
+                processed += len(rows)
+                changed += len(now_correct) + len(now_wrong)
+                if total:
+                    self._report('running', 5 + int(85 * processed / total),
+                                 f'Regraded {processed}/{total} submissions')
+
+            # Rebuild the materialized per-attempt scores in the same transaction
+            rebuild_quiz_attempts(self.quiz_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self._invalidate_caches(user_ids)
+
+        result = {
+            'quiz_id': self.quiz_id,
+            'submissions': processed,
+            'changed': changed,
+            'users': len(user_ids)
+        }
+        self._report('completed', 100,
+                     f'Regraded {processed} submissions, {changed} changed')
+        return result
+
+    def _invalidate_caches(self, user_ids):
+        # Quiz results, plus every cached view of the affected users, in
+        # pipelined chunks rather than one round trip per key
+        invalidate_quiz_cache(self.quiz_id)
+        invalidate_users_cache(user_ids)
+
+
+def regrade_quiz(quiz_id, job_id=None):
+    return QuizRegrader(quiz_id, job_id=job_id).run()
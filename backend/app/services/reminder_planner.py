@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import func, select
+from app.models import Chapter, Course, Quiz, Subscription, User, db
+
+
+class ReminderPlanner:
+    # Works out who gets a daily reminder and for which quizzes in a fixed
+    # number of queries: one for tomorrow's quizzes with their chapter and
+    # course names, one streamed over the subscribers of those chapters.
+    # Plans come out in chunks of users, ready to render without touching
+    # the database again
+
+    def __init__(self, user_ids=None, role='user', chunk_size=None, now=None):
+        self.user_ids = user_ids
+        self.role = role
+        self.chunk_size = chunk_size or current_app.config.get(
+            'REMINDER_CHUNK_SIZE', 500)
+        self.now = now or datetime.now()
+        self._quizzes_by_chapter = None
+
+    def quizzes_by_chapter(self):
+        if self._quizzes_by_chapter is None:
+            rows = db.session.query(
+                Quiz.id, Quiz.chapter_id, Quiz.title, Quiz.date_of_quiz,
+                Quiz.time_duration, Chapter.name, Course.name
+            ).join(
+                Chapter, Quiz.chapter_id == Chapter.id
+            ).join(
+                Course, Chapter.course_id == Course.id
+            ).filter(
+                Quiz.is_scheduled == True,
+                Quiz.date_of_quiz >= self.now,
+                Quiz.date_of_quiz <= self.now + timedelta(days=1)
+            ).order_by(Quiz.date_of_quiz, Quiz.id).all()
+
+            self._quizzes_by_chapter = {}
+            for quiz_id, chapter_id, title, date_of_quiz, time_duration, chapter_name, course_name in rows:
+                self._quizzes_by_chapter.setdefault(chapter_id, []).append({
+                    'id': quiz_id,
+                    'title': title,
+                    'date_of_quiz': date_of_quiz,
+                    'time_duration': time_duration,
+                    'chapter_name': chapter_name,
+                    'course_name': course_name
+                })
+        return self._quizzes_by_chapter
+
+    def _subscribers(self, *columns):
+        query = select(*columns).join(
+            User, Subscription.user_id == User.id
+        ).where(
+            Subscription.chapter_id.in_(list(self.quizzes_by_chapter())),
+            Subscription.is_active == True
+        )
+        if self.role is not None:
+            query = query.where(User.role == self.role)
+        if self.user_ids is not None:
+            query = query.where(Subscription.user_id.in_(self.user_ids))
+        return query
+
+    def count(self):
+        if not self.quizzes_by_chapter():
+            return 0
+        return db.session.execute(
+            self._subscribers(func.count(func.distinct(Subscription.user_id)))
+        ).scalar()
+
+    def _plan(self, rows):
+        quizzes_by_chapter = self.quizzes_by_chapter()
+        # A user subscribed to several chapters gets one list of their quizzes
+        quizzes = sorted(
+            (quiz for chapter_id in dict.fromkeys(row.chapter_id for row in rows)
+             for quiz in quizzes_by_chapter[chapter_id]),
+            key=lambda quiz: (quiz['date_of_quiz'], quiz['id']))
+        return {
+            'user_id': rows[0].user_id,
+            'name': rows[0].name,
+            'email': rows[0].email,
+            'quizzes': quizzes
+        }
+
+    def iter_chunks(self):
+        if not self.quizzes_by_chapter():
+            return
+
+        # One query for every recipient, fetched chunk_size rows at a time;
+        # ordering by user keeps each user's subscriptions together
+        result = db.session.execute(
+            self._subscribers(
+                Subscription.user_id, User.name, User.email, Subscription.chapter_id
+            ).order_by(Subscription.user_id),
+            execution_options={'yield_per': self.chunk_size}
+        )
+
+        chunk = []
+        for _, rows in groupby(result, key=lambda row: row.user_id):
+            chunk.append(self._plan(list(rows)))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def iter_plans(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
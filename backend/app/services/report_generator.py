@@ -4,8 +4,10 @@ import tempfile
 import threading
 from flask import current_app
 from datetime import datetime, timedelta
-from app.utils import get_user_quiz_stats, calculate_quiz_score
+from app.utils import get_user_quiz_stats, calculate_quiz_score, update_job_status
 from app.models import User, Quiz, Question, Submission, Course, Chapter, Subscription, db
+from app.services.reminder_planner import ReminderPlanner
+from app.services.monthly_activity import MonthlyReportPlanner, format_best_quiz, format_rank
 
 
 class ReportGenerator:
@@ -27,23 +29,7 @@ class ReportGenerator:
         return f"{report_type}_{timestamp}"
 
     def _update_job_status(self, job_id: str, status: str, progress: int = 0, message: str = "", download_url: str = ""):
-        job_status = {
-            'job_id': job_id,
-            'status': status,  # pending, running, completed, failed
-            'progress': progress,
-            'message': message,
-            'download_url': download_url,
-            'created_at': datetime.now().isoformat() + 'Z',
-            'updated_at': datetime.now().isoformat() + 'Z'
-        }
-
-        if status == 'completed':
-            job_status['completed_at'] = datetime.now().isoformat() + 'Z'
-
-        cache_key = f'job_status_{job_id}'
-        current_app.cache.set(cache_key, job_status,
-                              timeout=3600)  # Cache for 1 hour
-        return job_status
+        return update_job_status(job_id, status, progress, message, download_url)
 
     # USER EXPORT FUNCTIONALITY
     def export_user_data(self, user_id: int):
@@ -438,63 +424,49 @@ class ReportGenerator:
         self._update_job_status(job_id, 'running', 20,
                                 'Finding users for reminders...')
 
-        tomorrow = datetime.now() + timedelta(days=1)
-        upcoming_quizzes = Quiz.query.filter(
-            Quiz.is_scheduled == True,
-            Quiz.date_of_quiz >= datetime.now(),
-            Quiz.date_of_quiz <= tomorrow
-        ).all()
-
-        chapter_ids = [q.chapter_id for q in upcoming_quizzes]
-        subscribed_users = db.session.query(Subscription.user_id).filter(
-            Subscription.chapter_id.in_(chapter_ids),
-            Subscription.is_active == True
-        ).distinct().all()
-
-        user_ids = [u[0] for u in subscribed_users]
-        users = User.query.filter(User.id.in_(user_ids)).all()
+        # Subscribers of any role, as before, planned in a fixed number of queries
+        planner = ReminderPlanner(role=None)
+        total = planner.count()
 
         self._update_job_status(job_id, 'running', 40,
-                                f'Sending reminders to {len(users)} users...')
-
-        sent_count = 0
-        failed_count = 0
-
-        for i, user in enumerate(users):
-            try:
-                user_quizzes = []
-                for quiz in upcoming_quizzes:
-                    if any(s.chapter_id == quiz.chapter_id for s in user.subscriptions if s.is_active):
-                        user_quizzes.append(quiz)
-
-                if user_quizzes:
-                    self._send_reminder_email(
-                        email_service, user, user_quizzes)
-                    sent_count += 1
-
-                progress = 40 + int((i + 1) / len(users) * 50)
-                self._update_job_status(
-                    job_id, 'running', progress, f'Processed {i + 1}/{len(users)} users...')
-
-            except Exception as e:
-                current_app.logger.error(
-                    f"Failed to send reminder to user {user.id}: {e}")
-                failed_count += 1
-
-        return {'sent': sent_count, 'failed': failed_count}
-
-    def _send_reminder_email(self, email_service, user, quizzes):
+                                f'Sending reminders to {total} users...')
+
+        build_failed = 0
+
+        def messages():
+            nonlocal build_failed
+            for plan in planner.iter_plans():
+                try:
+                    msg = self._build_reminder_email(email_service, plan)
+                except Exception as e:
+                    current_app.logger.error(
+                        f"Failed to send reminder to user {plan['user_id']}: {e}")
+                    build_failed += 1
+                    continue
+                yield f"daily_reminder:{plan['user_id']}", msg
+
+        def on_progress(stats):
+            done = stats['sent'] + stats['failed'] + stats['skipped']
+            progress = 40 + int(done / max(total, 1) * 50)
+            self._update_job_status(
+                job_id, 'running', min(progress, 90), f'Delivered {done}/{total} reminders...')
+
+        # Each job keeps its own delivery ledger
+        result = email_service.deliver_bulk(job_id, messages(), on_progress=on_progress)
+        return {'sent': result['sent'], 'failed': result['failed'] + build_failed}
+
+    def _build_reminder_email(self, email_service, plan):
         subject = "Quiz Reminders - Upcoming Quizzes Tomorrow!"
 
         quiz_list = ""
-        for quiz in quizzes:
+        for quiz in plan['quizzes']:
             quiz_list += f"""
             <li style="margin: 10px 0;">
-                <strong>{quiz.title}</strong><br>
-                Course: {quiz.chapter.course.name}<br>
-                Chapter: {quiz.chapter.name}<br>
-                Time: {quiz.date_of_quiz.strftime('%I:%M %p') if quiz.date_of_quiz else 'TBD'}<br>
-                Duration: {quiz.time_duration or 'No limit'}
+                <strong>{quiz['title']}</strong><br>
+                Course: {quiz['course_name']}<br>
+                Chapter: {quiz['chapter_name']}<br>
+                Time: {quiz['date_of_quiz'].strftime('%I:%M %p') if quiz['date_of_quiz'] else 'TBD'}<br>
+                Duration: {quiz['time_duration'] or 'No limit'}
             </li>
             """
 
@@ -504,7 +476,7 @@ class ReportGenerator:
             <div style="max-width: 600px; margin: 0 auto; background: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
                 <h2 style="color: #4A90E2; text-align: center;">Quiz Reminders</h2>
                 
-                <p>Hello {user.name},</p>
+                <p>Hello {plan['name']},</p>
                 
                 <p>You have upcoming quizzes scheduled for tomorrow! Don't forget to take them:</p>
                 
@@ -528,7 +500,7 @@ class ReportGenerator:
         </html>
         """
 
-        return email_service.send_email(user.email, subject, html_body)
+        return email_service.build_message(plan['email'], subject, html_body)
 
     def send_monthly_reports_async(self):
         job_id = self._generate_job_id('monthly_report')
@@ -565,81 +537,66 @@ class ReportGenerator:
         self._update_job_status(job_id, 'running', 20,
                                 'Generating monthly reports...')
 
-        users = User.query.filter_by(role='user').all()
-
-        sent_count = 0
-        failed_count = 0
-
-        for i, user in enumerate(users):
-            try:
-                self._send_user_monthly_report(email_service, user)
-                sent_count += 1
-
-                progress = 20 + int((i + 1) / len(users) * 70)
-                self._update_job_status(
-                    job_id, 'running', progress, f'Processed {i + 1}/{len(users)} users...')
-
-            except Exception as e:
-                current_app.logger.error(
-                    f"Failed to send monthly report to user {user.id}: {e}")
-                failed_count += 1
-
-        return {'sent': sent_count, 'failed': failed_count}
-
-    def _send_user_monthly_report(self, email_service, user):
-        last_month = datetime.now() - timedelta(days=30)
-
-        recent_submissions = Submission.query.filter(
-            Submission.user_id == user.id,
-            Submission.timestamp >= last_month
-        ).all()
+        planner = MonthlyReportPlanner()
+        total = planner.count()
 
-        if not recent_submissions:
-            return
+        build_failed = 0
 
-        quiz_ids = list(set([s.quiz_id for s in recent_submissions]))
-        monthly_stats = {
-            'quizzes_taken': len(quiz_ids),
-            'questions_answered': len(recent_submissions),
-            'correct_answers': len([s for s in recent_submissions if s.is_correct]),
-            'accuracy': 0
-        }
+        def messages():
+            nonlocal build_failed
+            for report in planner.iter_reports():
+                try:
+                    msg = self._build_user_monthly_report(email_service, report)
+                except Exception as e:
+                    current_app.logger.error(
+                        f"Failed to send monthly report to user {report['user_id']}: {e}")
+                    build_failed += 1
+                    continue
+                yield f"monthly_report:{report['user_id']}", msg
 
-        if monthly_stats['questions_answered'] > 0:
-            monthly_stats['accuracy'] = (
-                monthly_stats['correct_answers'] / monthly_stats['questions_answered']) * 100
+        def on_progress(stats):
+            done = stats['sent'] + stats['failed'] + stats['skipped']
+            progress = 20 + int(done / max(total, 1) * 70)
+            self._update_job_status(
+                job_id, 'running', min(progress, 90), f'Delivered {done}/{total} reports...')
 
-        overall_stats = get_user_quiz_stats(user.id)
+        result = email_service.deliver_bulk(job_id, messages(), on_progress=on_progress)
+        return {'sent': result['sent'], 'failed': result['failed'] + build_failed}
 
-        subject = f"Your Monthly Quiz Report - {datetime.now().strftime('%B %Y')}"
+    def _build_user_monthly_report(self, email_service, report):
+        month_year = report['month'].strftime('%B %Y')
+        subject = f"Your Monthly Quiz Report - {month_year}"
 
         html_body = f"""
         <html>
         <body style="font-family: Arial, sans-serif; margin: 0; padding: 20px; background-color: #f5f7fa;">
             <div style="max-width: 600px; margin: 0 auto; background: white; border-radius: 10px; padding: 30px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
                 <h2 style="color: #4A90E2; text-align: center;">Monthly Quiz Report</h2>
-                <h3 style="text-align: center; color: #666;">{datetime.now().strftime('%B %Y')}</h3>
+                <h3 style="text-align: center; color: #666;">{month_year}</h3>
                 
-                <p>Hello {user.name},</p>
+                <p>Hello {report['name']},</p>
                 
-                <p>Here's your quiz performance summary for the past month:</p>
+                <p>Here's your quiz performance summary for {month_year}:</p>
                 
                 <div style="background: #f8f9ff; border-radius: 8px; padding: 20px; margin: 20px 0;">
                     <h3 style="color: #4A90E2; margin-top: 0;">Monthly Activity</h3>
                     <ul style="list-style: none; padding: 0;">
-                        <li style="margin: 8px 0;"><strong>Quizzes Taken:</strong> {monthly_stats['quizzes_taken']}</li>
-                        <li style="margin: 8px 0;"><strong>Questions Answered:</strong> {monthly_stats['questions_answered']}</li>
-                        <li style="margin: 8px 0;"><strong>Correct Answers:</strong> {monthly_stats['correct_answers']}</li>
-                        <li style="margin: 8px 0;"><strong>Monthly Accuracy:</strong> {round(monthly_stats['accuracy'], 1)}%</li>
+                        <li style="margin: 8px 0;"><strong>Quizzes Taken:</strong> {report['attempts']}</li>
+                        <li style="margin: 8px 0;"><strong>Questions Answered:</strong> {report['questions_answered']}</li>
+                        <li style="margin: 8px 0;"><strong>Correct Answers:</strong> {report['correct_answers']}</li>
+                        <li style="margin: 8px 0;"><strong>Monthly Accuracy:</strong> {round(report['accuracy'], 1)}%</li>
+                        <li style="margin: 8px 0;"><strong>Average Score:</strong> {round(report['average_score'], 1)}%</li>
+                        <li style="margin: 8px 0;"><strong>Best Quiz:</strong> {format_best_quiz(report)}</li>
+                        <li style="margin: 8px 0;"><strong>Rank:</strong> {format_rank(report)}</li>
                     </ul>
                 </div>
                 
                 <div style="background: #e8f0ff; border-radius: 8px; padding: 20px; margin: 20px 0;">
                     <h3 style="color: #4A90E2; margin-top: 0;">Overall Performance</h3>
                     <ul style="list-style: none; padding: 0;">
-                        <li style="margin: 8px 0;"><strong>Total Quizzes:</strong> {overall_stats['total_quizzes']}</li>
-                        <li style="margin: 8px 0;"><strong>Total Questions:</strong> {overall_stats['total_questions']}</li>
-                        <li style="margin: 8px 0;"><strong>Overall Accuracy:</strong> {round(overall_stats['overall_accuracy'], 1)}%</li>
+                        <li style="margin: 8px 0;"><strong>Total Quizzes:</strong> {report['total_quizzes']}</li>
+                        <li style="margin: 8px 0;"><strong>Total Questions:</strong> {report['total_questions']}</li>
+                        <li style="margin: 8px 0;"><strong>Overall Accuracy:</strong> {round(report['overall_accuracy'], 1)}%</li>
                     </ul>
                 </div>
                 
@@ -659,7 +616,7 @@ class ReportGenerator:
         </html>
         """
 
-        return email_service.send_email(user.email, subject, html_body)
+        return email_service.build_message(report['email'], subject, html_body)
 
 
 def get_report_generator() -> ReportGenerator:
@@ -0,0 +1,155 @@
+import os
+import time
+import smtplib
+import threading
+from collections import deque
+
+# The server rejected this message but the connection is still usable. Every
+# other SMTPException (an OSError subclass) or socket error drops the connection
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                  smtplib.SMTPDataError, smtplib.SMTPNotSupportedError)
+
+
+class PooledConnection:
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            try:
+                self.smtp.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    # Thread-safe pool of logged-in SMTP connections. A connection is reused
+    # for up to max_messages messages, checked with NOOP when it has been idle
+    # for keepalive_interval seconds, and replaced when the server drops it
+
+    def __init__(self, host, port, username=None, password=None, use_tls=False,
+                 use_ssl=False, size=4, max_messages=100, keepalive_interval=30,
+                 idle_timeout=300, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.size = size
+        self.max_messages = max_messages
+        self.keepalive_interval = keepalive_interval
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pid = os.getpid()
+        self.stats = {'connections': 0, 'reconnects': 0, 'sent': 0}
+
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                smtp.starttls()
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        with self._lock:
+            self.stats['connections'] += 1
+        return PooledConnection(smtp)
+
+    def _check_fork(self):
+        # Connections inherited from a parent process (Celery prefork) share
+        # its sockets, drop them without closing
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._idle.clear()
+                    self._slots = threading.BoundedSemaphore(self.size)
+                    self._pid = os.getpid()
+
+    def _is_alive(self, connection):
+        try:
+            return connection.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _take_idle(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                connection = self._idle.pop()
+
+            idle_for = time.monotonic() - connection.last_used
+            if idle_for > self.idle_timeout:
+                connection.close()
+                continue
+            if idle_for > self.keepalive_interval and not self._is_alive(connection):
+                connection.close()
+                continue
+            return connection
+
+    def acquire(self):
+        self._check_fork()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No SMTP connection available")
+        try:
+            return self._take_idle() or self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        try:
+            if discard or connection.sent >= self.max_messages:
+                connection.close()
+            else:
+                connection.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(connection)
+        finally:
+            self._slots.release()
+
+    def send_message(self, msg):
+        connection = self.acquire()
+        discard = True
+        try:
+            try:
+                connection.smtp.send_message(msg)
+            except MESSAGE_ERRORS:
+                discard = False
+                raise
+            except OSError:
+                # Dropped by the server since its last use, retry once on a
+                # fresh connection
+                connection.close()
+                with self._lock:
+                    self.stats['reconnects'] += 1
+                connection = self._connect()
+                try:
+                    connection.smtp.send_message(msg)
+                except MESSAGE_ERRORS:
+                    discard = False
+                    raise
+
+            discard = False
+            connection.sent += 1
+            with self._lock:
+                self.stats['sent'] += 1
+        finally:
+            self.release(connection, discard=discard)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            connection.close()
@@ -0,0 +1,14 @@
+import redis
+
+
+def create_state_store(app):
+    # Runtime state that must survive memory pressure lives in its own
+    # non-evicting Redis (redis-quizzo-state.conf); the cache instance runs
+    # allkeys-lru and may drop any key. Connects lazily on first use
+    return redis.from_url(
+        app.config.get('STATE_REDIS_URL', 'redis://localhost:6380/0'),
+        decode_responses=False,
+        socket_timeout=5,
+        socket_connect_timeout=5,
+        retry_on_timeout=True
+    )
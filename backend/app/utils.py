@@ -1,8 +1,11 @@
+import time
 import secrets
 import hashlib
 from functools import wraps
+from redis.exceptions import RedisError
+from app.cache import cache_result
 from app.models import User, db
-from flask import jsonify, current_app
+from flask import jsonify, current_app, g
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 
@@ -15,18 +18,138 @@ def verify_password(password, password_hash):
     return check_password_hash(password_hash, password)
 
 
+_role_cache = {}
+
+
+def _role_cache_key(user_id):
+    return f'auth_user_{user_id}_role'
+
+
+def get_user_role(user_id):
+    # id -> role lookup backed by a short in-process TTL and Redis, so hot
+    # paths such as rate limiting never touch the database
+    now = time.monotonic()
+    entry = _role_cache.get(user_id)
+    if entry and entry[1] > now:
+        return entry[0]
+
+    role = current_app.cache.get(_role_cache_key(user_id))
+    if role is None:
+        row = db.session.query(User.role).filter(User.id == user_id).first()
+        if row is None:
+            _role_cache.pop(user_id, None)
+            return None
+        role = row[0]
+        current_app.cache.set(_role_cache_key(user_id), role,
+                              timeout=current_app.config.get('USER_ROLE_CACHE_TIMEOUT', 300))
+
+    _role_cache[user_id] = (
+        role, now + current_app.config.get('USER_ROLE_LOCAL_TTL', 30))
+    return role
+
+
+def forget_user_role(user_id):
+    _role_cache.pop(user_id, None)
+    current_app.cache.delete(_role_cache_key(user_id))
+
+
+def get_token_version():
+    # Deployment-wide version from config, see JWT_TOKEN_VERSION
+    return current_app.config.get('JWT_TOKEN_VERSION', 1)
+
+
+_revocations = {}
+
+
+def _revocation_key(user_id):
+    return f"{current_app.config.get('CACHE_KEY_PREFIX', 'quizzo:')}auth_revoked_before:{user_id}"
+
+
+def token_issued_ms():
+    # Issue time in milliseconds, a login right after a revocation in the
+    # same second must not be caught by it
+    return int(time.time() * 1000)
+
+
+def revoke_user_tokens(user_id):
+    # Every token issued to the user up to now is rejected; the entry lives
+    # in the non-evicting state store only as long as those tokens can
+    timeout = int(current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 3600))
+    current_app.state_store.set(_revocation_key(user_id), token_issued_ms(), ex=timeout)
+    _revocations.pop(user_id, None)
+    forget_user_role(user_id)
+
+
+def get_revoked_before(user_id):
+    # Per-user revocation time in milliseconds (0 if never revoked) behind a short
+    # in-process TTL, so other users' tokens are never affected
+    now = time.monotonic()
+    entry = _revocations.get(user_id)
+    if entry and entry[1] > now:
+        return entry[0]
+
+    value = current_app.state_store.get(_revocation_key(user_id))
+    revoked_before = int(value) if value is not None else 0
+    _revocations[user_id] = (
+        revoked_before, now + current_app.config.get('JWT_REVOCATION_TTL', 5))
+    return revoked_before
+
+
+def _role_from_claims(user_id):
+    claims = get_jwt()
+    role = claims.get('role')
+    version = claims.get('ver')
+
+    try:
+        revoked_before = get_revoked_before(user_id)
+        # Tokens issued before iat_ms existed only carry whole seconds
+        issued_ms = claims.get('iat_ms', claims.get('iat', 0) * 1000)
+        if revoked_before and issued_ms < revoked_before:
+            return None
+    except RedisError:
+        # Revocations unknown, the database decides
+        current_app.logger.warning(
+            f"Revocation check failed for user {user_id}, verifying against the database")
+        return get_user_role(user_id)
+
+    if role and version is not None and version >= get_token_version():
+        return role
+
+    # Legacy token or one from before a JWT_TOKEN_VERSION bump
+    return get_user_role(user_id)
+
+
+def get_current_identity():
+    # Resolved once per request and shared by the rate limiter, the auth
+    # decorators and get_current_user
+    if 'current_identity' in g:
+        return g.current_identity
+
+    user_id, role = None, None
+    try:
+        identity = get_jwt_identity()
+        if identity is not None:
+            user_id = int(identity)
+            role = _role_from_claims(user_id)
+    except (ValueError, TypeError):
+        user_id = None
+
+    g.current_identity = (user_id, role)
+    return g.current_identity
+
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         verify_jwt_in_request()
         try:
-            user_id = int(get_jwt_identity())
+            int(get_jwt_identity())
         except (ValueError, TypeError):
             return {'message': 'Invalid token format'}, 401
 
-        user = User.query.get(user_id)
+        user_id, role = get_current_identity()
 
-        if not user or user.role != 'admin':
+        if not user_id or role != 'admin':
             return {'message': 'Admin access required'}, 403
 
         return f(*args, **kwargs)
@@ -38,13 +161,13 @@ def user_required(f):
     def decorated_function(*args, **kwargs):
         verify_jwt_in_request()
         try:
-            user_id = int(get_jwt_identity())
+            int(get_jwt_identity())
         except (ValueError, TypeError):
             return {'message': 'Invalid token format'}, 401
 
-        user = User.query.get(user_id)
+        user_id, role = get_current_identity()
 
-        if not user:
+        if not user_id or role is None:
             return {'message': 'Authentication required'}, 401
 
         return f(*args, **kwargs)
@@ -52,12 +175,18 @@ def user_required(f):
 
 
 def get_current_user():
+    if 'current_user' in g:
+        return g.current_user
+
     try:
         user_id = int(get_jwt_identity())
-        return User.query.get(user_id)
     except (ValueError, TypeError):
         return None
 
+    user = db.session.get(User, user_id)
+    g.current_user = user
+    return user
+
 
 def cache_key(*args, **kwargs):
     key_parts = [str(arg) for arg in args]
@@ -66,61 +195,174 @@ def cache_key(*args, **kwargs):
     return hashlib.md5(key_string.encode()).hexdigest()
 
 
-def calculate_quiz_score(quiz_id, user_id):
+def _attempt_aggregates():
+    from sqlalchemy import func, case
     from app.models import Submission, Question
 
-    submissions = Submission.query.filter_by(
-        quiz_id=quiz_id,
-        user_id=user_id
-    ).all()
+    return (
+        func.coalesce(func.sum(case(
+            (Submission.is_correct == True, Question.marks), else_=0)), 0).label('obtained_marks'),
+        func.coalesce(func.sum(Question.marks), 0).label('total_marks'),
+        func.coalesce(func.sum(case(
+            (Submission.is_correct == True, 1), else_=0)), 0).label('correct_count'),
+        func.count(Submission.id).label('question_count'),
+        func.max(Submission.timestamp).label('completed_at')
+    )
+
+
+def _apply_attempt_row(attempt, row):
+    attempt.obtained_marks = float(row.obtained_marks or 0)
+    attempt.total_marks = float(row.total_marks or 0)
+    attempt.correct_count = int(row.correct_count or 0)
+    attempt.question_count = int(row.question_count or 0)
+    attempt.completed_at = row.completed_at
+
+
+def update_quiz_attempt(user_id, quiz_id):
+    # Recompute the QuizAttempt summary, and the user's monthly rollup, inside
+    # the caller's transaction; the caller is responsible for committing.
+    from app.models import Submission, Question, QuizAttempt
+    from app.services.monthly_activity import refresh_monthly_activity
+
+    row = db.session.query(*_attempt_aggregates()).join(
+        Question, Submission.question_id == Question.id
+    ).filter(
+        Submission.user_id == user_id,
+        Submission.quiz_id == quiz_id
+    ).one()
+
+    attempt = QuizAttempt.query.filter_by(
+        user_id=user_id, quiz_id=quiz_id).first()
+    # A resubmission can move the attempt into another month
+    previous_completed_at = attempt.completed_at if attempt else None
+
+    if row.question_count == 0:
+        if attempt:
+            db.session.delete(attempt)
+            refresh_monthly_activity(user_id, previous_completed_at)
+        return None
+
+    if not attempt:
+        attempt = QuizAttempt(user_id=user_id, quiz_id=quiz_id)
+        db.session.add(attempt)
+
+    _apply_attempt_row(attempt, row)
+    refresh_monthly_activity(user_id, previous_completed_at, attempt.completed_at)
+    return attempt
+
+
+def rebuild_quiz_attempts(quiz_id):
+    # Rebuild every attempt of a quiz from one grouped query; no commit.
+    from app.models import Submission, Question, QuizAttempt
+
+    rows = db.session.query(Submission.user_id, *_attempt_aggregates()).join(
+        Question, Submission.question_id == Question.id
+    ).filter(
+        Submission.quiz_id == quiz_id
+    ).group_by(Submission.user_id).all()
+
+    existing = {a.user_id: a for a in QuizAttempt.query.filter_by(
+        quiz_id=quiz_id).all()}
+
+    for row in rows:
+        attempt = existing.pop(row.user_id, None)
+        if not attempt:
+            attempt = QuizAttempt(user_id=row.user_id, quiz_id=quiz_id)
+            db.session.add(attempt)
+        _apply_attempt_row(attempt, row)
+
+    # Users left over no longer have any gradable submission
+    for attempt in existing.values():
+        db.session.delete(attempt)
+
+    return len(rows)
+
 
-    total_marks = 0
-    obtained_marks = 0
+def sync_quiz_attempts():
+    # Backfill attempts for (user, quiz) pairs submitted before QuizAttempt existed
+    from app.models import Submission, Question, QuizAttempt
 
-    for submission in submissions:
-        question = Question.query.get(submission.question_id)
-        total_marks += question.marks
-        if submission.is_correct:
-            obtained_marks += question.marks
+    missing = db.session.query(
+        Submission.user_id, Submission.quiz_id, *_attempt_aggregates()
+    ).join(
+        Question, Submission.question_id == Question.id
+    ).outerjoin(
+        QuizAttempt, db.and_(QuizAttempt.user_id == Submission.user_id,
+                             QuizAttempt.quiz_id == Submission.quiz_id)
+    ).filter(
+        QuizAttempt.id.is_(None)
+    ).group_by(Submission.user_id, Submission.quiz_id).all()
+
+    for row in missing:
+        attempt = QuizAttempt(user_id=row.user_id, quiz_id=row.quiz_id)
+        _apply_attempt_row(attempt, row)
+        db.session.add(attempt)
+
+    if missing:
+        db.session.commit()
+    return len(missing)
+
+
+def get_quiz_attempt(quiz_id, user_id):
+    from app.models import QuizAttempt
+
+    return QuizAttempt.query.filter_by(user_id=user_id, quiz_id=quiz_id).first()
+
+
+def calculate_quiz_score(quiz_id, user_id):
+    return score_from_attempt(get_quiz_attempt(quiz_id, user_id))
+
+
+def score_from_attempt(attempt):
+    if not attempt:
+        return {
+            'total_marks': 0,
+            'obtained_marks': 0,
+            'percentage': 0
+        }
 
     return {
-        'total_marks': total_marks,
-        'obtained_marks': obtained_marks,
-        'percentage': (obtained_marks / total_marks * 100) if total_marks > 0 else 0
+        'total_marks': attempt.total_marks,
+        'obtained_marks': attempt.obtained_marks,
+        'percentage': attempt.percentage
     }
 
 
 def get_user_quiz_stats(user_id):
-    from app.models import Submission, Quiz
+    from app.models import QuizAttempt, Quiz
 
-    quiz_ids = db.session.query(Submission.quiz_id).filter_by(
-        user_id=user_id).distinct().all()
-    quiz_ids = [q[0] for q in quiz_ids]
+    attempts = db.session.query(QuizAttempt, Quiz.title, Quiz.time_duration).join(
+        Quiz, QuizAttempt.quiz_id == Quiz.id
+    ).filter(QuizAttempt.user_id == user_id).all()
 
     stats = {
-        'total_quizzes': len(quiz_ids),
+        'total_quizzes': len(attempts),
         'total_questions': 0,
         'correct_answers': 0,
+        # Sum of the quizzes' allotted durations; attempts do not record
+        # how long they actually took
+        'total_allotted_minutes': 0,
         'quiz_scores': []
     }
 
-    for quiz_id in quiz_ids:
-        score_data = calculate_quiz_score(quiz_id, user_id)
-        quiz = Quiz.query.get(quiz_id)
-
+    for attempt, quiz_title, time_duration in attempts:
         stats['quiz_scores'].append({
-            'quiz_id': quiz_id,
-            'quiz_title': quiz.title,
-            'score': score_data['percentage']  # Extract the percentage value
+            'quiz_id': attempt.quiz_id,
+            'quiz_title': quiz_title,
+            'score': attempt.percentage,  # Extract the percentage value
+            'obtained_marks': attempt.obtained_marks,
+            'total_marks': attempt.total_marks
         })
 
-        submissions = Submission.query.filter_by(
-            quiz_id=quiz_id,
-            user_id=user_id
-        ).all()
+        stats['total_questions'] += attempt.question_count
+        stats['correct_answers'] += attempt.correct_count
 
-        stats['total_questions'] += len(submissions)
-        stats['correct_answers'] += sum(1 for s in submissions if s.is_correct)
+        if time_duration:
+            try:
+                hours, minutes = map(int, time_duration.split(':')[:2])
+                stats['total_allotted_minutes'] += hours * 60 + minutes
+            except ValueError:
+                pass
 
     if stats['total_questions'] > 0:
         stats['overall_accuracy'] = (
@@ -131,35 +373,148 @@ def get_user_quiz_stats(user_id):
     return stats
 
 
-def validate_quiz_access(quiz_id, user_id):
-    from app.models import Quiz, Subscription
+def upsert_submissions(rows, chunk_size=500, newer_only=False):
+    # Insert or update answers keyed on (user_id, quiz_id, question_id) with
+    # INSERT ... ON CONFLICT DO UPDATE; the caller is responsible for committing.
+    # newer_only leaves rows alone whose stored answer is more recent.
+    from app.models import Submission
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        insert = None
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+
+        if insert is None:
+            for row in chunk:
+                submission = Submission.query.filter_by(
+                    user_id=row['user_id'],
+                    quiz_id=row['quiz_id'],
+                    question_id=row['question_id']
+                ).first()
+                if submission:
+                    if newer_only and submission.timestamp and submission.timestamp > row['timestamp']:
+                        continue
+                    submission.answer = row['answer']
+                    submission.is_correct = row['is_correct']
+                    submission.timestamp = row['timestamp']
+                else:
+                    db.session.add(Submission(**row))
+            db.session.flush()
+            continue
+
+        stmt = insert(Submission)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'quiz_id', 'question_id'],
+            set_={
+                'answer': stmt.excluded.answer,
+                'is_correct': stmt.excluded.is_correct,
+                'timestamp': stmt.excluded.timestamp
+            },
+            where=(Submission.timestamp <= stmt.excluded.timestamp) if newer_only else None
+        )
+        db.session.execute(stmt, chunk)
+
+    return len(rows)
+
+
+def update_job_status(job_id, status, progress=0, message="", download_url=""):
     from datetime import datetime
 
-    quiz = Quiz.query.get(quiz_id)
-    if not quiz:
-        return False, "Quiz not found"
+    job_status = {
+        'job_id': job_id,
+        'status': status,  # pending, running, completed, failed
+        'progress': progress,
+        'message': message,
+        'download_url': download_url,
+        'created_at': datetime.now().isoformat() + 'Z',
+        'updated_at': datetime.now().isoformat() + 'Z'
+    }
 
-    subscription = Subscription.query.filter_by(
-        user_id=user_id,
-        chapter_id=quiz.chapter_id,
-        is_active=True
-    ).first()
+    if status == 'completed':
+        job_status['completed_at'] = datetime.now().isoformat() + 'Z'
+
+    current_app.cache.set(f'job_status_{job_id}', job_status,
+                          timeout=3600)  # Cache for 1 hour
+    return job_status
 
-    if not subscription:
-        return False, "Not subscribed to this chapter"
 
-    if quiz.is_scheduled and quiz.date_of_quiz:
-        if datetime.now() < quiz.date_of_quiz:
-            return False, "Quiz not yet started"
+def quiz_access_key(quiz_id, user_id):
+    # In the user's namespace so unsubscribing drops it, tagged quiz:<id> by
+    # the warmer so quiz edits do too
+    return f'user_{user_id}_quiz_{quiz_id}_access'
 
+
+def quiz_access_grant(quiz):
+    return {
+        'chapter_id': quiz.chapter_id,
+        'start': quiz.date_of_quiz.isoformat() if quiz.is_scheduled and quiz.date_of_quiz else None
+    }
+
+
+def get_quiz_access_grant(quiz_id, user_id):
+    # Prebuilt by the cache warmer: subscribed and not yet submitted
+    grant = current_app.cache.get(quiz_access_key(quiz_id, user_id))
+    return grant if isinstance(grant, dict) else None
+
+
+def check_quiz_access_grant(grant):
+    from datetime import datetime
+
+    if grant.get('start') and datetime.now() < datetime.fromisoformat(grant['start']):
+        return False, "Quiz not yet started"
     return True, "Access granted"
 
 
+@cache_result('quiz_{quiz_id}_access_info', timeout=3600)
+def get_quiz_access_info(quiz_id):
+    from app.models import Quiz
+
+    quiz = db.session.get(Quiz, quiz_id)
+    if quiz is None:
+        return None
+    return quiz_access_grant(quiz)
+
+
+def get_user_chapter_ids(user_id):
+    from app.models import Subscription
+
+    # In the user's namespace, so every subscribe/unsubscribe replaces it
+    cache_key_name = f'user_{user_id}_active_chapters'
+    chapter_ids = current_app.cache.get(cache_key_name)
+    if chapter_ids is None:
+        chapter_ids = [row[0] for row in db.session.query(Subscription.chapter_id).filter(
+            Subscription.user_id == user_id,
+            Subscription.is_active == True
+        ).all()]
+        current_app.cache.set(cache_key_name, chapter_ids,
+                              timeout=current_app.config.get('USER_CHAPTERS_CACHE_TIMEOUT', 3600))
+    return chapter_ids
+
+
+def validate_quiz_access(quiz_id, user_id):
+    # Two cache reads on the hot path, the database only on a miss
+    quiz = get_quiz_access_info(quiz_id)
+    if quiz is None:
+        return False, "Quiz not found"
+
+    if quiz['chapter_id'] not in get_user_chapter_ids(user_id):
+        return False, "Not subscribed to this chapter"
+
+    return check_quiz_access_grant(quiz)
+
+
 def format_quiz_result(quiz_id, user_id):
     from app.models import Quiz, Question, Submission
 
     quiz = Quiz.query.get(quiz_id)
-    score = calculate_quiz_score(quiz_id, user_id)
+    attempt = get_quiz_attempt(quiz_id, user_id)
+    score = score_from_attempt(attempt)
 
     questions = Question.query.filter_by(quiz_id=quiz_id).all()
     question_performance = []
@@ -189,9 +544,7 @@ def format_quiz_result(quiz_id, user_id):
         },
         'score': score,
         'question_performance': question_performance,
-        'completed_at': max([s.timestamp for s in Submission.query.filter_by(
-            quiz_id=quiz_id, user_id=user_id
-        ).all()]) if Submission.query.filter_by(quiz_id=quiz_id, user_id=user_id).first() else None
+        'completed_at': attempt.completed_at if attempt else None
     }
 
 
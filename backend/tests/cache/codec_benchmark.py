@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the RedisCache payload codecs.
+
+Encodes and decodes payloads shaped like the largest cached responses
+(user detailed submissions and the admin course list) with every
+codec/compression combination and reports size and latency.
+
+Usage: python tests/cache/codec_benchmark.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+from app.cache_codecs import CacheSerializer, AVAILABLE_CODECS, AVAILABLE_COMPRESSION  # noqa: E402
+
+
+def detailed_submissions_payload(quizzes=40, questions=25):
+    return {
+        'submissions': [
+            {
+                'quiz_id': quiz_id,
+                'quiz_title': f'Quiz {quiz_id}: Fundamentals and Applications',
+                'chapter_name': 'Chapter on Linear Algebra',
+                'course_name': 'Mathematics for Data Science I',
+                'score': 72.5,
+                'total_questions': questions,
+                'correct_answers': 18,
+                'submitted_at': '2025-07-31T10:15:00',
+                'answers': [
+                    {
+                        'question_id': quiz_id * 100 + q,
+                        'question_statement': 'Which of the following statements about eigenvalues is correct?',
+                        'answer': [q % 4],
+                        'correct_answer': [(q + 1) % 4],
+                        'is_correct': q % 3 != 0,
+                        'marks': 2.0
+                    }
+                    for q in range(questions)
+                ]
+            }
+            for quiz_id in range(quizzes)
+        ]
+    }
+
+
+def admin_courses_payload(courses=30, chapters=8):
+    return {
+        'courses': [
+            {
+                'id': course_id,
+                'name': f'Course {course_id}',
+                'description': 'An introductory course covering the essentials. ' * 3,
+                'chapters': [
+                    {
+                        'id': course_id * 100 + chapter_id,
+                        'name': f'Chapter {chapter_id}',
+                        'quiz_count': 6,
+                        'question_count': 120,
+                        'subscribers': 340
+                    }
+                    for chapter_id in range(chapters)
+                ]
+            }
+            for course_id in range(courses)
+        ]
+    }
+
+
+def measure(serializer, payload, iterations):
+    encoded = serializer.dumps(payload)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serializer.dumps(payload)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        serializer.loads(encoded)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+
+    assert serializer.loads(encoded) == payload
+    return len(encoded), encode_us, decode_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    payloads = {
+        'detailed_submissions': detailed_submissions_payload(),
+        'admin_courses': admin_courses_payload(),
+    }
+    codecs = [name for name, available in AVAILABLE_CODECS.items() if available]
+    compressions = [name for name, available in AVAILABLE_COMPRESSION.items() if available]
+
+    for payload_name, payload in payloads.items():
+        print(f"\n{payload_name}")
+        print(f"{'codec':<10}{'compression':<13}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+        for codec in codecs:
+            for compression in compressions:
+                serializer = CacheSerializer(codec=codec, compression=compression)
+                size, encode_us, decode_us = measure(
+                    serializer, payload, iterations)
+                print(f"{codec:<10}{compression:<13}{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
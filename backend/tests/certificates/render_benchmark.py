@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark for certificate PDF rendering.
+
+Renders sample certificates three ways and reports certificates/second:
+  fresh     a new renderer per certificate (template and stylesheets
+            parsed on every render, as before they were shared)
+  reused    one renderer for every certificate
+  batch     render_certificates with a process pool
+
+Needs WeasyPrint and its system libraries (Pango). No network access or
+database is used.
+
+Usage: python tests/certificates/render_benchmark.py [certificates] [processes]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import time
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+from app.config import Config  # noqa: E402
+from app.services.certificate_generator import CertificateRenderer, render_certificates  # noqa: E402
+
+
+def certificate_data(index):
+    return {
+        'user_name': f'Student {index}',
+        'user_email': f'student{index}@example.com',
+        'quiz_title': 'Eigenvalues and Eigenvectors',
+        'chapter_name': 'Linear Algebra',
+        'course_name': 'Mathematics for Data Science I',
+        'score_percentage': 80 + index % 20,
+        'obtained_marks': 16 + index % 4,
+        'total_marks': 20,
+        'total_questions': 10,
+        'completion_date': 'July 31, 2025',
+        'certificate_id': f'CERT-{index}-1-{index:012X}',
+        'quiz_id': 1,
+        'user_id': index
+    }
+
+
+def report(name, count, seconds):
+    print(f"{name:<10}{count:>8}{seconds:>10.2f}{count / seconds:>14.2f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    fonts_dir = Config.CERTIFICATE_FONTS_DIR
+    output_dir = tempfile.mkdtemp(prefix='certificate_bench_')
+
+    try:
+        renderer = CertificateRenderer(fonts_dir)
+        if renderer.missing_fonts:
+            print(f"Fonts missing from {fonts_dir}, using system fallbacks: "
+                  f"{', '.join(renderer.missing_fonts)}")
+        jobs = [
+            (renderer.render_html(certificate_data(i)), os.path.join(output_dir, f'{i}.pdf'))
+            for i in range(count)
+        ]
+        # Warm up font loading so the first mode is not penalised
+        renderer.render_pdf(jobs[0][0])
+
+        print(f"{'mode':<10}{'certs':>8}{'seconds':>10}{'certs/sec':>14}")
+
+        start = time.perf_counter()
+        for html_content, file_path in jobs:
+            CertificateRenderer(fonts_dir).render_to_file(html_content, file_path)
+        report('fresh', count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for html_content, file_path in jobs:
+            renderer.render_to_file(html_content, file_path)
+        report('reused', count, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        render_certificates(renderer, jobs, fonts_dir=fonts_dir, processes=processes)
+        report(f'batch/{processes}', count, time.perf_counter() - start)
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Bulk campaign delivery benchmark against a local aiosmtpd stand-in.
+
+Starts an in-process aiosmtpd server whose DATA reply takes a fixed time
+(approximating a relay's per-message latency) and sends the same campaign
+two ways, reporting messages/second:
+  sequential  one message after another over SMTPConnectionPool, as the
+              bulk reminder and monthly report jobs did before
+  engine      DeliveryEngine with MAIL_ASYNC_CONNECTIONS connections
+
+Also rejects one recipient domain temporarily and one permanently to show
+the retries and the ledger, then reruns the campaign to check that the
+ledger makes it skip everything already settled.
+
+Requires: pip install aiosmtpd aiosmtplib
+Usage: python tests/email/bulk_delivery_benchmark.py [messages] [connections] [data_ms]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from collections import Counter
+from email.mime.text import MIMEText
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from flask import Flask  # noqa: E402
+from app.services.mail_delivery import (  # noqa: E402
+    AioSMTPTransport, DeliveryEngine, DeliveryLedger)
+from app.services.smtp_pool import SMTPConnectionPool  # noqa: E402
+
+DOMAINS = ('example.com', 'example.org', 'example.net', 'greylist.test', 'bounce.test')
+
+
+class RelayHandler:
+
+    def __init__(self, data_delay):
+        self.data_delay = data_delay
+        self.received = 0
+        self.greylisted = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, options):
+        domain = address.rpartition('@')[2]
+        if domain == 'bounce.test':
+            return '550 5.1.1 No such user'
+        if domain == 'greylist.test' and address not in self.greylisted:
+            self.greylisted.add(address)
+            return '451 4.7.1 Greylisted, try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.data_delay)
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_message(index, domain):
+    msg = MIMEText(f'<p>Reminder {index}</p>' * 20, 'html')
+    msg['From'] = 'Quizzo Team <noreply@quizzo.com>'
+    msg['To'] = f'student{index}@{domain}'
+    msg['Subject'] = f'Quiz reminder {index}'
+    return msg
+
+
+def campaign(count, domains):
+    for i in range(count):
+        yield f'reminder:{i}', make_message(i, domains[i % len(domains)])
+
+
+def report(label, count, elapsed):
+    print(f"{label:<14}{count:>8}{elapsed:>10.2f}{count / elapsed:>12.1f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    data_delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+
+    handler = RelayHandler(data_delay)
+    host, port = '127.0.0.1', free_port()
+    controller = Controller(handler, hostname=host, port=port)
+    controller.start()
+    # The engine logs failures through the Flask app
+    context = Flask(__name__).app_context()
+    context.push()
+
+    try:
+        print(f"{count} messages, {connections} connections, "
+              f"{data_delay * 1000:.0f} ms per message")
+        print(f"{'mode':<14}{'msgs':>8}{'seconds':>10}{'msgs/sec':>12}")
+
+        pool = SMTPConnectionPool(host, port, size=1, max_messages=100)
+        start = time.perf_counter()
+        for _, msg in campaign(count, DOMAINS[:3]):
+            pool.send_message(msg)
+        report('sequential', count, time.perf_counter() - start)
+        pool.close()
+
+        engine = DeliveryEngine(
+            lambda: AioSMTPTransport(host, port, max_messages=100),
+            connections=connections, per_domain=connections)
+        start = time.perf_counter()
+        stats = engine.deliver(campaign(count, DOMAINS[:3]))
+        report('engine', count, time.perf_counter() - start)
+        assert stats['sent'] == count, stats
+
+        # Greylisted recipients succeed on retry, bounces are rejected once
+        # and the rerun skips every settled message
+        with tempfile.TemporaryDirectory() as ledger_dir:
+            ledger_path = os.path.join(ledger_dir, 'campaign.jsonl')
+            engine = DeliveryEngine(
+                lambda: AioSMTPTransport(host, port),
+                connections=connections, per_domain=2, backoff=0.05,
+                ledger=DeliveryLedger(ledger_path))
+            print(f"mixed run:  {engine.deliver(campaign(100, DOMAINS))}")
+            print(f"rerun:      {engine.deliver(campaign(100, DOMAINS))}")
+            with open(ledger_path) as ledger:
+                statuses = Counter(json.loads(line)['status'] for line in ledger)
+            print(f"ledger:     {dict(statuses)}")
+    finally:
+        context.pop()
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+SMTP throughput benchmark against a local aiosmtpd stand-in.
+
+Starts an in-process aiosmtpd server (with an optional artificial
+handshake delay to approximate TCP+TLS+AUTH against a real relay) and
+sends the same messages two ways, reporting messages/second:
+  per-message  a new SMTP connection per message, as before pooling
+  pooled       SMTPConnectionPool shared by several sender threads
+
+Also checks that the pool recovers after the server restarts and drops
+its connections.
+
+Requires: pip install aiosmtpd
+Usage: python tests/email/smtp_pool_benchmark.py [messages] [threads] [handshake_ms]
+"""
+
+import asyncio
+import os
+import smtplib
+import socket
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.text import MIMEText
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+from aiosmtpd.controller import Controller  # noqa: E402
+from aiosmtpd.smtp import SMTP as SMTPServer  # noqa: E402
+from app.services.smtp_pool import SMTPConnectionPool  # noqa: E402
+
+
+class CountingHandler:
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+class SlowHandshakeSMTP(SMTPServer):
+    # Each new connection pays a fixed delay before the greeting
+
+    handshake_delay = 0.0
+
+    async def _handle_client(self):
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        return await super()._handle_client()
+
+
+class StandInController(Controller):
+
+    def factory(self):
+        return SlowHandshakeSMTP(self.handler)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_message(index):
+    msg = MIMEText(f'<p>Reminder {index}</p>' * 20, 'html')
+    msg['From'] = 'Quizzo Team <noreply@quizzo.com>'
+    msg['To'] = f'student{index}@example.com'
+    msg['Subject'] = f'Quiz reminder {index}'
+    return msg
+
+
+def send_per_message(host, port, msg):
+    server = smtplib.SMTP(host, port, timeout=30)
+    server.send_message(msg)
+    server.quit()
+
+
+def run(label, count, threads, send):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(send, (make_message(i) for i in range(count))))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<14}{count:>8}{elapsed:>10.2f}{count / elapsed:>12.1f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    SlowHandshakeSMTP.handshake_delay = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+
+    handler = CountingHandler()
+    host, port = '127.0.0.1', free_port()
+    controller = StandInController(handler, hostname=host, port=port)
+    controller.start()
+
+    try:
+        print(f"{count} messages, {threads} threads, "
+              f"{SlowHandshakeSMTP.handshake_delay * 1000:.0f} ms handshake")
+        print(f"{'mode':<14}{'msgs':>8}{'seconds':>10}{'msgs/sec':>12}")
+
+        run('per-message', count, threads,
+            lambda msg: send_per_message(host, port, msg))
+
+        pool = SMTPConnectionPool(host, port, size=threads, max_messages=100)
+        run('pooled', count, threads, pool.send_message)
+        print(f"pool stats: {pool.stats}")
+
+        # Server restart drops every pooled connection; sends must recover
+        controller.stop()
+        controller = StandInController(handler, hostname=host, port=port)
+        controller.start()
+        for i in range(threads * 2):
+            pool.send_message(make_message(i))
+        print(f"after restart: {pool.stats}")
+        pool.close()
+
+        assert handler.received == 2 * count + threads * 2, handler.received
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk delivery over the aiosmtplib transport.
+
+Runs DeliveryEngine with AioSMTPTransport against a local aiosmtpd server:
+every message is delivered over reused connections, 4xx replies are retried
+and 5xx replies are recorded as rejected without a retry.
+
+Usage: python -m pytest tests/email/test_aiosmtp_transport.py
+"""
+
+import os
+import sys
+import json
+import socket
+from email.message import EmailMessage
+from types import SimpleNamespace
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+import pytest  # noqa: E402
+
+pytest.importorskip('aiosmtplib')
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+from flask import Flask  # noqa: E402
+from app.services.mail_delivery import (  # noqa: E402
+    AioSMTPTransport, DeliveryEngine, DeliveryLedger, get_delivery_engine)
+
+
+class RecordingHandler:
+    # Accepts everything except rejected@ (550) and, once, deferred@ (450)
+
+    def __init__(self):
+        self.messages = []
+        self.deferred = False
+        self.sessions = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('rejected@'):
+            return '550 No such user'
+        if address.startswith('deferred@') and not self.deferred:
+            self.deferred = True
+            return '450 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope.rcpt_tos[0])
+        return '250 Message accepted'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    try:
+        yield handler, controller.hostname, controller.port
+    finally:
+        controller.stop()
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(MAIL_ASYNC_CONNECTIONS=3, MAIL_DOMAIN_CONCURRENCY=2,
+                      MAIL_MAX_ATTEMPTS=3, MAIL_RETRY_BACKOFF=0.01)
+    with app.app_context():
+        yield app
+
+
+def message(recipient):
+    msg = EmailMessage()
+    msg['From'] = 'quizzo@example.com'
+    msg['To'] = recipient
+    msg['Subject'] = 'Certificate'
+    msg.set_content('Congratulations')
+    return msg
+
+
+def ledger_entries(path):
+    with open(path, encoding='utf-8') as ledger:
+        return [json.loads(line) for line in ledger]
+
+
+def test_delivers_over_reused_connections(app, smtp_server, tmp_path):
+    handler, host, port = smtp_server
+    engine = DeliveryEngine(lambda: AioSMTPTransport(host, port), connections=2,
+                            ledger=DeliveryLedger(str(tmp_path / 'campaign.jsonl')))
+
+    stats = engine.deliver(
+        (f"user-{i}", message(f"user{i}@example.com")) for i in range(20))
+
+    assert stats == {'sent': 20, 'failed': 0, 'retried': 0, 'skipped': 0}
+    assert sorted(handler.messages) == sorted(f"user{i}@example.com" for i in range(20))
+    # One connection per worker, not one per message
+    assert len(handler.sessions) <= 2
+
+
+def test_retries_transient_and_rejects_permanent(app, smtp_server, tmp_path):
+    handler, host, port = smtp_server
+    ledger_path = str(tmp_path / 'campaign.jsonl')
+    engine = DeliveryEngine(lambda: AioSMTPTransport(host, port), connections=1,
+                            max_attempts=3, backoff=0.01,
+                            ledger=DeliveryLedger(ledger_path))
+
+    stats = engine.deliver([
+        ('deferred', message('deferred@example.com')),
+        ('rejected', message('rejected@example.com')),
+    ])
+
+    assert stats == {'sent': 1, 'failed': 1, 'retried': 1, 'skipped': 0}
+    assert handler.messages == ['deferred@example.com']
+    statuses = [(entry['key'], entry['status']) for entry in ledger_entries(ledger_path)]
+    assert statuses == [('deferred', 'retry'), ('deferred', 'sent'), ('rejected', 'rejected')]
+
+    # A rerun of the campaign skips both settled messages
+    rerun = DeliveryEngine(lambda: AioSMTPTransport(host, port), connections=1,
+                           ledger=DeliveryLedger(ledger_path))
+    assert rerun.deliver([
+        ('deferred', message('deferred@example.com')),
+        ('rejected', message('rejected@example.com')),
+    ])['skipped'] == 2
+
+
+def test_engine_uses_aiosmtplib_transport(app, smtp_server, tmp_path):
+    handler, host, port = smtp_server
+    app.config['MAIL_LEDGER_DIR'] = str(tmp_path)
+    pool = SimpleNamespace(host=host, port=port, username=None, password=None,
+                           use_tls=False, use_ssl=False, max_messages=100,
+                           keepalive_interval=30, timeout=10, size=1)
+
+    engine = get_delivery_engine(pool, 'campaign')
+
+    assert isinstance(engine.transport_factory(), AioSMTPTransport)
+    # Not capped by the blocking pool's size
+    assert engine.connections == 3
+    assert engine.deliver([('one', message('one@example.com'))])['sent'] == 1
+    assert handler.messages == ['one@example.com']
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the quiz submit write path.
+
+Compares the old ORM path (load existing submissions, mutate or add each
+row, flush) with the single INSERT ... ON CONFLICT DO UPDATE done by
+upsert_submissions, for a first submission and a resubmission of the
+same quiz. Runs against a throwaway SQLite database unless a database URL
+is given, and reports statements executed and wall time per submission.
+
+Usage: python tests/submissions/submit_benchmark.py [questions] [iterations] [database_url]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from app.models import db, Submission  # noqa: E402
+from app.utils import upsert_submissions  # noqa: E402
+
+QUIZ_ID = 1
+
+
+def make_rows(user_id, questions):
+    now = datetime.now()
+    return [
+        {
+            'user_id': user_id,
+            'quiz_id': QUIZ_ID,
+            'question_id': question_id,
+            'answer': [question_id % 4],
+            'is_correct': question_id % 3 != 0,
+            'timestamp': now
+        }
+        for question_id in range(1, questions + 1)
+    ]
+
+
+def orm_submit(rows):
+    existing = {
+        sub.question_id: sub for sub in Submission.query.filter_by(
+            user_id=rows[0]['user_id'], quiz_id=QUIZ_ID).all()
+    }
+    for row in rows:
+        submission = existing.get(row['question_id'])
+        if submission:
+            submission.answer = row['answer']
+            submission.is_correct = row['is_correct']
+            submission.timestamp = row['timestamp']
+        else:
+            db.session.add(Submission(**row))
+    db.session.commit()
+
+
+def upsert_submit(rows):
+    upsert_submissions(rows)
+    db.session.commit()
+
+
+def measure(submit, questions, iterations, first_user_id):
+    statements = []
+
+    def count(*args):
+        statements[-1] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    results = {}
+    try:
+        for phase in ('insert', 'update'):
+            elapsed = 0.0
+            statements.clear()
+            for i in range(iterations):
+                rows = make_rows(first_user_id + i, questions)
+                statements.append(0)
+                start = time.perf_counter()
+                submit(rows)
+                elapsed += time.perf_counter() - start
+            results[phase] = (max(statements), elapsed / iterations * 1000)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return results
+
+
+def main():
+    questions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    database_url = sys.argv[3] if len(sys.argv) > 3 else 'sqlite://'
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        try:
+            print(f"{questions} questions, {iterations} submissions per phase, "
+                  f"{db.engine.dialect.name}")
+            print(f"{'path':<10}{'phase':<9}{'statements':>12}{'ms':>10}")
+            # Separate user ranges so each path starts from an empty quiz
+            for offset, (name, submit) in enumerate(
+                    (('orm', orm_submit), ('upsert', upsert_submit))):
+                results = measure(submit, questions, iterations,
+                                  first_user_id=1 + offset * iterations)
+                for phase, (statements, ms) in results.items():
+                    print(f"{name:<10}{phase:<9}{statements:>12}{ms:>10.2f}")
+        finally:
+            db.session.remove()
+            if database_url != 'sqlite://':
+                Submission.query.filter_by(quiz_id=QUIZ_ID).delete()
+                db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Query-plan test for the Submission/Subscription hot-path indexes.
+
+Builds a SQLite database the way it looked before the indexes existed,
+seeds it with QUERY_PLAN_SUBMISSIONS submissions (1M by default), runs
+upgrade_schema and checks with EXPLAIN QUERY PLAN that the queries the
+endpoints issue are served by the new indexes instead of table scans.
+
+Usage: python -m pytest tests/submissions/test_query_plans.py
+"""
+
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+# Add the backend directory to Python path to import app modules
+backend_dir = os.path.dirname(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+import pytest  # noqa: E402
+from flask import Flask  # noqa: E402
+from sqlalchemy import func, inspect, text  # noqa: E402
+from app.models import db, Submission, Subscription  # noqa: E402
+from app.schema import UPGRADE_TABLES, upgrade_schema  # noqa: E402
+
+SUBMISSIONS = int(os.getenv('QUERY_PLAN_SUBMISSIONS', 1_000_000))
+USERS = 5000
+QUIZZES = 200
+QUESTIONS_PER_QUIZ = 10
+
+
+def seed(connection):
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    rows = []
+    seen = set()
+    while len(seen) < SUBMISSIONS:
+        user_id = rng.randint(1, USERS)
+        quiz_id = rng.randint(1, QUIZZES)
+        question_id = (quiz_id - 1) * QUESTIONS_PER_QUIZ + rng.randint(1, QUESTIONS_PER_QUIZ)
+        if (user_id, quiz_id, question_id) in seen:
+            continue
+        seen.add((user_id, quiz_id, question_id))
+        rows.append((user_id, quiz_id, question_id, '[0]', rng.random() < 0.5,
+                     start + timedelta(minutes=len(rows))))
+        if len(rows) >= 50000:
+            connection.exec_driver_sql(
+                "INSERT INTO submission (user_id, quiz_id, question_id, answer, is_correct, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            rows = []
+    if rows:
+        connection.exec_driver_sql(
+            "INSERT INTO submission (user_id, quiz_id, question_id, answer, is_correct, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    connection.exec_driver_sql(
+        "INSERT INTO subscription (user_id, chapter_id, is_active, subscribed_on) VALUES (?, ?, ?, ?)",
+        [(user_id, chapter_id, True, start)
+         for user_id in range(1, USERS + 1) for chapter_id in range(1, 4)])
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = \
+        f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        # Start from the schema before the indexes were added
+        with db.engine.begin() as connection:
+            for model in UPGRADE_TABLES:
+                for index in model.__table__.indexes:
+                    connection.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+            seed(connection)
+
+        upgrade_schema()
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+        yield app
+        db.session.remove()
+
+
+def query_plan(query):
+    sql = str(query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return '\n'.join(row[-1] for row in rows)
+
+
+def assert_uses_index(plan, *index_names):
+    assert any(f"INDEX {index_name}" in plan for index_name in index_names), plan
+    # A bare SCAN is a full table scan
+    assert not {'SCAN submission', 'SCAN subscription'} & set(plan.splitlines()), plan
+
+
+def test_upgrade_created_indexes(app):
+    with app.app_context():
+        inspector = inspect(db.engine)
+        for model in UPGRADE_TABLES:
+            existing = {index['name'] for index in inspector.get_indexes(model.__tablename__)}
+            assert {index.name for index in model.__table__.indexes} <= existing
+        assert Submission.query.count() == SUBMISSIONS
+
+
+def test_user_quiz_submissions(app):
+    # Results, certificates and attempt rebuilds for one user
+    with app.app_context():
+        plan = query_plan(Submission.query.filter_by(user_id=17, quiz_id=42))
+        # Equality on both columns, either composite index serves it
+        assert_uses_index(plan, 'uq_submission_user_quiz_question', 'ix_submission_quiz_user')
+
+
+def test_user_quiz_question_submission(app):
+    # Per-question lookups and the upsert conflict target
+    with app.app_context():
+        plan = query_plan(Submission.query.filter_by(user_id=17, quiz_id=42, question_id=415))
+        assert_uses_index(plan, 'uq_submission_user_quiz_question')
+
+
+def test_quiz_submissions(app):
+    # Regrading and admin quiz views
+    with app.app_context():
+        plan = query_plan(Submission.query.filter_by(quiz_id=42))
+        assert_uses_index(plan, 'ix_submission_quiz_user')
+
+
+def test_recent_submissions(app):
+    # Dashboard activity and charts over a time window
+    with app.app_context():
+        since = datetime(2025, 6, 1)
+        plan = query_plan(db.session.query(
+            func.date(Submission.timestamp), func.count(Submission.id)
+        ).filter(Submission.timestamp >= since).group_by(func.date(Submission.timestamp)))
+        assert_uses_index(plan, 'ix_submission_timestamp')
+
+
+def test_active_subscription(app):
+    # Access checks on every quiz request
+    with app.app_context():
+        plan = query_plan(Subscription.query.filter_by(
+            user_id=17, chapter_id=2, is_active=True))
+        assert_uses_index(plan, 'ix_subscription_user_chapter_active')
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, '-q']))